@@ -3,6 +3,7 @@
 from src.ast.elements.expression.final.ID import ID
 from src.ast.elements.expression.BaseExpr import BaseExpr
 from src.ast.BaseLuppNode import BaseLuppNode
+from src.utils.NodeKind import NodeKind
 
 class FuncCall(BaseLuppNode):
     '''
@@ -10,6 +11,7 @@ class FuncCall(BaseLuppNode):
     '''
 
     __NODE_NAME = "FUN_CALL"
+    kind = NodeKind.FUNC_CALL
 
     def __init__(self, funcName:ID, args:list[BaseExpr]):
         '''
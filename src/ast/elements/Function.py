@@ -2,6 +2,7 @@
 from src.ast.elements.InstrBlock import InstrBlock
 from src.ast.BaseLuppNode import BaseLuppNode
 from src.ast.elements.expression.final.ID import ID
+from src.utils.NodeKind import NodeKind
 
 class Function(BaseLuppNode):
     '''
@@ -9,6 +10,7 @@ class Function(BaseLuppNode):
     '''
 
     __NODE_NAME = "FUNCTION"
+    kind = NodeKind.FUNCTION
     __ABBREV = "F"
 
     def __init__(self, funcName:ID, funcParams:list[ID], instructions: InstrBlock):
@@ -1,5 +1,6 @@
 
 from src.ast.BaseLuppNode import BaseLuppNode
+from src.utils.NodeKind import NodeKind
 
 class InstrBlock(BaseLuppNode):
     '''
@@ -7,6 +8,7 @@ class InstrBlock(BaseLuppNode):
     '''
 
     __NODE_NAME = "INSTR_BLOCK"
+    kind = NodeKind.INSTR_BLOCK
     __ABBREV = "BLK"
 
     def __init__(self, instructions: list[BaseLuppNode]):
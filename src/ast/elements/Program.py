@@ -2,6 +2,7 @@
 from src.ast.BaseLuppNode import BaseLuppNode
 from src.ast.elements.Function import Function
 from graphviz import Digraph
+from src.utils.NodeKind import NodeKind
 
 class Program(BaseLuppNode):
     '''
@@ -9,6 +10,7 @@ class Program(BaseLuppNode):
     '''
 
     __NODE_NAME = "PROGRAM"
+    kind = NodeKind.PROGRAM
     __ABBREV = "P"
 
     def __init__(self, functions: list[Function]):
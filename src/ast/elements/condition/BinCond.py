@@ -1,6 +1,7 @@
 from src.ast.elements.condition.BaseCond import BaseCond
 from src.ast.elements.expression.BaseExpr import BaseExpr
 from enum import Enum
+from src.utils.NodeKind import NodeKind
 
 class BinCond(BaseCond):
         '''
@@ -9,6 +10,7 @@ class BinCond(BaseCond):
         '''
         
         __NODE_NAME = "BIN"
+        kind = NodeKind.BIN_COND
 
         class BinCondType(Enum):
             '''This enum represents the allowed binary operators.'''
@@ -1,5 +1,6 @@
 from src.ast.elements.condition.BaseCond import BaseCond
 from enum import Enum
+from src.utils.NodeKind import NodeKind
 
 class TrueFalse(BaseCond):
         '''
@@ -8,6 +9,7 @@ class TrueFalse(BaseCond):
         '''
         
         __NODE_NAME = "T/F"
+        kind = NodeKind.TRUE_FALSE
 
         class TrueFalseType(Enum):
             '''This enum represents the allowed binary operators.'''
@@ -2,6 +2,7 @@ from src.ast.BaseLuppNode import BaseLuppNode
 from src.ast.elements.expression.BaseExpr import BaseExpr
 from src.ast.elements.FuncCall import FuncCall
 from enum import Enum
+from src.utils.NodeKind import NodeKind
 
 class BinOp(BaseExpr):
         '''
@@ -10,6 +11,7 @@ class BinOp(BaseExpr):
         '''
         
         __NODE_NAME = "BIN_OP"
+        kind = NodeKind.BIN_OP
 
         class BinOpType(Enum):
             '''This enum represents the allowed binary operators.'''
@@ -1,10 +1,12 @@
 
 
 from src.ast.elements.expression.final.BaseFinal import BaseFinal
+from src.utils.NodeKind import NodeKind
 
 class ID(BaseFinal):
 
     __NODE_NAME = "ID"
+    kind = NodeKind.ID
 
     def __init__(self, varName:str):
         '''
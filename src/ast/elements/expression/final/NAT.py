@@ -1,10 +1,12 @@
 
 
 from src.ast.elements.expression.final.BaseFinal import BaseFinal
+from src.utils.NodeKind import NodeKind
 
 class NAT(BaseFinal):
 
     __NODE_NAME = "NAT"
+    kind = NodeKind.NAT
 
     def __init__(self, value:str):
         '''
@@ -1,10 +1,12 @@
 
 
 from src.ast.elements.expression.final.BaseFinal import BaseFinal
+from src.utils.NodeKind import NodeKind
 
 class SYM(BaseFinal):
 
     __NODE_NAME = "SYM"
+    kind = NodeKind.SYM
 
     def __init__(self, name:str):
         '''
@@ -2,6 +2,7 @@
 from src.ast.elements.expression.BaseExpr import BaseExpr
 from src.ast.elements.instruction.BaseInstr import BaseInstr
 from src.ast.elements.expression.final.ID import ID
+from src.utils.NodeKind import NodeKind
 
 class Assignment(BaseInstr):
     '''
@@ -9,6 +10,7 @@ class Assignment(BaseInstr):
     '''
 
     __NODE_NAME = "ASSIGNMENT"
+    kind = NodeKind.ASSIGNMENT
     __ABBREV = "A"
 
     def __init__(self, varName:ID, expression: BaseExpr):
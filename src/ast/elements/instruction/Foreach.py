@@ -3,6 +3,7 @@ from src.ast.elements.InstrBlock import InstrBlock
 from src.ast.elements.expression.BaseExpr import BaseExpr
 from src.ast.elements.instruction.BaseInstr import BaseInstr
 from src.ast.elements.expression.final.ID import ID
+from src.utils.NodeKind import NodeKind
 
 class Foreach(BaseInstr):
     '''
@@ -10,6 +11,7 @@ class Foreach(BaseInstr):
     '''
 
     __NODE_NAME = "FOREACH"
+    kind = NodeKind.FOREACH
     __ABBREV = "FEACH"
 
     def __init__(self, varName:ID, expression: BaseExpr, instrBlock: InstrBlock):
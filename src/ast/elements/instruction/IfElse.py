@@ -1,6 +1,7 @@
 from src.ast.elements.condition.BaseCond import BaseCond
 from src.ast.elements.InstrBlock import InstrBlock
 from src.ast.elements.instruction.BaseInstr import BaseInstr
+from src.utils.NodeKind import NodeKind
 
 class IfElse(BaseInstr):
     '''
@@ -8,6 +9,7 @@ class IfElse(BaseInstr):
     '''
 
     __NODE_NAME = "IFELSE"
+    kind = NodeKind.IF_ELSE
     __ABBREV = "IFEL"
 
 
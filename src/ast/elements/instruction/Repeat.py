@@ -1,6 +1,7 @@
 from src.ast.elements.expression.BaseExpr import BaseExpr
 from src.ast.elements.InstrBlock import InstrBlock
 from src.ast.elements.instruction.BaseInstr import BaseInstr
+from src.utils.NodeKind import NodeKind
 
 class Repeat(BaseInstr):
     '''
@@ -8,6 +9,7 @@ class Repeat(BaseInstr):
     '''
 
     __NODE_NAME = "REPEAT"
+    kind = NodeKind.REPEAT
     __ABBREV = "RPT"
 
     def __init__(self, expression: BaseExpr, block: InstrBlock):
@@ -1,5 +1,6 @@
 from src.ast.elements.expression.BaseExpr import BaseExpr
 from src.ast.elements.instruction.BaseInstr import BaseInstr
+from src.utils.NodeKind import NodeKind
 
 class Return(BaseInstr):
     '''
@@ -7,6 +8,7 @@ class Return(BaseInstr):
     '''
 
     __NODE_NAME = "RETURN"
+    kind = NodeKind.RETURN
     __ABBREV = "RET"
 
     def __init__(self, expression: BaseExpr):
@@ -1,6 +1,7 @@
 from src.ast.elements.condition.BaseCond import BaseCond
 from src.ast.elements.InstrBlock import InstrBlock
 from src.ast.elements.instruction.BaseInstr import BaseInstr
+from src.utils.NodeKind import NodeKind
 
 class While(BaseInstr):
     '''
@@ -8,6 +9,7 @@ class While(BaseInstr):
     '''
 
     __NODE_NAME = "WHILE"
+    kind = NodeKind.WHILE
     __ABBREV = "WHL"
 
     def __init__(self, condition: BaseCond, block: InstrBlock):
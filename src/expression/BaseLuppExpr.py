@@ -1,29 +1,154 @@
 from src.utils.GenericTreeNode import GenericTreeNode
-from abc import abstractmethod, ABC
-from functools import reduce
+from src.utils.NodeKind import NodeKind
+from abc import abstractmethod, ABC, ABCMeta
+from functools import cmp_to_key, reduce
+from operator import attrgetter
+from weakref import WeakValueDictionary
 
-class BaseLuppExpr(GenericTreeNode): 
+from src.expression.termtree import ChildrenKey, TermTree
+
+
+class InternedExprMeta(ABCMeta):
+    '''
+    Metaclass of the expression nodes. Every node created through the class call
+    is looked up in a weak intern table: if a structurally identical node is still
+    alive, that node is returned instead of the new one. In this way equal
+    subexpressions are shared and the structural equality reduces to identity.
+    '''
+
+    # Tabella dei nodi internati. I valori sono riferimenti deboli, quindi un nodo
+    # viene rimosso dalla tabella appena non è più utilizzato.
+    internTable = WeakValueDictionary()
+
+    # Valori correnti delle opzioni della semplificazione dichiarate dalle classi in simplificationOptions.
+    # Tuple uguali sono lo stesso oggetto, quindi le forme memorizzate si confrontano per identità
+    mode = ()
+    modes = {}
+    optionClasses = []
+
+    def __init__(cls, name, bases, namespace, **kwargs):
+        super().__init__(name, bases, namespace, **kwargs)
+        if namespace.get("simplificationOptions"):
+            InternedExprMeta.optionClasses.append(cls)
+            InternedExprMeta.updateMode()
+
+    def __setattr__(cls, name, value):
+        super().__setattr__(name, value)
+        # Anche l'assegnamento diretto di un'opzione, come Mult.cancelQuotients = True, cambia la modalità
+        if name in cls.simplificationOptions:
+            InternedExprMeta.updateMode()
+
+    @staticmethod
+    def updateMode():
+        '''
+        This method recomputes the current mode of the simplification from the options of the classes.
+        '''
+        mode = tuple(getattr(cls, name) for cls in InternedExprMeta.optionClasses for name in sorted(cls.simplificationOptions))
+        InternedExprMeta.mode = InternedExprMeta.modes.setdefault(mode, mode)
+
+    def __call__(cls, *args, **kwargs):
+        # I valori più comuni vengono presi dalla tabella dei flyweight senza creare un nuovo nodo
+        if cls.flyweights is not None and (flyweight := cls.flyweights.get(cls.flyweightKey(*args, **kwargs))) is not None:
+            return flyweight
+        node = super().__call__(*args, **kwargs)
+        key = node.internKey()
+        interned = InternedExprMeta.internTable.get(key)
+        if interned is not None:
+            return interned
+        node._hash = hash(key)
+        # Da questo momento il nodo è condiviso e non può più essere modificato
+        node._sealed = True
+        InternedExprMeta.internTable[key] = node
+        return node
+
+
+class BaseLuppExpr(GenericTreeNode, metaclass=InternedExprMeta): 
     '''
     This class rapresent a generic rapresentation of an expression node.
     BaseLuppExpr are final nodes and must not be edited after creation.
+    Nodes are interned: two structurally identical expressions are the same object.
+    Since nodes are immutable, children are shared among all the expressions that
+    contain them and no parent reference is kept.
     ''' 
 
-    def __init__(self, name, children: list = None, negated = False):
+    keepsParent = False
+
+    # Attributi di classe da cui dipende il risultato della semplificazione. Le forme semplificate,
+    # espanse e derivate sono memorizzate insieme alla modalità in cui sono state calcolate, vedi getMemo
+    simplificationOptions = frozenset()
+
+    # Metadati strutturali dei nodi, calcolati una sola volta da computeMetadata.
+    # Le foglie li definiscono come attributi di classe
+    metadataNames = frozenset(("size", "depth", "freeSymbols", "totalDegree", "hasNonRationalExponent"))
+
+    # Tabella dei nodi preallocati per i valori più comuni, indicizzata da flyweightKey.
+    # None per le classi che non hanno nodi preallocati
+    flyweights = None
+
+    # Numero di figli a partire dal quale somme e prodotti vengono semplificati ed espansi in parallelo
+    # da parallelBackend, vedi ParallelExpr. None disabilita la modalità parallela
+    parallelThreshold = None
+    parallelBackend = None
+
+    def __init__(self, name, children: list = None, negated = False, presorted = False):
         '''
         This method initializes the BaseLuppExpr object. The method takes the following parameters:
-        - name: the name of the node.
+        - name: the name of the node. It can be None if the subclass builds its name lazily.
         - children: the list of children of the node. Default is None. All must be of type BaseLuppExpr.
         - negated: indicate if the node is negated. Default is False.
+        - presorted: indicate if the children are already in canonical order, so they are not sorted again. Default is False.
+        The children are not copied, so the cost of the creation depends only on their number.
+        The children of sums and products can also be given as a TermTree, see getChildTree: in this case
+        the tuple of the children is built only when it is read, so the cost of the creation does not
+        depend on their number.
         '''
 
-        children = [child.copy_with() for child in children] if children is not None else []
-        all(isinstance(child, BaseLuppExpr) for child in children), "all elements in children must be of type BaseLuppExpr"
-        #Se non sei una potenza, ordino i figli. Nella potenza infatti il primo figlio è la base e il secondo l'esponente
-        if self.__class__.__name__ != "Pow":
-            children.sort()
-        name = ("-" + name) if negated else name
-        super().__init__(name, children)
+        if isinstance(children, TermTree):
+            self._childTree = children
+        else:
+            children = list(children) if children is not None else []
+            # Il controllo viene fatto sui tag dei figli, che evitano il costo di issubclass sulle ABC
+            assert all(getattr(child, "kind", None) in NodeKind.EXPRESSIONS for child in children), "all elements in children must be of type BaseLuppExpr"
+            #Se non sei una potenza, ordino i figli. Nella potenza infatti il primo figlio è la base e il secondo l'esponente
+            if self.kind != NodeKind.POW and not presorted:
+                BaseLuppExpr.sortNodes(children)
+            self.children = tuple(children)
+        # Non viene chiamato l'init di GenericTreeNode: i figli sono condivisi
+        # e non devono avere un riferimento al padre
+        if name is not None:
+            self.name = ("-" + name) if negated else name
         self.negated = negated
+        self.sortKey = self.computeSortKey()
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get("_sealed", False):
+            raise AttributeError(f"{self.__class__.__name__} nodes are immutable")
+        super().__setattr__(name, value)
+
+    @staticmethod
+    def setCache(node, name, value):
+        '''
+        This method writes a cache attribute of the node. The nodes are sealed after their creation,
+        so the caches, that do not change the value of the node, are written bypassing __setattr__.
+        '''
+        object.__setattr__(node, name, value)
+
+    @staticmethod
+    def getMemo(node, name):
+        '''
+        This method returns the result memoized on the node with setMemo, or None if it was computed
+        in a different mode of the simplification or if it is missing.
+        '''
+        memo = node.__dict__.get(name)
+        return memo[1] if memo is not None and memo[0] is InternedExprMeta.mode else None
+
+    @staticmethod
+    def setMemo(node, name, value):
+        '''
+        This method memoizes on the node a result that depends on the options of the simplification,
+        together with the current mode. Changing an option makes the results memoized before invisible.
+        '''
+        BaseLuppExpr.setCache(node, name, (InternedExprMeta.mode, value))
 
     @abstractmethod
     def copy_with(self, **kwargs):
@@ -32,11 +157,171 @@ class BaseLuppExpr(GenericTreeNode):
         '''
         pass
 
-    @abstractmethod
-    def getLatexRapresentation(self):
+    def copy_with_children(self, children):
+        '''
+        This method is used to create a copy of the node with the given children,
+        keeping all the other parameters. Leaves have no children and return themselves.
+        '''
+        return self
+
+    def __getattr__(self, name):
+        '''
+        This method computes the structural metadata of the node the first time one of them is read.
+        The metadata of the descendants that do not have them yet are computed first, bottom up and
+        without recursion, so every node computes them once from the cached values of its children.
+        Intermediate nodes that are never inspected do not pay for them.
+        The tuple of the children of the nodes built from a TermTree is also built when it is first read.
+        '''
+        if name == "children" and "_childTree" in self.__dict__:
+            children = tuple(self._childTree)
+            BaseLuppExpr.setCache(self, "children", children)
+            return children
+        if name not in BaseLuppExpr.metadataNames:
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+        for node in BaseLuppExpr.postOrder(self, prune = lambda node: len(node.children) == 0 or "size" in node.__dict__):
+            node.computeMetadata()
+        return self.__dict__[name]
+
+    def childCount(self):
+        '''
+        This method returns the number of children of the node, without building the tuple
+        of the children of the nodes built from a TermTree.
+        '''
+        if "children" not in self.__dict__:
+            return len(self._childTree)
+        return len(self.children)
+
+    def getChildTree(self):
+        '''
+        This method returns the children of a sum or a product as a TermTree in canonical order.
+        The tree is built once from the children, which must be distinct. The tree is persistent,
+        so a sum or a product that differs from this node by a few children is built from it
+        with a few updates, see Add.mergeTerms and Mult.mergeFactors.
+        '''
+        if (tree := self.__dict__.get("_childTree")) is None:
+            tree = TermTree.fromSorted(self.children, BaseLuppExpr.compare)
+            BaseLuppExpr.setCache(self, "_childTree", tree)
+        return tree
+
+    def computeMetadata(self):
+        '''
+        This method computes the structural metadata of the node from the cached metadata of its
+        children, so that every value costs only the number of children:
+        - size: the number of nodes of the expression tree.
+        - depth: the number of nodes on the longest path from the node to a leaf.
+        - freeSymbols: the frozenset of the names of the symbols in the expression.
+        - totalDegree: an upper bound of the total degree of the expression as a polynomial, or
+          None if it contains a power that is not a non negative integer power.
+        - hasNonRationalExponent: True if the expression contains a power whose exponent is not a Rational.
+        Leaves define them as class attributes.
+        '''
+        children = self.children
+        BaseLuppExpr.setCache(self, "size", 1 + sum(map(attrgetter("size"), children)))
+        BaseLuppExpr.setCache(self, "depth", 1 + max(map(attrgetter("depth"), children)))
+        # Se i simboli vengono da un solo insieme non vuoto, l'insieme viene condiviso
+        symbolSets = set(map(attrgetter("freeSymbols"), children))
+        symbolSets.discard(frozenset())
+        BaseLuppExpr.setCache(self, "freeSymbols", symbolSets.pop() if len(symbolSets) == 1 else frozenset().union(*symbolSets))
+        BaseLuppExpr.setCache(self, "hasNonRationalExponent", any(map(attrgetter("hasNonRationalExponent"), children)))
+        BaseLuppExpr.setCache(self, "totalDegree", self.computeTotalDegree())
+
+    def computeTotalDegree(self):
+        '''
+        This method computes the total degree of the node from the degrees of its children.
+        See computeMetadata.
+        '''
+        return 0
+
+    def computeSortKey(self):
+        '''
+        This method computes the canonical sort key of the node from the keys of its children.
+        The key is flat: the type priority, then the keys of the children followed by 0 or the
+        leafKey for the leaves, and finally the negation. Comparing two keys gives the same order
+        as comparing the nodes child by child. Only the first sortKeyLength elements are kept, so
+        the cost and the memory of the key do not depend on the size of the expression: two nodes
+        whose truncated keys are equal are ordered by compare.
+        '''
+        children = self.__dict__["children"] if "children" in self.__dict__ else self._childTree
+        if len(children) == 0:
+            return (self.type_priority[self.kind], self.leafKey(), self.negated)
+        length = BaseLuppExpr.sortKeyLength
+        parts = [self.type_priority[self.kind]]
+        for child in children:
+            parts.extend(child.sortKey)
+            if len(parts) >= length:
+                return tuple(parts[:length])
+        # Lo 0 chiude la lista dei figli: un nodo con meno figli viene prima, come nel confronto tra tuple
+        parts.append(0)
+        parts.append(self.negated)
+        return tuple(parts[:length])
+
+    @staticmethod
+    def flyweightKey(*args, **kwargs):
+        '''
+        This method returns the key of the flyweights table for the given constructor
+        arguments, or None if the node cannot be preallocated.
+        '''
+        return None
+
+    def leafKey(self):
+        '''
+        This method returns the part of the sort key that identifies a leaf. By default it is the name.
+        '''
+        return self.name
+
+    def internKey(self):
+        '''
+        This method returns the key used to intern the node. Two nodes with the same
+        key are structurally identical. Children are already interned, so they
+        are compared by identity and the key contains only their ids: an interned
+        node keeps its children alive, so their ids cannot be reused. Sums and products use a
+        ChildrenKey, whose hash is kept by the TermTree of their children when they are built from one.
+        '''
+        if self.kind in (NodeKind.ADD, NodeKind.MULT):
+            return ChildrenKey(self.__class__, self.negated, self.__dict__["children"] if "children" in self.__dict__ else self._childTree)
+        return (self.__class__, self.name, self.negated, tuple(map(id, self.children)))
+
+    def getLatexRapresentation(self, parent = None, notAsFraction = False):
         '''
         This method is used to get the latex repr
         esentation of the node.
+        The parent node, if any, must be passed by the caller since nodes are shared
+        among different expressions. If notAsFraction is True, a power with negative exponent
+        is written without the fraction, because it is already in a denominator.
+        The representation is built without recursion: every node lists the representations
+        it needs with latexRequests and combines them with buildLatex.
+        '''
+        # La rappresentazione dipende dal nodo, dal tipo del padre e da notAsFraction
+        results = {}
+        root = (self, parent, notAsFraction)
+        stack = [(root, False)]
+        while stack:
+            request, ready = stack.pop()
+            node, nodeParent, nodeNotAsFraction = request
+            key = (node, type(nodeParent), nodeNotAsFraction)
+            if key in results:
+                continue
+            requests = node.latexRequests(nodeNotAsFraction)
+            if ready:
+                childLatex = [results[(child, type(childParent), childNotAsFraction)] for child, childParent, childNotAsFraction in requests]
+                results[key] = node.buildLatex(childLatex, nodeParent, nodeNotAsFraction)
+                continue
+            stack.append((request, True))
+            stack.extend((childRequest, False) for childRequest in reversed(requests))
+        return results[(self, type(parent), notAsFraction)]
+
+    def latexRequests(self, notAsFraction = False):
+        '''
+        This method returns the list of the representations of the children needed by buildLatex,
+        as tuples (child, parent, notAsFraction). By default every child with the node as parent.
+        '''
+        return [(child, self, False) for child in self.children]
+
+    @abstractmethod
+    def buildLatex(self, childLatex, parent = None, notAsFraction = False):
+        '''
+        This method builds the latex representation of the node given the representations
+        requested by latexRequests, in the same order.
         '''
         pass
 
@@ -45,31 +330,55 @@ class BaseLuppExpr(GenericTreeNode):
         This method is used to apply some base common semplifications to the node.
         All the children are going to be simplified and if all children are rational, 
         the nodes is going to be simplified to a rational.
-        If semplifications are not applicable, the method returns None.
+        If semplifications are not applicable, the method returns the node with the
+        simplified children. The node itself is never edited.
         '''
         # Simplify all childrens
-        self.children = [child.simplify() for child in self.children]
+        node = self.copy_with_children([child.simplify() for child in self.children])
+        children = node.children
 
         # Semplify to ractional if all children are rational
-        if len(self.children) > 0 and all([child.__class__.__name__ == "Rational" for child in self.children]):
+        if len(children) > 0 and all(child.kind == NodeKind.RATIONAL for child in children):
             
-            if self.__class__.__name__ == "Pow":
-                rationalResult, approx = self.children[0] ** self.children[1]
-                return rationalResult if not approx else None
+            if self.kind == NodeKind.POW:
+                rationalResult, approx = children[0] ** children[1]
+                return rationalResult.copy_with(negated = self.negated != rationalResult.negated).simplify() if not approx else node
             
-            operations = {
-                'Add': lambda x, y: x + y,
-                'Mult': lambda x, y: x * y
-            }
             # Apply the operation to the children and get a rational result
-            rationalResult = reduce(operations[self.__class__.__name__], self.children)
+            rationalResult = reduce(self.rationalOperations[self.kind], children)
 
                 
             # If the node is negated, invert the negation on the result and call simplify
             return rationalResult.copy_with(negated = self.negated != rationalResult.negated).simplify()
         
-        return None
+        return node
     
+    def isNormalized(self):
+        '''
+        This method returns True if the node is known to be in normal form, that is
+        if it is the result of a simplification in the current mode. Simplifying it again returns the node itself.
+        '''
+        return self.__dict__.get("_normalized") is InternedExprMeta.mode
+
+    @staticmethod
+    def isSimplified(node):
+        '''
+        This method returns True if simplifying the node does not require to visit its children,
+        that is if the node is a leaf, is in normal form or has a memoized simplification.
+        The wide nodes are also skipped, since their own simplification splits them in parallel.
+        '''
+        return len(node.children) == 0 or node.isNormalized() or BaseLuppExpr.getMemo(node, "_simplified") is not None \
+            or BaseLuppExpr.isWide(node)
+
+    @staticmethod
+    def isWide(node):
+        '''
+        This method returns True if the node is a sum or a product with enough children
+        to be simplified and expanded in parallel.
+        '''
+        return BaseLuppExpr.parallelThreshold is not None and len(node.children) >= BaseLuppExpr.parallelThreshold \
+            and node.kind in (NodeKind.ADD, NodeKind.MULT)
+
     def expand(self):
         '''
         This method is used to manipulate the node expanding the node due
@@ -77,6 +386,36 @@ class BaseLuppExpr(GenericTreeNode):
         only once.
         '''
         return self.copy_with()
+
+    def fullExpand(self):
+        '''
+        This method returns the fully expanded and simplified form of the node, computed in a
+        single traversal: the children are fully expanded first and then the node is expanded
+        by expandNode. The result is memoized on the node, so every shared subexpression is
+        expanded only once.
+        '''
+        if (memo := BaseLuppExpr.getMemo(self, "_fullyExpanded")) is not None:
+            return memo
+        if BaseLuppExpr.isWide(self):
+            result = BaseLuppExpr.parallelBackend.fullExpand(self)
+            BaseLuppExpr.setMemo(self, "_fullyExpanded", result)
+            return result
+        # I nodi larghi vengono espansi dalla loro chiamata, in parallelo
+        for node in BaseLuppExpr.postOrder(self, prune = lambda node: BaseLuppExpr.getMemo(node, "_fullyExpanded") is not None
+                                           or BaseLuppExpr.isWide(node)):
+            if node is not self:
+                node.fullExpand()
+        node = self.copy_with_children([child.fullExpand() for child in self.children])
+        result = node.expandNode().simplify()
+        BaseLuppExpr.setMemo(self, "_fullyExpanded", result)
+        return result
+
+    def expandNode(self):
+        '''
+        This method expands the node assuming that its children are already fully expanded.
+        Nodes that cannot be distributed, like leaves and sums, are returned as they are.
+        '''
+        return self
     
     
     def substitute(self, toBeSubstitue, substitute):
@@ -86,10 +425,43 @@ class BaseLuppExpr(GenericTreeNode):
         - toBeSubstitue: the node to be substituted.
         - substitute: the node to substitute.
         '''
-        self.children = [child.substitute(toBeSubstitue, substitute) for child in self.children]
-        if self == toBeSubstitue:
-            return substitute
-        return self
+        def visit(node, children):
+            node = node.copy_with_children(children)
+            return substitute if node == toBeSubstitue else node
+        return BaseLuppExpr.transform(self, visit)
+
+    def substituteAll(self, substitutions: dict):
+        '''
+        This method substitutes simultaneously many subexpressions in a single visit.
+        The method takes the following parameters:
+        - substitutions: the dictionary mapping every node to be substituted to its substitute.
+        Nodes are interned, so the occurrences are found with a hash lookup of every subtree.
+        The subtrees that are too small or that have no symbol in common with the patterns are
+        skipped using the cached metadata, and only the nodes on the path from the root to a
+        substituted node are rebuilt: the rest of the expression is shared with the original one.
+        The substitutes are not visited again and the expression is never edited.
+        '''
+        if len(substitutions) == 0:
+            return self
+        if self in substitutions:
+            return substitutions[self]
+
+        minSize = min(match.size for match in substitutions)
+        patternSymbols = frozenset().union(*(match.freeSymbols for match in substitutions))
+        # Un pattern senza simboli può comparire in qualsiasi sottoalbero abbastanza grande
+        needsSymbols = all(len(match.freeSymbols) > 0 for match in substitutions)
+        def skip(node):
+            return node in substitutions or node.size < minSize or (needsSymbols and node.freeSymbols.isdisjoint(patternSymbols))
+
+        rebuilt = {}
+        for node in BaseLuppExpr.postOrder(self, prune = skip):
+            children = [substitutions[child] if child in substitutions else rebuilt.get(child, child) for child in node.children]
+            # Se nessun figlio è cambiato il nodo resta condiviso
+            if all(map(lambda new, old: new is old, children, node.children)):
+                rebuilt[node] = node
+            else:
+                rebuilt[node] = node.copy_with_children(children)
+        return rebuilt.get(self, self)
     
     
     def derive(self, symbol):
@@ -100,22 +472,54 @@ class BaseLuppExpr(GenericTreeNode):
         '''
         pass
 
+    def deriveChildren(self):
+        '''
+        This method returns the children whose derivatives are needed to derive the node.
+        '''
+        return self.children
+
     @staticmethod
     def baseSimpl(method):
         '''
         This wrapper is created to call the simplify method of the base node 
-        and if the result is None, call the method passed as parameter.
+        and if the result is not a rational, call the method passed as parameter
+        on the node with the simplified children.
         '''
         def wrapper(self, *args, **kwargs):
-            res = super(self.__class__, self).simplify()
-            if res is not None:
+            # Se il nodo è in forma normale o è già stato semplificato, non serve rifare il lavoro
+            if self.isNormalized():
+                return self
+            if (memo := BaseLuppExpr.getMemo(self, "_simplified")) is not None:
+                return memo
+            if BaseLuppExpr.isWide(self):
+                res = BaseLuppExpr.parallelBackend.simplify(self)
+                BaseLuppExpr.memoizeSimplified(self, res)
                 return res
-            prec = self
-            res = method(self, *args, **kwargs)
-            if prec!=res:
-                return res.simplify()
+            # I discendenti vengono semplificati prima, dal basso verso l'alto e senza ricorsione:
+            # la semplificazione dei figli trova così il risultato già memorizzato
+            for node in BaseLuppExpr.postOrder(self, prune = BaseLuppExpr.isSimplified):
+                if node is not self:
+                    node.simplify()
+            res = super(self.__class__, self).simplify()
+            if res.kind == self.kind:
+                prec = res
+                res = method(res, *args, **kwargs)
+                if prec!=res:
+                    res = res.simplify()
+            BaseLuppExpr.memoizeSimplified(self, res)
             return res
         return wrapper
+
+    @staticmethod
+    def memoizeSimplified(node, simplified):
+        '''
+        This method records that simplified is the simplification of node and that
+        simplified is in normal form. Nodes are immutable and interned, so the result
+        is valid for every expression that shares the node, as long as the mode of the simplification does not change.
+        '''
+        BaseLuppExpr.setCache(simplified, "_normalized", InternedExprMeta.mode)
+        if node is not simplified:
+            BaseLuppExpr.setMemo(node, "_simplified", simplified)
     
 
     @staticmethod
@@ -125,8 +529,16 @@ class BaseLuppExpr(GenericTreeNode):
         before calling the method passed as parameter.
         '''
         def wrapper(self, *args, **kwargs):
-            self.children = [child.expand() for child in self.children]
-            return method(self, *args, **kwargs)
+            if (memo := BaseLuppExpr.getMemo(self, "_expanded")) is not None:
+                return memo
+            # I discendenti vengono espansi prima, dal basso verso l'alto e senza ricorsione
+            for node in BaseLuppExpr.postOrder(self, prune = lambda node: len(node.children) == 0 or BaseLuppExpr.getMemo(node, "_expanded") is not None):
+                if node is not self:
+                    node.expand()
+            node = self.copy_with_children([child.expand() for child in self.children])
+            result = method(node, *args, **kwargs)
+            BaseLuppExpr.setMemo(self, "_expanded", result)
+            return result
         return wrapper
     
 
@@ -138,46 +550,171 @@ class BaseLuppExpr(GenericTreeNode):
         '''
         def wrapper(self, *args, **kwargs):
             symbol=args[0]
-            assert symbol.__class__.__name__ == "Symbol", "The symbol must be a Symbol isntance"
-            return method(self, *args, **kwargs)
+            assert symbol.kind == NodeKind.SYMBOL, "The symbol must be a Symbol isntance"
+            if len(self.children) == 0:
+                return method(self, *args, **kwargs)
+            derivatives = BaseLuppExpr.getMemo(self, "_derivatives")
+            if derivatives is not None and (memo := derivatives.get(symbol)) is not None:
+                return memo
+            # I discendenti vengono derivati prima, dal basso verso l'alto e senza ricorsione
+            derived = lambda node: len(node.children) == 0 or symbol in (BaseLuppExpr.getMemo(node, "_derivatives") or ())
+            for node in BaseLuppExpr.postOrder(self, prune = derived, childrenOf = BaseLuppExpr.deriveChildren):
+                if node is not self:
+                    node.derive(symbol)
+            result = method(self, *args, **kwargs)
+            if derivatives is None:
+                derivatives = {}
+                BaseLuppExpr.setMemo(self, "_derivatives", derivatives)
+            derivatives[symbol] = result
+            return result
         return wrapper
     
-    def findInnerElementsOfType(self, typeString):
+    def findInnerElementsOfType(self, kind):
         '''
         This method is used to find all the inner elements of the node of a specific type.
         Parameters:
-        - typeString: the type of the elements to find in String format
+        - kind: the kind tag of the elements to find, as defined in NodeKind
         '''
-        if self.__class__.__name__ == typeString:
-            return {self.copy_with(negated = False)}
-        return set().union(*[child.findInnerElementsOfType(typeString) for child in self.children])
+        # Come nella versione ricorsiva, non si cercano elementi dentro un elemento già trovato
+        isOfType = lambda node: node.kind == kind
+        return {node.copy_with(negated = False) for node in BaseLuppExpr.preOrder(self, prune = isOfType) if isOfType(node)}
 
 
+    @staticmethod
+    def preOrder(root, prune = None):
+        '''
+        This method iterates over the distinct nodes reachable from root, parents before children.
+        Every shared subexpression is visited once. The children of the nodes for which prune
+        returns True are not visited. The visit uses an explicit stack, so the depth of the
+        expression is not limited by the recursion limit.
+        '''
+        visited = {root}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            yield node
+            if prune is not None and prune(node):
+                continue
+            for child in reversed(node.children):
+                if child not in visited:
+                    visited.add(child)
+                    stack.append(child)
+
+    @staticmethod
+    def postOrder(root, prune = None, childrenOf = None):
+        '''
+        This method iterates over the distinct nodes reachable from root, children before parents.
+        Every shared subexpression is visited once. The nodes for which prune returns True are
+        skipped with their subtree. The optional childrenOf function returns the children to
+        visit for a node, by default all of them. The visit uses an explicit stack.
+        '''
+        childrenOf = attrgetter("children") if childrenOf is None else childrenOf
+        visited = set()
+        stack = [(root, False)]
+        while stack:
+            node, ready = stack.pop()
+            if ready:
+                yield node
+                continue
+            if node in visited or (prune is not None and prune(node)):
+                continue
+            visited.add(node)
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(childrenOf(node)) if child not in visited)
+
+    @staticmethod
+    def transform(root, visit):
+        '''
+        This method rebuilds the expression bottom up without recursion. The function visit is called
+        once for every distinct node in post order, with the node and the list of the results of its
+        children, and its result is used in place of the node. Return the result of the root.
+        '''
+        results = {}
+        for node in BaseLuppExpr.postOrder(root):
+            results[node] = visit(node, [results[child] for child in node.children])
+        return results[root]
+
+    def getSortKey(self):
+        '''
+        This method returns the canonical sort key of the node, computed once at creation.
+        Nodes of different types are ordered by type priority, leaves by leafKey and
+        the other nodes by comparing their children in order. See computeSortKey.
+        '''
+        return self.sortKey
+
+    @staticmethod
+    def compare(first, second):
+        '''
+        This method returns a negative number, zero or a positive number if first comes before, is equal to
+        or comes after second in the canonical order. The sort keys decide almost every comparison. When two
+        truncated keys are equal, the children are compared in order with an explicit stack, so the depth of
+        the expressions is not limited by the recursion limit.
+        '''
+        if first is second:
+            return 0
+        if first.sortKey != second.sortKey or len(first.sortKey) < BaseLuppExpr.sortKeyLength:
+            return -1 if first.sortKey < second.sortKey else int(first.sortKey != second.sortKey)
+        # Ogni livello confronta i figli dei due nodi a partire dall'indice memorizzato
+        stack = [[first, second, 0]]
+        while stack:
+            level = stack[-1]
+            left, right, index = level
+            if index < min(len(left.children), len(right.children)):
+                level[2] += 1
+                leftChild, rightChild = left.children[index], right.children[index]
+                # I nodi sono internati, quindi i figli uguali sono lo stesso oggetto
+                if leftChild is rightChild:
+                    continue
+                if leftChild.sortKey != rightChild.sortKey:
+                    return -1 if leftChild.sortKey < rightChild.sortKey else 1
+                # Chiavi troncate uguali: il confronto prosegue nei figli
+                stack.append([leftChild, rightChild, 0])
+                continue
+            if len(left.children) != len(right.children):
+                return len(left.children) - len(right.children)
+            if left.negated != right.negated:
+                return left.negated - right.negated
+            stack.pop()
+        return 0
+
+    @staticmethod
+    def sortNodes(nodes):
+        '''
+        This method sorts the list of nodes in place in canonical order. The list is sorted by sort key and
+        only the runs of nodes with equal truncated keys are sorted again with compare.
+        '''
+        nodes.sort(key = attrgetter("sortKey"))
+        length = BaseLuppExpr.sortKeyLength
+        if all(len(node.sortKey) < length for node in nodes):
+            return
+        start = 0
+        for index in range(1, len(nodes) + 1):
+            if index == len(nodes) or nodes[index].sortKey != nodes[start].sortKey:
+                if index - start > 1:
+                    nodes[start:index] = sorted(nodes[start:index], key = cmp_to_key(BaseLuppExpr.compare))
+                start = index
+
     def __lt__(self, other):
         '''
-        This method is used to compare two nodes.
+        This method is used to compare two nodes in canonical order, see compare.
         '''
-        if self.__class__.__name__ == other.__class__.__name__:
-            if len(self.children)>0:
-                return self.children < other.children
-            return self.name < other.name
-        return self.type_priority[self.__class__.__name__] < self.type_priority[other.__class__.__name__]
+        return BaseLuppExpr.compare(self, other) < 0
 
 
     def __eq__(self, value: object) -> bool:
-        return isinstance(value, BaseLuppExpr) and \
-               type(self) == type(value) and \
-               super().__eq__(value) and \
-               self.negated == value.negated
+        # I nodi sono internati, quindi due espressioni uguali sono lo stesso oggetto
+        return self is value
 
     def __hash__(self):
-        return hash((self.name, tuple(self.children), self.negated))
+        return self._hash
     
     
-    type_priority = {
-            'Rational': 1,
-            'Mult': 2,
-            'Pow': 3,
-            'Symbol': 4,
-            'Add': 5
-        }
\ No newline at end of file
+    # Numero massimo di elementi delle chiavi di ordinamento. Le chiavi più lunghe vengono troncate
+    sortKeyLength = 16
+
+    # Priorità dei tipi nell'ordinamento dei figli, indicizzata dal tag del nodo:
+    # Rational, Mult, Pow, Symbol e infine Add
+    type_priority = (1, 4, 5, 2, 3)
+
+    # Operazioni con cui vengono ridotti i nodi con tutti i figli razionali, indicizzate dal tag del nodo
+    rationalOperations = (None, None, lambda x, y: x + y, lambda x, y: x * y, None)
\ No newline at end of file
@@ -0,0 +1,550 @@
+from array import array
+from functools import cmp_to_key, reduce
+
+from src.expression.BaseLuppExpr import BaseLuppExpr
+from src.expression.leaf import Rational, Symbol
+from src.expression.nodes import Add, Mult, Pow
+from src.utils.NodeKind import NodeKind
+
+
+class ExprArena:
+    '''
+    This class is a compact, array backed storage for expressions.
+    Instead of one Python object per node, every node is a row of a set of parallel
+    arrays (kind code, sign, payload and child offsets), while rational values
+    are kept in a coefficient table. Nodes are appended in postfix order, so the
+    children of a node always have a smaller index than the node itself, and
+    identical nodes are stored only once.
+    Nodes are identified by their integer index. The methods simplify, expand, derive
+    and substitute work directly on the arena and give the same results of the
+    corresponding methods of BaseLuppExpr.
+    '''
+
+    # I codici dei nodi sono i tag delle classi delle espressioni
+    RATIONAL = NodeKind.RATIONAL
+    SYMBOL = NodeKind.SYMBOL
+    ADD = NodeKind.ADD
+    MULT = NodeKind.MULT
+    POW = NodeKind.POW
+
+    # Stessa priorità utilizzata da BaseLuppExpr per ordinare i figli
+    __TYPE_PRIORITY = BaseLuppExpr.type_priority
+
+    def __init__(self):
+        '''
+        This method initializes an empty arena.
+        '''
+        self.kinds = array('B')
+        self.negated = array('B')
+        # Per i razionali è l'indice nella tabella dei coefficienti,
+        # per i simboli il codice del carattere
+        self.payloads = array('q')
+        # I figli del nodo i sono childIndexes[childOffsets[i]:childOffsets[i+1]]
+        self.childOffsets = array('q', [0])
+        self.childIndexes = array('q')
+        self.coefficients = []
+        self.__coefficientIndex = {}
+        # I nodi vengono deduplicati sull'hash della loro riga: le righe diverse con lo stesso
+        # hash, molto rare, sono indicizzate per la riga completa
+        self.__nodeIndex = {}
+        self.__collisions = {}
+        # Ordine dei figli, uguale a quello delle chiavi di ordinamento di BaseLuppExpr
+        self.__sortKey = cmp_to_key(self.__compare)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    ###############
+    # COSTRUZIONE #
+    ###############
+
+    def rational(self, value: Rational):
+        '''
+        This method returns the index of the node representing the given Rational.
+        '''
+        coefficient = self.__coefficientIndex.get(value)
+        if coefficient is None:
+            coefficient = self.__coefficientIndex[value] = len(self.coefficients)
+            self.coefficients.append(value)
+        return self.__node(self.RATIONAL, value.negated, coefficient, ())
+
+    def symbol(self, char: str, negated = False):
+        '''
+        This method returns the index of the node representing the given symbol.
+        '''
+        return self.__node(self.SYMBOL, negated, ord(char), ())
+
+    def add(self, addends, negated = False):
+        '''
+        This method returns the index of the sum of the given nodes.
+        '''
+        assert len(addends) > 1, "addends must be at least two elements"
+        return self.__node(self.ADD, negated, 0, sorted(addends, key = self.__sortKey))
+
+    def mult(self, factors, negated = False):
+        '''
+        This method returns the index of the product of the given nodes.
+        '''
+        assert len(factors) > 1, "factors must be at least two elements"
+        return self.__node(self.MULT, negated, 0, sorted(factors, key = self.__sortKey))
+
+    def pow(self, base, exponent, negated = False):
+        '''
+        This method returns the index of the power with the given base and exponent.
+        '''
+        return self.__node(self.POW, negated, 0, (base, exponent))
+
+    def __node(self, kind, negated, payload, children):
+        row = (kind, bool(negated), payload, *children)
+        key = hash(row)
+        index = self.__nodeIndex.get(key)
+        if index is not None and self.__row(index) != row:
+            index = self.__collisions.get(row)
+        if index is None:
+            index = len(self.kinds)
+            if key in self.__nodeIndex:
+                self.__collisions[row] = index
+            else:
+                self.__nodeIndex[key] = index
+            self.kinds.append(kind)
+            self.negated.append(negated)
+            self.payloads.append(payload)
+            self.childIndexes.extend(children)
+            self.childOffsets.append(len(self.childIndexes))
+        return index
+
+    def __row(self, index):
+        '''
+        Return the row of the node as a tuple of kind, sign, payload and children.
+        '''
+        return (self.kinds[index], bool(self.negated[index]), self.payloads[index], *self.children(index))
+
+    def children(self, index):
+        '''
+        This method returns the indexes of the children of the given node.
+        '''
+        return self.childIndexes[self.childOffsets[index]:self.childOffsets[index + 1]]
+
+    def coefficient(self, index):
+        '''
+        This method returns the Rational stored in the given rational node.
+        '''
+        return self.coefficients[self.payloads[index]]
+
+    def withNegation(self, index, negated):
+        '''
+        This method returns the index of the given node with the given negation.
+        '''
+        if bool(self.negated[index]) == negated:
+            return index
+        kind = self.kinds[index]
+        if kind == self.RATIONAL:
+            return self.rational(self.coefficient(index).copy_with(negated = negated))
+        return self.__node(kind, negated, self.payloads[index], self.children(index))
+
+    def withChildren(self, index, children):
+        '''
+        This method returns the index of the given node with the given children.
+        '''
+        match self.kinds[index]:
+            case self.ADD:
+                return self.add(children, bool(self.negated[index]))
+            case self.MULT:
+                return self.mult(children, bool(self.negated[index]))
+            case self.POW:
+                return self.pow(children[0], children[1], bool(self.negated[index]))
+        return index
+
+    ##############
+    # CONVERSIONI #
+    ##############
+
+    def fromExpr(self, expr: BaseLuppExpr):
+        '''
+        This method stores the given expression in the arena and returns the index of its root.
+        The expression is visited iteratively and shared subexpressions are stored once.
+        '''
+        converted = {}
+        stack = [(expr, False)]
+        while stack:
+            node, visited = stack.pop()
+            if node in converted:
+                continue
+            if not visited:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children if child not in converted)
+                continue
+            children = [converted[child] for child in node.children]
+            match node.kind:
+                case self.RATIONAL:
+                    converted[node] = self.rational(node)
+                case self.SYMBOL:
+                    converted[node] = self.symbol(node.getPayload(), node.negated)
+                case self.ADD:
+                    converted[node] = self.add(children, node.negated)
+                case self.MULT:
+                    converted[node] = self.mult(children, node.negated)
+                case self.POW:
+                    converted[node] = self.pow(children[0], children[1], node.negated)
+        return converted[expr]
+
+    def toExpr(self, root):
+        '''
+        This method converts the node with the given index back to a BaseLuppExpr.
+        '''
+        converted = {}
+        for index in self.__reachable(root):
+            children = [converted[child] for child in self.children(index)]
+            negated = bool(self.negated[index])
+            match self.kinds[index]:
+                case self.RATIONAL:
+                    converted[index] = self.coefficient(index)
+                case self.SYMBOL:
+                    converted[index] = Symbol(chr(self.payloads[index]), negated)
+                case self.ADD:
+                    converted[index] = Add(children, negated)
+                case self.MULT:
+                    converted[index] = Mult(children, negated)
+                case self.POW:
+                    converted[index] = Pow(children[0], children[1], negated)
+        return converted[root]
+
+    def __reachable(self, root, skipExponents = False):
+        '''
+        Return the indexes of the nodes reachable from root in postfix order.
+        Since children always precede their parents, sorting the indexes is enough.
+        If skipExponents is True, the exponents of the powers are not visited.
+        '''
+        seen = {root}
+        stack = [root]
+        while stack:
+            index = stack.pop()
+            children = self.children(index)
+            if skipExponents and self.kinds[index] == self.POW:
+                children = children[:1]
+            for child in children:
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return sorted(seen)
+
+    ###############
+    # ORDINAMENTO #
+    ###############
+
+    def __compare(self, first, second):
+        '''
+        Compare two nodes like the canonical order of BaseLuppExpr: by type priority, then by children or
+        leaf key, then by sign. The order is computed from the arrays, so no key is stored for the
+        nodes. The pairs of children still to be compared are kept on an explicit stack, so the depth
+        of the nodes is not limited by the recursion limit. Return a negative number, zero or a positive number.
+        '''
+        kinds, negated = self.kinds, self.negated
+        # Ogni elemento è una coppia di nodi da confrontare, oppure, se closing è vero, la coppia di
+        # nodi i cui figli sono già stati confrontati e di cui restano il numero dei figli e il segno
+        stack = [(first, second, False)]
+        while stack:
+            first, second, closing = stack.pop()
+            if closing:
+                firstChildren, secondChildren = self.children(first), self.children(second)
+                if len(firstChildren) != len(secondChildren):
+                    return len(firstChildren) - len(secondChildren)
+                if negated[first] != negated[second]:
+                    return negated[first] - negated[second]
+                continue
+            if first == second:
+                continue
+            priority = self.__TYPE_PRIORITY[kinds[first]] - self.__TYPE_PRIORITY[kinds[second]]
+            if priority != 0:
+                return priority
+            if kinds[first] > self.SYMBOL:
+                # I figli vengono confrontati in ordine lessicografico: le coppie sono inserite al contrario
+                stack.append((first, second, True))
+                stack.extend((firstChild, secondChild, False) for firstChild, secondChild
+                             in reversed(list(zip(self.children(first), self.children(second)))))
+                continue
+            firstName, secondName = self.__leafName(first), self.__leafName(second)
+            if firstName != secondName:
+                return -1 if firstName < secondName else 1
+            if negated[first] != negated[second]:
+                return negated[first] - negated[second]
+        return 0
+
+    def __leafName(self, index):
+        if self.kinds[index] == self.RATIONAL:
+            return self.coefficient(index).leafKey()
+        return ("-" if self.negated[index] else "") + chr(self.payloads[index])
+
+    ###################
+    # SEMPLIFICAZIONE #
+    ###################
+
+    def simplify(self, root):
+        '''
+        This method simplifies the node with the given index and returns the index of the result.
+        Nodes are simplified bottom-up, so every node is simplified only once.
+        '''
+        simplified = {}
+        for index in self.__reachable(root):
+            self.__simplify(index, simplified)
+        return simplified[root]
+
+    def __simplify(self, index, simplified):
+        if index in simplified:
+            return simplified[index]
+        kind = self.kinds[index]
+        if kind == self.RATIONAL:
+            result = self.rational(self.coefficient(index).simplify())
+        elif kind == self.SYMBOL:
+            result = index
+        else:
+            node = self.withChildren(index, [self.__simplify(child, simplified) for child in self.children(index)])
+            result = self.__simplifyRational(index, node)
+            if result is None:
+                match kind:
+                    case self.ADD:
+                        result = self.__simplifyAdd(node, simplified)
+                    case self.MULT:
+                        result = self.__simplifyMult(node, simplified)
+                    case self.POW:
+                        result = self.__simplifyPow(node, simplified)
+                if result != node:
+                    result = self.__simplify(result, simplified)
+        simplified[index] = result
+        return result
+
+    def __simplifyRational(self, index, node):
+        '''
+        Fold the node to a rational if all its children are rational. See BaseLuppExpr.simplify.
+        '''
+        children = self.children(node)
+        if not all(self.kinds[child] == self.RATIONAL for child in children):
+            return None
+        values = [self.coefficient(child) for child in children]
+        if self.kinds[index] == self.POW:
+            rationalResult, approx = values[0] ** values[1]
+            negated = bool(self.negated[index]) != rationalResult.negated
+            return None if approx else self.rational(rationalResult.copy_with(negated = negated).simplify())
+        operation = (lambda x, y: x + y) if self.kinds[index] == self.ADD else (lambda x, y: x * y)
+        rationalResult = reduce(operation, values)
+        negated = bool(self.negated[index]) != rationalResult.negated
+        return self.rational(rationalResult.copy_with(negated = negated).simplify())
+
+    def __simplifyAdd(self, node, simplified):
+        children = []
+        cumulatedSum = Rational(0)
+        multiplicativeFactors = {}
+        for addend in self.children(node):
+            kind = self.kinds[addend]
+            if kind == self.ADD:
+                if self.negated[addend]:
+                    children.extend(self.withNegation(child, not self.negated[child]) for child in self.children(addend))
+                else:
+                    children.extend(self.children(addend))
+            elif kind == self.RATIONAL:
+                cumulatedSum += self.coefficient(addend)
+            else:
+                rationalPart = Rational(1, negated = bool(self.negated[addend]))
+                addend = self.withNegation(addend, False)
+                factors = self.children(addend)
+                if kind == self.MULT and self.kinds[factors[0]] == self.RATIONAL:
+                    rationalPart *= self.coefficient(factors[0])
+                    addend = factors[1] if len(factors) == 2 else self.mult(factors[1:])
+                if addend in multiplicativeFactors:
+                    multiplicativeFactors[addend] += rationalPart
+                else:
+                    multiplicativeFactors[addend] = rationalPart
+
+        if not cumulatedSum.isZero():
+            children.append(self.rational(cumulatedSum))
+        for factor, rational in multiplicativeFactors.items():
+            if rational.isOne():
+                children.append(factor)
+            elif rational.copy_with(negated = False).isOne():
+                children.append(self.withNegation(factor, not self.negated[factor]))
+            else:
+                children.append(self.__simplify(self.mult([self.rational(rational), factor]), simplified))
+
+        if len(children) == 0:
+            return self.rational(Rational(0))
+        negated = bool(self.negated[node])
+        if len(children) > 1:
+            return self.add(children, negated)
+        return self.withNegation(children[0], negated != bool(self.negated[children[0]]))
+
+    def __simplifyMult(self, node, simplified):
+        children = []
+        cumulatedFactor = Rational(1)
+        sameBaseElements = {}
+
+        factors = self.children(node)
+        negation = reduce(lambda res, child: res != bool(self.negated[child]), factors, bool(self.negated[node]))
+        for factor in [self.withNegation(child, False) for child in factors]:
+            kind = self.kinds[factor]
+            if kind == self.MULT:
+                children.extend(self.children(factor))
+            elif kind == self.RATIONAL:
+                cumulatedFactor *= self.coefficient(factor)
+            elif kind == self.POW:
+                base, exponent = self.children(factor)
+                sameBaseElements.setdefault(base, []).append(exponent)
+            else:
+                sameBaseElements.setdefault(factor, []).append(self.rational(Rational(1)))
+
+        for element, exponents in sameBaseElements.items():
+            exp = self.__simplify(self.add(exponents), simplified) if len(exponents) > 1 else exponents[0]
+            if self.kinds[exp] == self.RATIONAL and self.coefficient(exp).isZero():
+                children.append(self.rational(Rational(1)))
+            elif self.kinds[exp] == self.RATIONAL and self.coefficient(exp).isOne():
+                children.append(element)
+            else:
+                children.append(self.pow(element, exp))
+
+        if len(children) == 0:
+            return self.rational(cumulatedFactor.copy_with(negated = negation))
+        if cumulatedFactor.isZero():
+            return self.rational(Rational(0))
+        if not cumulatedFactor.isOne():
+            if cumulatedFactor.copy_with(negated = False).isOne():
+                children[0] = self.withNegation(children[0], not self.negated[children[0]])
+            else:
+                children.insert(0, self.rational(cumulatedFactor))
+        if len(children) > 1:
+            return self.mult(children, negation)
+        return self.withNegation(children[0], negation)
+
+    def __simplifyPow(self, node, simplified):
+        base, exponent = self.children(node)
+        negated = bool(self.negated[node])
+        if self.kinds[base] == self.RATIONAL:
+            if self.coefficient(base).isZero():
+                return self.rational(Rational(0))
+            if self.coefficient(base).isOne():
+                return self.rational(Rational(1, negated = negated))
+        if self.kinds[exponent] == self.RATIONAL:
+            if self.coefficient(exponent).isZero():
+                return self.rational(Rational(1, negated = negated))
+            if self.coefficient(exponent).isOne():
+                return self.withNegation(base, negated != bool(self.negated[base]))
+        if self.negated[base]:
+            if self.kinds[exponent] != self.RATIONAL or self.coefficient(exponent).denominator % 2 == 0:
+                return self.pow(base, exponent, negated)
+            negated = negated != (self.coefficient(exponent).numerator % 2 == 1)
+            return self.__simplify(self.pow(self.withNegation(base, False), exponent, negated), simplified)
+        if self.kinds[base] == self.POW:
+            innerBase, innerExponent = self.children(base)
+            return self.__simplify(self.pow(innerBase, self.mult([innerExponent, exponent]), negated), simplified)
+        if self.kinds[base] == self.RATIONAL and self.kinds[exponent] == self.RATIONAL \
+            and (radical := self.coefficient(base).extractRadical(self.coefficient(exponent))) is not None:
+            coefficient, radicand, rootExponent = radical
+            return self.mult([self.rational(coefficient), self.pow(self.rational(radicand), self.rational(rootExponent))], negated)
+        return self.pow(base, exponent, negated)
+
+    ##############
+    # ESPANSIONE #
+    ##############
+
+    def expand(self, root):
+        '''
+        This method expands the node with the given index once, like BaseLuppExpr.expand,
+        and returns the index of the result.
+        '''
+        expanded = {}
+        for index in self.__reachable(root):
+            self.__expand(index, expanded)
+        return expanded[root]
+
+    def __expand(self, index, expanded):
+        if index in expanded:
+            return expanded[index]
+        kind = self.kinds[index]
+        negated = bool(self.negated[index])
+        if kind == self.RATIONAL or kind == self.SYMBOL:
+            result = index
+        elif kind == self.POW:
+            result = self.__expandPow(index, expanded)
+        else:
+            # Come in BaseLuppExpr.baseExpansion, i figli espansi vengono riordinati
+            children = self.children(self.withChildren(index, [self.__expand(child, expanded) for child in self.children(index)]))
+            if kind == self.ADD:
+                if negated:
+                    children = [self.withNegation(self.__expand(child, expanded), not self.negated[child]) for child in children]
+                result = self.add(children)
+            else:
+                result = children[0]
+                for child in children[1:]:
+                    firstElToMultiply = self.children(result) if self.kinds[result] == self.ADD else [result]
+                    secondElToMultiply = self.children(child) if self.kinds[child] == self.ADD else [child]
+                    elementsInProd = [self.mult([element, secondElement]) for element in firstElToMultiply for secondElement in secondElToMultiply]
+                    result = self.add(elementsInProd) if len(elementsInProd) > 1 else elementsInProd[0]
+                result = self.withNegation(result, bool(self.negated[result]) != negated)
+        expanded[index] = result
+        return result
+
+    def __expandPow(self, index, expanded):
+        # Come in BaseLuppExpr.baseExpansion, base ed esponente vengono espansi prima della potenza
+        newBase, exponent = (self.__expand(child, expanded) for child in self.children(index))
+        negated = bool(self.negated[index])
+        if self.kinds[exponent] != self.RATIONAL:
+            return self.pow(newBase, exponent, negated)
+        rationalExponent = self.coefficient(exponent)
+        # Come nella semplificazione, una potenza con esponente zero vale uno
+        if rationalExponent.numerator == 0:
+            return self.rational(Rational(1, negated = negated))
+        if rationalExponent.numerator != 1:
+            newBase = self.mult([newBase] * rationalExponent.numerator)
+        exp = Rational(1, rationalExponent.denominator, rationalExponent.negated)
+        if exp.isOne():
+            return self.withNegation(newBase, negated)
+        return self.pow(newBase, self.rational(exp), negated)
+
+    ##############
+    # DERIVAZIONE #
+    ##############
+
+    def derive(self, root, symbol):
+        '''
+        This method derives the node with the given index with respect to the symbol node
+        with the given index and returns the index of the result.
+        '''
+        assert self.kinds[symbol] == self.SYMBOL, "The symbol must be a Symbol node"
+        derived = {}
+        simplified = {}
+        # Gli esponenti delle potenze non vengono derivati
+        for index in self.__reachable(root, skipExponents = True):
+            kind = self.kinds[index]
+            children = self.children(index)
+            negated = bool(self.negated[index])
+            match kind:
+                case self.RATIONAL:
+                    result = self.rational(Rational(0))
+                case self.SYMBOL:
+                    result = self.rational(Rational(1) if index == symbol else Rational(0))
+                case self.ADD:
+                    result = self.__simplify(self.add([derived[child] for child in children], negated), simplified)
+                case self.MULT:
+                    addends = [self.mult([derived[child], *children[:i], *children[i+1:]]) for i, child in enumerate(children)]
+                    result = self.__simplify(self.add(addends, negated), simplified)
+                case self.POW:
+                    base, exponent = children
+                    assert self.kinds[exponent] == self.RATIONAL, "Cannot derive a power with a non rational exponent"
+                    decreasedExponent = self.add([exponent, self.rational(Rational(-1))])
+                    result = self.__simplify(self.mult([exponent, self.pow(base, decreasedExponent), derived[base]]), simplified)
+            derived[index] = result
+        return derived[root]
+
+    #################
+    # SOSTITUZIONE #
+    #################
+
+    def substitute(self, root, toBeSubstitued, substitute):
+        '''
+        This method substitutes all the occurrences of the node toBeSubstitued with the node
+        substitute inside the node root, like BaseLuppExpr.substitute. All the parameters and
+        the result are node indexes.
+        '''
+        substituted = {}
+        for index in self.__reachable(root):
+            node = self.withChildren(index, [substituted[child] for child in self.children(index)])
+            substituted[index] = substitute if node == toBeSubstitued else node
+        return substituted[root]
@@ -0,0 +1,302 @@
+import mmap
+import struct
+from hashlib import blake2b
+
+from src.expression.BaseLuppExpr import BaseLuppExpr
+from src.expression.leaf import Rational, Symbol
+from src.expression.nodes import Add, Mult, Pow
+from src.utils.NodeKind import NodeKind
+
+
+class ExprCodec:
+    '''
+    This class encodes lists of expressions in a compact and versioned binary format.
+    The encoding starts with a fixed header, followed by one record for every distinct node,
+    in postfix order, by the indexes of the roots and by a table with the offset of every record.
+    A record is a tag byte, with the kind code of the node and its flags, followed by:
+    - Rational: the numerator and, if it is not an integer, the denominator, as varints.
+      Coefficients that do not fit in 64 bits are written as their length followed by their bytes.
+    - Symbol: the length of the name followed by its utf-8 bytes.
+    - Add and Mult: the number of children followed by the back references to them.
+    - Pow: the back references to the base and to the exponent.
+    A back reference is the difference between the index of the node and the index of the child,
+    so every shared subtree is written once. The offsets table allows to decode any node without
+    reading the ones before it, so an encoding can be mapped in memory and decoded lazily, see EncodedExprs.
+    '''
+
+    MAGIC = b"LUPX"
+    VERSION = 1
+    # Magic, versione, numero dei nodi, offset delle radici e offset della tabella dei record
+    HEADER = struct.Struct("<4sB3xQQQ")
+    OFFSET = struct.Struct("<Q")
+
+    # Bit del byte di tipo di un record. I 5 bit bassi sono il codice del tipo
+    KIND_MASK = 0x1F
+    INTEGER_FLAG = 0x20
+    BIG_FLAG = 0x40
+    NEGATED_FLAG = 0x80
+
+    # Limite oltre il quale i coefficienti vengono scritti come sequenza di byte
+    __VARINT_BOUND = 1 << 64
+
+    @staticmethod
+    def dumps(expr: BaseLuppExpr):
+        '''
+        This method returns the encoding of the expression as bytes.
+        '''
+        return ExprCodec.dumpsAll([expr])
+
+    @staticmethod
+    def dumpsAll(exprs: list):
+        '''
+        This method returns the encoding of the list of expressions as bytes.
+        The subtrees shared by different expressions are written once.
+        '''
+        records, offsets, roots = ExprCodec.__encodeRecords(exprs)
+        rootsOffset = ExprCodec.HEADER.size + len(records)
+        rootsSection = bytearray()
+        ExprCodec.writeVarint(rootsSection, len(roots))
+        for root in roots:
+            ExprCodec.writeVarint(rootsSection, root)
+        indexOffset = rootsOffset + len(rootsSection)
+        header = ExprCodec.HEADER.pack(ExprCodec.MAGIC, ExprCodec.VERSION, len(offsets), rootsOffset, indexOffset)
+        index = struct.pack(f"<{len(offsets)}Q", *(ExprCodec.HEADER.size + offset for offset in offsets))
+        return b"".join((header, records, rootsSection, index))
+
+    @staticmethod
+    def dump(exprs: list, path: str):
+        '''
+        This method writes the encoding of the list of expressions to the file with the given path.
+        '''
+        with open(path, "wb") as file:
+            file.write(ExprCodec.dumpsAll(exprs))
+
+    @staticmethod
+    def loads(data):
+        '''
+        This method decodes the first expression of the encoding. The data can be bytes, a memoryview or an mmap.
+        '''
+        return EncodedExprs(data)[0]
+
+    @staticmethod
+    def loadsAll(data):
+        '''
+        This method decodes the list of all the expressions of the encoding.
+        '''
+        encoded = EncodedExprs(data)
+        return [encoded[index] for index in range(len(encoded))]
+
+    @staticmethod
+    def load(path: str):
+        '''
+        This method maps in memory the file with the given path, in read only mode, and returns
+        the EncodedExprs that decodes its expressions lazily. The file is closed by close.
+        '''
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        return EncodedExprs(mapped)
+
+    @staticmethod
+    def contentHash(expr: BaseLuppExpr):
+        '''
+        This method returns a hash of the content of the expression as a string of hexadecimal digits.
+        Unlike the builtin hash, it does not depend on the process: the children of the nodes are in
+        canonical order, so equal expressions have the same encoding. The hash is memoized on the node.
+        '''
+        if (memo := expr.__dict__.get("_contentHash")) is not None:
+            return memo
+        records, _, _ = ExprCodec.__encodeRecords([expr])
+        digest = blake2b(bytes((ExprCodec.VERSION,)) + records, digest_size = 16).hexdigest()
+        BaseLuppExpr.setCache(expr, "_contentHash", digest)
+        return digest
+
+    ############
+    # CODIFICA #
+    ############
+
+    @staticmethod
+    def writeVarint(out: bytearray, value: int):
+        '''
+        This method appends the non negative integer to the buffer as an unsigned LEB128 varint.
+        '''
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    @staticmethod
+    def writeBigInt(out: bytearray, value: int):
+        '''
+        This method appends the non negative integer to the buffer as its length in bytes followed by its little endian bytes.
+        '''
+        data = value.to_bytes((value.bit_length() + 7) // 8, "little")
+        ExprCodec.writeVarint(out, len(data))
+        out += data
+
+    @staticmethod
+    def __encodeRecords(exprs: list):
+        '''
+        This method writes the records of the distinct nodes of the expressions in postfix order.
+        Return the records, the list of their offsets and the indexes of the roots.
+        '''
+        records = bytearray()
+        offsets = []
+        indexes = {}
+        for expr in exprs:
+            for node in BaseLuppExpr.postOrder(expr, prune = lambda node: node in indexes):
+                index = len(offsets)
+                offsets.append(len(records))
+                tag = node.kind | (ExprCodec.NEGATED_FLAG if node.negated else 0)
+                match node.kind:
+                    case NodeKind.RATIONAL:
+                        big = node.numerator >= ExprCodec.__VARINT_BOUND or node.denominator >= ExprCodec.__VARINT_BOUND
+                        write = ExprCodec.writeBigInt if big else ExprCodec.writeVarint
+                        tag |= (ExprCodec.BIG_FLAG if big else 0) | (ExprCodec.INTEGER_FLAG if node.denominator == 1 else 0)
+                        records.append(tag)
+                        write(records, node.numerator)
+                        if node.denominator != 1:
+                            write(records, node.denominator)
+                    case NodeKind.SYMBOL:
+                        records.append(tag)
+                        name = node.getPayload().encode("utf-8")
+                        ExprCodec.writeVarint(records, len(name))
+                        records += name
+                    case _:
+                        records.append(tag)
+                        if node.kind != NodeKind.POW:
+                            ExprCodec.writeVarint(records, len(node.children))
+                        for child in node.children:
+                            ExprCodec.writeVarint(records, index - indexes[child])
+                indexes[node] = index
+        return records, offsets, [indexes[expr] for expr in exprs]
+
+
+class EncodedExprs:
+    '''
+    This class is a read only view of an encoding of ExprCodec. Only the header is read when the
+    view is created: the expressions are decoded when they are requested, and only the records of
+    the nodes reachable from them are read. The decoded nodes are kept, so every record is decoded once.
+    The view can be used as a context manager, that closes the mapped file at the end.
+    '''
+
+    def __init__(self, data):
+        '''
+        This method initializes the view over the data, that can be bytes, a memoryview or an mmap.
+        Raise ValueError if the data is not an encoding of a supported version.
+        '''
+        if len(data) < ExprCodec.HEADER.size:
+            raise ValueError("Data is too short to be an encoded expression")
+        magic, version, self.nodeCount, self.rootsOffset, self.indexOffset = ExprCodec.HEADER.unpack_from(data, 0)
+        if magic != ExprCodec.MAGIC:
+            raise ValueError("Data is not an encoded expression")
+        if version != ExprCodec.VERSION:
+            raise ValueError(f"Unsupported encoding version {version}")
+        if self.indexOffset + self.nodeCount * ExprCodec.OFFSET.size > len(data):
+            raise ValueError("Encoded expression is truncated")
+        self.data = data
+        self.roots = []
+        position = self.rootsOffset
+        count, position = self.readVarint(position)
+        for _ in range(count):
+            root, position = self.readVarint(position)
+            self.roots.append(root)
+        self.__nodes = {}
+
+    def __len__(self):
+        return len(self.roots)
+
+    def __getitem__(self, index: int):
+        '''
+        This method decodes the expression with the given index.
+        '''
+        return self.node(self.roots[index])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        '''
+        This method closes the mapped file, if the view was created over an mmap.
+        The expressions already decoded remain valid.
+        '''
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def readVarint(self, position: int):
+        '''
+        This method reads an unsigned LEB128 varint. Return the value and the position after it.
+        '''
+        data = self.data
+        value = shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value, position
+            shift += 7
+
+    def readBigInt(self, position: int):
+        '''
+        This method reads an integer written by ExprCodec.writeBigInt. Return the value and the position after it.
+        '''
+        length, position = self.readVarint(position)
+        return int.from_bytes(self.data[position:position + length], "little"), position + length
+
+    def node(self, index: int):
+        '''
+        This method decodes the node with the given index, decoding before it the nodes
+        it refers to that have not been decoded yet. The visit uses an explicit stack.
+        '''
+        nodes = self.__nodes
+        stack = [index]
+        while stack:
+            current = stack[-1]
+            if current in nodes:
+                stack.pop()
+                continue
+            (offset,) = ExprCodec.OFFSET.unpack_from(self.data, self.indexOffset + current * ExprCodec.OFFSET.size)
+            tag = self.data[offset]
+            kind, negated = tag & ExprCodec.KIND_MASK, tag & ExprCodec.NEGATED_FLAG != 0
+            position = offset + 1
+            match kind:
+                case NodeKind.RATIONAL:
+                    read = self.readBigInt if tag & ExprCodec.BIG_FLAG else self.readVarint
+                    numerator, position = read(position)
+                    denominator = 1
+                    if not tag & ExprCodec.INTEGER_FLAG:
+                        denominator, position = read(position)
+                    nodes[current] = Rational(numerator, denominator, negated)
+                    stack.pop()
+                case NodeKind.SYMBOL:
+                    length, position = self.readVarint(position)
+                    nodes[current] = Symbol(bytes(self.data[position:position + length]).decode("utf-8"), negated)
+                    stack.pop()
+                case NodeKind.ADD | NodeKind.MULT | NodeKind.POW:
+                    arity = 2
+                    if kind != NodeKind.POW:
+                        arity, position = self.readVarint(position)
+                    children = []
+                    for _ in range(arity):
+                        reference, position = self.readVarint(position)
+                        children.append(current - reference)
+                    missing = [child for child in children if child not in nodes]
+                    if missing:
+                        stack.extend(missing)
+                        continue
+                    children = [nodes[child] for child in children]
+                    # I figli sono già nell'ordine canonico in cui sono stati scritti
+                    match kind:
+                        case NodeKind.ADD:
+                            nodes[current] = Add(children, negated, presorted = True)
+                        case NodeKind.MULT:
+                            nodes[current] = Mult(children, negated, presorted = True)
+                        case NodeKind.POW:
+                            nodes[current] = Pow(children[0], children[1], negated)
+                    stack.pop()
+                case _:
+                    raise ValueError(f"Unknown node kind {kind} in encoded expression")
+        return nodes[index]
@@ -0,0 +1,23 @@
+from src.expression.BaseLuppExpr import BaseLuppExpr
+from src.utils.NodeKind import NodeKind
+
+
+class ExprOrder:
+    '''
+    This class implements the total order used by the ordering conditions of the interpreter.
+    Two rational numbers are compared exactly by value. Every other pair of expressions is compared
+    with the canonical order of BaseLuppExpr, see BaseLuppExpr.compare: the rational numbers come before
+    all the other expressions, so the order is total.
+    '''
+
+    @staticmethod
+    def compare(left: BaseLuppExpr, right: BaseLuppExpr):
+        '''
+        This method returns -1, 0 or 1 if left is less than, equal to or greater than right.
+        '''
+        # I nodi sono internati: due espressioni uguali sono lo stesso oggetto
+        if left is right:
+            return 0
+        if left.kind == NodeKind.RATIONAL and right.kind == NodeKind.RATIONAL:
+            return left.compareTo(right)
+        return -1 if BaseLuppExpr.compare(left, right) < 0 else 1
@@ -0,0 +1,128 @@
+from math import ceil, log
+from random import Random
+
+from src.expression.BaseLuppExpr import BaseLuppExpr
+from src.utils.NodeKind import NodeKind
+
+
+class PolynomialIdentity:
+    '''
+    This class tests probabilistically if two expressions are the same rational function, with the
+    Schwartz-Zippel lemma: if the difference of the two expressions is a non zero rational function
+    whose numerator has degree at most d, it vanishes at a random point modulo a prime p with
+    probability at most d/p. Both expressions are evaluated at random points modulo large primes,
+    without expanding them, and the test is repeated until the probability of a wrong answer is
+    below errorBound. Two expressions that differ at a point are always different.
+    Expressions that contain powers with a non integer or non rational exponent are not rational
+    functions and are compared exactly.
+    '''
+
+    # Primi di Mersenne 2^61-1, 2^89-1, 2^107-1 e 2^127-1
+    primes = ((1 << 61) - 1, (1 << 89) - 1, (1 << 107) - 1, (1 << 127) - 1)
+    # Probabilità massima che due espressioni diverse risultino uguali, compresa tra 0 e 1 esclusi
+    errorBound = 2 ** -40
+    # Tentativi per ogni prova prima di rinunciare, quando il punto annulla un denominatore
+    maxAttempts = 8
+    random = Random()
+
+    @staticmethod
+    def areEqual(left: BaseLuppExpr, right: BaseLuppExpr):
+        '''
+        This method returns True if the two expressions are equal, up to the probability errorBound
+        of answering True for two different rational functions. The answer False is always exact.
+        '''
+        if left is right:
+            return True
+        leftDegrees = PolynomialIdentity.degreeBounds(left)
+        rightDegrees = PolynomialIdentity.degreeBounds(right)
+        if leftDegrees is None or rightDegrees is None:
+            return left == right
+
+        # Grado del numeratore della differenza a/b - c/e = (a*e - c*b) / (b*e)
+        degree = max(1, leftDegrees[0] + rightDegrees[1], rightDegrees[0] + leftDegrees[1])
+        smallestPrime = min(PolynomialIdentity.primes)
+        if degree >= smallestPrime:
+            return left == right
+        trials = max(1, ceil(log(PolynomialIdentity.errorBound) / log(degree / smallestPrime)))
+
+        symbols = sorted(left.freeSymbols | right.freeSymbols)
+        for _ in range(trials):
+            for _ in range(PolynomialIdentity.maxAttempts):
+                prime = PolynomialIdentity.random.choice(PolynomialIdentity.primes)
+                point = {symbol: PolynomialIdentity.random.randrange(prime) for symbol in symbols}
+                values = {}
+                leftValue = PolynomialIdentity.evaluate(left, point, prime, values)
+                if leftValue is not None and (rightValue := PolynomialIdentity.evaluate(right, point, prime, values)) is not None:
+                    break
+            else:
+                # Ogni punto ha annullato un denominatore: le espressioni vengono confrontate esattamente
+                return left == right
+            if leftValue != rightValue:
+                return False
+        return True
+
+    @staticmethod
+    def degreeBounds(expr: BaseLuppExpr):
+        '''
+        This method returns a pair with upper bounds of the total degrees of the numerator and of the
+        denominator of the expression, seen as a quotient of polynomials. Return None if the expression
+        contains a power with an exponent that is not an integer.
+        '''
+        bounds = {}
+        for node in BaseLuppExpr.postOrder(expr, prune = lambda node: node in bounds):
+            match node.kind:
+                case NodeKind.RATIONAL:
+                    bounds[node] = (0, 0)
+                case NodeKind.SYMBOL:
+                    bounds[node] = (1, 0)
+                case NodeKind.ADD:
+                    # a1/b1 + a2/b2 = (a1*b2 + a2*b1) / (b1*b2)
+                    children = [bounds[child] for child in node.children]
+                    denominator = sum(childDenominator for _, childDenominator in children)
+                    bounds[node] = (denominator + max(numerator - childDenominator for numerator, childDenominator in children), denominator)
+                case NodeKind.MULT:
+                    children = [bounds[child] for child in node.children]
+                    bounds[node] = (sum(numerator for numerator, _ in children), sum(denominator for _, denominator in children))
+                case NodeKind.POW:
+                    base, exponent = node.children
+                    if exponent.kind != NodeKind.RATIONAL or exponent.denominator != 1:
+                        return None
+                    numerator, denominator = bounds[base]
+                    if exponent.negated:
+                        numerator, denominator = denominator, numerator
+                    bounds[node] = (numerator * exponent.numerator, denominator * exponent.numerator)
+        return bounds[expr]
+
+    @staticmethod
+    def evaluate(expr: BaseLuppExpr, point: dict, prime: int, values: dict = None):
+        '''
+        This method evaluates the expression modulo the prime, assigning to every symbol its value in point.
+        The exponents of the powers must be integers, see degreeBounds.
+        The values of the nodes are stored in values, so the subexpressions shared by more evaluations
+        at the same point are evaluated once. Return None if a denominator is zero modulo the prime.
+        '''
+        values = {} if values is None else values
+        for node in BaseLuppExpr.postOrder(expr, prune = lambda node: node in values):
+            match node.kind:
+                case NodeKind.RATIONAL:
+                    if node.denominator % prime == 0:
+                        return None
+                    value = node.numerator * pow(node.denominator, -1, prime) % prime
+                case NodeKind.SYMBOL:
+                    value = point[node.getPayload()]
+                case NodeKind.ADD:
+                    value = sum(values[child] for child in node.children) % prime
+                case NodeKind.MULT:
+                    value = 1
+                    for child in node.children:
+                        value = value * values[child] % prime
+                case NodeKind.POW:
+                    base, exponent = node.children
+                    value = values[base]
+                    if exponent.negated and exponent.numerator != 0:
+                        if value == 0:
+                            return None
+                        value = pow(value, -1, prime)
+                    value = pow(value, exponent.numerator, prime)
+            values[node] = (prime - value) % prime if node.negated else value
+        return values[expr]
@@ -1,6 +1,18 @@
 
 from src.expression.BaseLuppExpr import BaseLuppExpr
-from math import gcd
+from math import gcd, isqrt
+from string import ascii_lowercase
+
+from src.utils.NodeKind import NodeKind
+
+class ModularInverseError(ArithmeticError):
+    '''
+    This exception is raised in modular mode when a number that is a multiple of the modulus
+    is inverted, that is when a value is divided by zero modulo the prime.
+    '''
+
+    def __init__(self, value, modulus):
+        super().__init__(f"{value} has no inverse modulo {modulus}")
 
 class Rational(BaseLuppExpr):
     '''
@@ -9,11 +21,29 @@ class Rational(BaseLuppExpr):
     denominator can also be 1 rapresenting an integer.
     '''
 
+    kind = NodeKind.RATIONAL
+
+    # Gli interi con valore assoluto fino a questo limite sono preallocati
+    flyweightBound = 256
+
+    # Modulo primo della modalità modulare, vedi ModularArithmetic. None per l'aritmetica esatta
+    modulus = None
+
+    simplificationOptions = frozenset(("modulus",))
+
+    # Metadati strutturali, vedi BaseLuppExpr.computeMetadata
+    size = 1
+    depth = 1
+    freeSymbols = frozenset()
+    totalDegree = 0
+    hasNonRationalExponent = False
+
     def __init__(self, numerator: int, denominator: int = 1, negated = False):
         '''
         This method initializes the Rational object. Numerator and denominator
-        are stored as integers, and the negated flag is stored as a boolean.
-        The negation at numerator and denominator level is brought to the node level.
+        are stored as integers reduced to lowest terms, and the negated flag is stored as a boolean.
+        The negation at numerator and denominator level is brought to the node level and zero is never negated.
+        The name of the node is built only when it is requested.
         The method takes the following parameters:
         - numerator: the integer numerator of the rational number.
         - denominator: the integer denominator of the rational number. Default is 1. Cannot be 0.
@@ -23,11 +53,33 @@ class Rational(BaseLuppExpr):
 
         # Porto la negazione a livello di nodo e non dei valori
         negated = negated != ((numerator < 0) != (denominator < 0))
-        self.numerator = int(abs(numerator))
-        self.denominator = int(abs(denominator))
+        numerator = int(abs(numerator))
+        denominator = int(abs(denominator))
+        # La frazione è sempre ridotta ai minimi termini
+        common_divisor = gcd(numerator, denominator)
+        if common_divisor != 1:
+            numerator //= common_divisor
+            denominator //= common_divisor
+        self.numerator = numerator
+        self.denominator = denominator
+        super().__init__(None, [], negated and numerator != 0)
 
-        self.__NODE_NAME = str(self.numerator) if denominator == 1 else str(self.numerator)+"/"+str(self.denominator)
-        super().__init__(self.__NODE_NAME,[],negated)
+    @staticmethod
+    def flyweightKey(numerator = None, denominator = 1, negated = False):
+        # Solo gli interi piccoli sono preallocati, indicizzati dal loro valore con segno
+        if denominator != 1 or type(numerator) is not int:
+            return None
+        return -numerator if negated else numerator
+
+    def leafKey(self):
+        return (self.numerator, self.denominator)
+
+    def internKey(self):
+        return (Rational, self.numerator, self.denominator, self.negated)
+
+    @property
+    def name(self):
+        return ("-" + self.getPayload()) if self.negated else self.getPayload()
 
     def copy_with(self, numerator = None, denominator = None, negated = None):
         return Rational(
@@ -37,7 +89,10 @@ class Rational(BaseLuppExpr):
         )
 
     def getPayload(self):
-        return self.__NODE_NAME
+        if (payload := self.__dict__.get("_payload")) is None:
+            payload = str(self.numerator) if self.denominator == 1 else str(self.numerator)+"/"+str(self.denominator)
+            BaseLuppExpr.setCache(self, "_payload", payload)
+        return payload
     
     def isZero(self):
         '''
@@ -53,7 +108,48 @@ class Rational(BaseLuppExpr):
         return (self.numerator == self.denominator and not self.negated) or \
                (abs(self.numerator) == abs(self.denominator) and self.negated)
 
-    def getLatexRapresentation(self):
+    def residue(self):
+        '''
+        This method returns the residue of the rational number modulo Rational.modulus, as the integer
+        of least absolute value. The denominator is inverted modulo the prime.
+        Raise ModularInverseError if the denominator is a multiple of the modulus.
+        '''
+        modulus = Rational.modulus
+        if self.denominator % modulus == 0:
+            raise ModularInverseError(self.denominator, modulus)
+        value = (-self.numerator if self.negated else self.numerator) * pow(self.denominator, -1, modulus) % modulus
+        return value - modulus if 2 * value > modulus else value
+
+    def compareTo(self, other):
+        '''
+        This method compares exactly the value of the rational number with the value of another rational number,
+        cross multiplying numerators and denominators with their sign.
+        The method returns -1, 0 or 1 if the rational number is less than, equal to or greater than the other.
+        Parameters:
+        - other: the Rational object to compare with.
+        '''
+        if self is other:
+            return 0
+        # Con segni diversi il confronto non richiede moltiplicazioni. Lo zero non è mai negato
+        if self.negated != other.negated:
+            return -1 if self.negated else 1
+        if self.denominator == other.denominator:
+            left, right = self.numerator, other.numerator
+        else:
+            left, right = self.numerator * other.denominator, other.numerator * self.denominator
+        if self.negated:
+            left, right = right, left
+        return (left > right) - (left < right)
+
+    def __lt__(self, other):
+        '''
+        This method compares two rational numbers by value. Other nodes are compared with the canonical order.
+        '''
+        if other.kind == NodeKind.RATIONAL:
+            return self.compareTo(other) < 0
+        return super().__lt__(other)
+
+    def buildLatex(self, childLatex, parent = None, notAsFraction = False):
         sign = "-" if self.negated else ""
         if self.denominator == 1:
             return f"{sign}{self.numerator}"
@@ -61,11 +157,8 @@ class Rational(BaseLuppExpr):
             return f"{sign}\\frac{{{self.numerator}}}{{{self.denominator}}}"
 
     def simplify(self):
-        common_divisor = gcd(self.numerator, self.denominator)
-        simplified_num = self.numerator // common_divisor
-        simplified_denom = self.denominator // common_divisor
-        simplified_num = simplified_num if not self.negated else -simplified_num
-        return Rational(simplified_num, simplified_denom)
+        # Il razionale è sempre ridotto ai minimi termini
+        return self
         
     
     def __mul__(self, other):
@@ -107,26 +200,105 @@ class Rational(BaseLuppExpr):
     def __pow__(self, other):
         '''
         This method is used to calculate the power of a rational number with another rational number.
-        If the result is an exact integer, the method returns a Rational object with the integer value.
-        Otherwise, the method returns a Rational object with the calculated numerator and denominator.
-        Note that if the resulting numerator or denominator has decimal value them will be truncated
-        from the Rational object, giving an approximate value.
+        The power is computed exactly on integers: the root given by the denominator of the exponent
+        is taken with integerRoot and then raised to the numerator of the exponent.
+        If the result is not a rational number, like for 2^(1/2) or for an even root of a negative
+        number, the method returns the base itself flagged as approximate.
         The method return a tuple with the Rational object and a boolean that is True if the result is approximate.
         Parameters:
         - other: the Rational object to calculate the power with.
         '''
         if not isinstance(other, Rational):
             raise TypeError("Power is only supported between Rational objects")
-        
-        expValue = other.numerator / other.denominator
-        numerator = self.numerator ** expValue
-        denominator = self.denominator ** expValue
-        approx = (numerator != int(numerator) or denominator != int(denominator))
-        
-        if other.negated:
-            return Rational(denominator, numerator), approx
-        return Rational(numerator, denominator), approx
-        
+
+        # In modalità modulare le potenze intere sono calcolate nel campo, con l'esponenziazione modulare
+        if Rational.modulus is not None and other.denominator == 1:
+            base = self.residue()
+            if base == 0 and other.negated and other.numerator != 0:
+                raise ModularInverseError(self.name, Rational.modulus)
+            value = pow(base, -other.numerator if other.negated else other.numerator, Rational.modulus)
+            return Rational(value - Rational.modulus if 2 * value > Rational.modulus else value), False
+
+        common_divisor = gcd(other.numerator, other.denominator)
+        expNumerator = other.numerator // common_divisor
+        expDenominator = other.denominator // common_divisor
+        numerator, denominator = self.numerator, self.denominator
+        if other.negated and expNumerator != 0:
+            # Lo zero elevato ad un esponente negativo non ha valore
+            if numerator == 0:
+                return self, True
+            numerator, denominator = denominator, numerator
+
+        # Un numero negativo non ha radici reali di indice pari
+        if self.negated and numerator != 0 and expDenominator % 2 == 0:
+            return self, True
+        numeratorRoot, numeratorExact = Rational.integerRoot(numerator, expDenominator)
+        denominatorRoot, denominatorExact = Rational.integerRoot(denominator, expDenominator)
+        if not (numeratorExact and denominatorExact):
+            return self, True
+        negated = self.negated and expNumerator % 2 == 1
+        return Rational(numeratorRoot ** expNumerator, denominatorRoot ** expNumerator, negated), False
+
+    @staticmethod
+    def integerRoot(value: int, n: int):
+        '''
+        This method computes the integer n-th root of a non negative integer with the Newton method on integers.
+        Return a tuple with the floor of the root and a boolean that is True if the root is exact.
+        '''
+        if value < 2 or n == 1:
+            return value, True
+        if n == 2:
+            root = isqrt(value)
+        else:
+            # Si parte da una potenza di due maggiore della radice e si scende fino al valore intero
+            root = 1 << -(-value.bit_length() // n)
+            while (following := ((n - 1) * root + value // root ** (n - 1)) // n) < root:
+                root = following
+        return root, root ** n == value
+
+    # Limite della ricerca per tentativi dei fattori primi nell'estrazione dei radicali
+    radicalTrialBound = 1000
+
+    def extractRadical(self, exponent):
+        '''
+        This method writes the power of the non negated rational number to the rational exponent p/q,
+        when it is not rational, in the simplest radical form c * r^(1/q): c is a rational number and
+        r is an integer whose q-th power factors found by trial division have been moved into c.
+        Return a tuple (c, r, 1/q) with Rational objects, or None if nothing can be extracted.
+        Parameters:
+        - exponent: the Rational exponent of the power.
+        '''
+        common_divisor = gcd(exponent.numerator, exponent.denominator)
+        p, q = exponent.numerator // common_divisor, exponent.denominator // common_divisor
+        numerator, denominator = (self.denominator, self.numerator) if exponent.negated else (self.numerator, self.denominator)
+        if self.negated or numerator == 0 or q == 1:
+            return None
+
+        # (n/d)^(p/q) = (n/d)^k * (n^r * d^(q-r))^(1/q) / d, con p = k*q + r
+        k, r = divmod(p, q)
+        rest = numerator ** r * denominator ** (q - r)
+        outside, radicand = 1, 1
+        factor = 2
+        while factor < Rational.radicalTrialBound and factor * factor <= rest:
+            if rest % factor == 0:
+                multiplicity = 0
+                while rest % factor == 0:
+                    rest //= factor
+                    multiplicity += 1
+                outside *= factor ** (multiplicity // q)
+                radicand *= factor ** (multiplicity % q)
+            factor += 1
+        root, exact = Rational.integerRoot(rest, q)
+        if exact:
+            outside *= root
+        else:
+            radicand *= rest
+
+        coefficient = Rational(numerator ** k * outside, denominator ** (k + 1)).simplify()
+        if coefficient.isOne():
+            return None
+        return coefficient, Rational(radicand), Rational(1, q)
+
     @BaseLuppExpr.baseDerive
     def derive(self, symbol):
         return Rational(0)
@@ -150,8 +322,21 @@ class Symbol(BaseLuppExpr):
         assert (len(char) == 1), "char must be a single character"
         assert (char.isalpha()), "char must be a letter"
         self.__NODE_NAME = char
+        self.freeSymbols = frozenset((char,))
         super().__init__(self.__NODE_NAME,[],negated)
 
+    kind = NodeKind.SYMBOL
+
+    # Metadati strutturali, vedi BaseLuppExpr.computeMetadata
+    size = 1
+    depth = 1
+    totalDegree = 1
+    hasNonRationalExponent = False
+
+    @staticmethod
+    def flyweightKey(char = None, negated = False):
+        return (char, negated)
+
     def copy_with(self, char = None, negated = None):
         return Symbol(
             char = self.__NODE_NAME if char is None else char,
@@ -161,7 +346,7 @@ class Symbol(BaseLuppExpr):
     def getPayload(self):
         return self.__NODE_NAME
     
-    def getLatexRapresentation(self):
+    def buildLatex(self, childLatex, parent = None, notAsFraction = False):
         return f"{'-' if self.negated else ''}{self.__NODE_NAME}"
     
     def simplify(self):
@@ -169,4 +354,12 @@ class Symbol(BaseLuppExpr):
     
     @BaseLuppExpr.baseDerive
     def derive(self, symbol):
-        return Rational(1) if self == symbol else Rational(0)
\ No newline at end of file
+        return Rational(1) if self == symbol else Rational(0)
+
+
+# Tabelle dei flyweight: i piccoli interi e i simboli delle lettere minuscole, con e senza
+# negazione, vengono creati una sola volta e restano sempre in vita
+Rational.flyweights = {}
+Rational.flyweights.update({value: Rational(value) for value in range(-Rational.flyweightBound, Rational.flyweightBound + 1)})
+Symbol.flyweights = {}
+Symbol.flyweights.update({(char, negated): Symbol(char, negated) for char in ascii_lowercase for negated in (False, True)})
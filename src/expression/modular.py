@@ -0,0 +1,119 @@
+from src.expression.BaseLuppExpr import BaseLuppExpr
+from src.expression.leaf import ModularInverseError, Rational
+from src.utils.NodeKind import NodeKind
+
+
+class ModularArithmetic:
+    '''
+    This class implements the modular mode, where the coefficients of the expressions are elements
+    of the field GF(p). Every coefficient is kept as its residue modulo p of least absolute value,
+    and the division is the multiplication by the modular inverse. The exponents of the powers are
+    not coefficients: they are never reduced, so that x^p remains different from x.
+    The powers of numbers with an integer exponent and the products of polynomials are computed
+    modulo p (see Rational.__pow__ and Polynomial.__mul__), while reduce brings the coefficients of
+    an expression to their residues. The interpreter reduces the value of every operation, so the
+    size of the coefficients stays bounded by the size of p.
+    '''
+
+    # Basi del test di Miller-Rabin, sufficienti per un risultato esatto sotto 3.3 * 10^24
+    witnesses = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+    @staticmethod
+    def configure(modulus):
+        '''
+        This method enables the modular mode with the given prime modulus. A modulus of None disables it.
+        The simplified forms memoized on the nodes in another mode are not used, see BaseLuppExpr.getMemo.
+        Raise ValueError if the modulus is not a prime number.
+        '''
+        if modulus is not None and not ModularArithmetic.isPrime(modulus):
+            raise ValueError(f"The modulus {modulus} is not a prime number")
+        Rational.modulus = modulus
+
+    @staticmethod
+    def isPrime(n: int):
+        '''
+        This method checks if the integer is a prime number with the Miller-Rabin test.
+        The result is exact for the integers below 3.3 * 10^24 and probabilistic above.
+        '''
+        if n < 2:
+            return False
+        for witness in ModularArithmetic.witnesses:
+            if n % witness == 0:
+                return n == witness
+        d, s = n - 1, 0
+        while d % 2 == 0:
+            d //= 2
+            s += 1
+        for witness in ModularArithmetic.witnesses:
+            x = pow(witness, d, n)
+            if x == 1 or x == n - 1:
+                continue
+            for _ in range(s - 1):
+                x = x * x % n
+                if x == n - 1:
+                    break
+            else:
+                return False
+        return True
+
+    @staticmethod
+    def reduce(expr: BaseLuppExpr):
+        '''
+        This method returns the simplified expression with every coefficient reduced modulo Rational.modulus.
+        The exponents of the powers are left unchanged. The expression is returned as it is if the
+        modular mode is disabled. The result is memoized on the nodes for the current mode of the
+        simplification, so the subexpressions already reduced are not visited again.
+        Raise ModularInverseError if the base of a power with a negative exponent is a multiple of the modulus.
+        '''
+        modulus = Rational.modulus
+        if modulus is None:
+            return expr
+
+        def memo(node):
+            return BaseLuppExpr.getMemo(node, "_modularForm")
+
+        def memoize(node, reduced):
+            BaseLuppExpr.setMemo(node, "_modularForm", reduced)
+
+        if (reduced := memo(expr)) is not None:
+            return reduced
+
+        # La semplificazione dei coefficienti ridotti può produrre nuovi coefficienti, ad esempio
+        # moltiplicandoli: la riduzione viene ripetuta finché l'espressione non cambia più.
+        # I sottoalberi già ridotti non vengono visitati di nuovo
+        current = expr.simplify()
+        while True:
+            results = {}
+            for node in BaseLuppExpr.postOrder(current, prune = lambda node: memo(node) is not None,
+                                               childrenOf = ModularArithmetic.coefficientChildren):
+                children = [results[child] if child in results else memo(child) for child in ModularArithmetic.coefficientChildren(node)]
+                match node.kind:
+                    case NodeKind.RATIONAL:
+                        results[node] = Rational(node.residue())
+                    case NodeKind.SYMBOL:
+                        results[node] = node
+                    case NodeKind.POW:
+                        base, exponent = children[0], node.children[1]
+                        # Una base multipla del modulo non ha inverso
+                        if base is not node.children[0] and exponent.negated and not (exponent.kind == NodeKind.RATIONAL and exponent.isZero()):
+                            if (simplified := base.simplify()).kind == NodeKind.RATIONAL and simplified.isZero():
+                                raise ModularInverseError(node.children[0].getLatexRapresentation(), modulus)
+                        results[node] = node.copy_with_children([base, exponent]) if base is not node.children[0] else node
+                    case _:
+                        results[node] = node.copy_with_children(children) if any(map(lambda new, old: new is not old, children, node.children)) else node
+                if results[node] is node:
+                    memoize(node, node)
+            reduced = results[current] if current in results else memo(current)
+            if reduced is current:
+                break
+            current = reduced.simplify()
+        memoize(expr, current)
+        return current
+
+    @staticmethod
+    def coefficientChildren(node: BaseLuppExpr):
+        '''
+        This method returns the children of the node that contain coefficients, that is all the
+        children except the exponent of a power.
+        '''
+        return node.children[:1] if node.kind == NodeKind.POW else node.children
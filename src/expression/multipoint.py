@@ -0,0 +1,121 @@
+from fractions import Fraction
+from math import lcm
+
+from src.expression.BaseLuppExpr import BaseLuppExpr
+from src.expression.leaf import Rational
+from src.expression.polynomial import Polynomial
+from src.utils.NodeKind import NodeKind
+
+
+class MultipointEvaluation:
+    '''
+    This class evaluates exactly a univariate polynomial, or a quotient of univariate polynomials,
+    at many rational points. The expression is converted once to the list of its coefficients,
+    so the cost of every point depends on the degree and not on the size of the tree.
+    The evaluation works on integers: the points with denominator b are the numerators a of
+    f(a/b) = g(a) / (D * b^d), where D is the common denominator of the coefficients c_k of f and
+    g has the integer coefficients D * c_k * b^(d-k). The coefficients of g are computed once for
+    every distinct denominator, then g is evaluated at the numerators:
+    - with Horner's rule, for low degrees;
+    - otherwise by binary splitting: pairs of adjacent coefficients are joined with the point, then
+      pairs of the results with the square of the point and so on, so the big multiplications are
+      between numbers of similar size, where the Karatsuba multiplication of Python is faster
+      than the many small multiplications of Horner's rule.
+    '''
+
+    # Grado dal quale viene usata la valutazione per suddivisione binaria
+    splittingThreshold = 256
+
+    @staticmethod
+    def evaluate(expr: BaseLuppExpr, points: list):
+        '''
+        This method returns the list of the exact values of the expression at the points, as Rationals.
+        The points can be Rationals, integers or Fractions.
+        Raise ValueError if the expression has more than one symbol or is not a quotient of polynomials,
+        and ZeroDivisionError if its denominator is zero at a point.
+        '''
+        points = [Polynomial.toFraction(point) if isinstance(point, BaseLuppExpr) else Fraction(point) for point in points]
+        symbols = sorted(expr.freeSymbols)
+        if len(symbols) > 1:
+            raise ValueError("Only expressions with at most one symbol can be evaluated at many points")
+        if len(symbols) == 0:
+            value = expr.simplify()
+            if value.kind != NodeKind.RATIONAL:
+                raise ValueError("The expression is not a quotient of polynomials")
+            return [value] * len(points)
+
+        if (quotient := Polynomial.quotientFromExpr(expr, symbols)) is None:
+            raise ValueError("The expression is not a quotient of polynomials")
+        if quotient[0].isZero():
+            return [Rational(0)] * len(points)
+        numerators = MultipointEvaluation.evaluateFractions(quotient[0].toDense(), points)
+        if quotient[1].isConstant():
+            return [Polynomial.toRational(value / quotient[1].toDense()[0]) for value in numerators]
+        denominators = MultipointEvaluation.evaluateFractions(quotient[1].toDense(), points)
+        return [Polynomial.toRational(numerator / denominator) for numerator, denominator in zip(numerators, denominators)]
+
+    @staticmethod
+    def evaluateFractions(coefficients: list, points: list):
+        '''
+        This method evaluates the polynomial with the given Fraction coefficients at the Fraction points.
+        The points are grouped by denominator, and every group is evaluated on integers.
+        Return the list of the values as Fractions.
+        '''
+        degree = len(coefficients) - 1
+        common = lcm(*(coefficient.denominator for coefficient in coefficients))
+        integers = [coefficient.numerator * (common // coefficient.denominator) for coefficient in coefficients]
+
+        groups = {}
+        for position, point in enumerate(points):
+            groups.setdefault(point.denominator, []).append(position)
+        values = [None] * len(points)
+        for denominator, positions in groups.items():
+            # I coefficienti vengono scalati una volta per ogni denominatore, dalle potenze più alte
+            scaled, power = [], 1
+            for coefficient in reversed(integers):
+                scaled.append(coefficient * power)
+                power *= denominator
+            scaled.reverse()
+            scale = common * denominator ** degree
+            numerators = MultipointEvaluation.evaluateIntegers(scaled, [points[position].numerator for position in positions])
+            for position, numerator in zip(positions, numerators):
+                values[position] = Fraction(numerator, scale)
+        return values
+
+    @staticmethod
+    def evaluateIntegers(coefficients: list, points: list):
+        '''
+        This method evaluates the polynomial with integer coefficients at the integer points.
+        The points that appear more than once are evaluated once.
+        '''
+        evaluate = MultipointEvaluation.horner if len(coefficients) - 1 < MultipointEvaluation.splittingThreshold else MultipointEvaluation.binarySplitting
+        values = {}
+        for point in points:
+            if point not in values:
+                values[point] = evaluate(coefficients, point)
+        return [values[point] for point in points]
+
+    @staticmethod
+    def horner(coefficients: list, point: int):
+        '''
+        This method evaluates the polynomial at the point with Horner's rule.
+        '''
+        value = 0
+        for coefficient in reversed(coefficients):
+            value = value * point + coefficient
+        return value
+
+    @staticmethod
+    def binarySplitting(coefficients: list, point: int):
+        '''
+        This method evaluates the polynomial at the point by binary splitting. At every step the
+        polynomial c_0 + c_1 * x + c_2 * x^2 + ... becomes (c_0 + c_1 * p) + (c_2 + c_3 * p) * y + ...,
+        with y = p^2, halving the number of coefficients.
+        '''
+        values, power = list(coefficients), point
+        while len(values) > 1:
+            if len(values) % 2:
+                values.append(0)
+            values = [values[i] + values[i + 1] * power for i in range(0, len(values), 2)]
+            power *= power
+        return values[0]
@@ -1,9 +1,14 @@
 
 from abc import ABC, abstractmethod
 from functools import reduce
+from operator import attrgetter
 
 from src.expression.BaseLuppExpr import BaseLuppExpr
 from src.expression.leaf import Rational
+from src.expression.rewriting import Pattern, Rule, RuleSet, Wild
+from src.expression.termtree import TermTree
+from src.utils.NodeKind import NodeKind
+
 
 class Add(BaseLuppExpr):
     '''
@@ -12,18 +17,20 @@ class Add(BaseLuppExpr):
     '''
 
     __NODE_NAME = "Add"
+    kind = NodeKind.ADD
     __ABBREV = "S"
 
-    def __init__(self, addends: list, negated = False):
+    def __init__(self, addends: list, negated = False, presorted = False):
         '''
         This method initializes the Add object.
         The method takes the following parameters:
         - addends: the list of addends of the sum. Must be at least two elements.
         - negated: a boolean flag that indicates if the sum is negated. Default is False.
+        - presorted: a boolean flag that indicates if the addends are already sorted by sort key. Default is False.
         '''
         assert (addends is not None), "addends cannot be None"
         assert (len(addends) > 1), "addends must be at least two elements"
-        super().__init__(self.__NODE_NAME, addends, negated)
+        super().__init__(self.__NODE_NAME, addends, negated, presorted)
 
     def copy_with(self, addends = None, negated = None):
         return Add(
@@ -31,46 +38,49 @@ class Add(BaseLuppExpr):
             negated = self.negated if negated is None else negated
         )
 
+    def copy_with_children(self, children):
+        return Add(children, self.negated)
+
     def getPayload(self):
         return self.__ABBREV
     
-    def getLatexRapresentation(self):
+    def buildLatex(self, childLatex, parent = None, notAsFraction = False):
         sign = "-" if self.negated else ""
-        core = self.children[0].getLatexRapresentation()
-        for child in self.children[1:]:
+        core = childLatex[0]
+        for child, latex in zip(self.children[1:], childLatex[1:]):
             # Se il figlio è negato, aggiungo il segno davanti
-            core += ("" if child.negated else "+") + child.getLatexRapresentation()
+            core += ("" if child.negated else "+") + latex
         # Se il nodo è negato o il padre è una moltiplicazione o una potenza, aggiungo le parentesi
-        if self.negated or (self.parent is not None and (isinstance(self.parent, Mult) or isinstance(self.parent, Pow))):
+        if self.negated or (parent is not None and parent.kind in (NodeKind.MULT, NodeKind.POW)):
             core = f"\\left({core}\\right)"
         return sign + core
     
     @BaseLuppExpr.baseSimpl
     def simplify(self):
+        # Importato qui per evitare l'import circolare con il modulo dei polinomi
+        from src.expression.polynomial import Polynomial
+
+        # L'appiattimento e l'elemento neutro sono regole di riscrittura, vedi Add.simplificationRules.
+        # Il risultato di una regola viene semplificato di nuovo da baseSimpl
+        if (rewritten := Add.simplificationRules.applyFirst(self)) is not self:
+            return rewritten
+
         children = []
         cumulatedSum = Rational(0)
         multiplicativeFactors = {}
+        monomials = []
         for addend in self.children:
-            # Se uno degli addendi è una somma, aggiungo i suoi addendi
-            if isinstance(addend, Add):
-                if addend.negated:
-                    children.extend([child.copy_with(negated = not child.negated) for child in addend.children])
-                else:
-                    children.extend(addend.children)
             # Se uno degli addendi è un razionale, lo aggiungo alla somma cumulata
-            elif isinstance(addend, Rational):
+            if addend.kind == NodeKind.RATIONAL:
                 cumulatedSum += addend
             # Se uno degli addendi è un prodotto con un razionale davanti, 
             # aggiungi il prodotto alla lista dei fattori moltiplicativi
             else:
-                rationalPart = Rational(1, negated = addend.negated)
-                addend = addend.copy_with(negated = False)
-                # Se è una moltiplicazione e c'è un razionale davanti
-                if isinstance(addend, Mult) and isinstance(addend.children[0], Rational):
-                    rationalPart *= addend.children[0]
-                    addend = addend.children[1] if len(addend.children) == 2 else Mult(addend.children[1:])
-
-                if addend in multiplicativeFactors:
+                rationalPart, addend = Add.splitCoefficient(addend)
+                # I monomi vengono raccolti nel polinomio sparso, per vettore degli esponenti
+                if Polynomial.isMonomial(addend):
+                    monomials.append((rationalPart, addend))
+                elif addend in multiplicativeFactors:
                     multiplicativeFactors[addend] += rationalPart
                 else:
                     multiplicativeFactors[addend] = rationalPart
@@ -78,17 +88,13 @@ class Add(BaseLuppExpr):
         # Se la somma cumulata non è zero, aggiungila alla lista degli addendi
         if not cumulatedSum.isZero():
             children.append(cumulatedSum)
+        # Aggiungi i monomi con i coefficienti sommati
+        if len(monomials) > 0:
+            polynomial, factors = Polynomial.fromMonomials(monomials)
+            children.extend(polynomial.toAddends(factors))
         # Aggiungi i fattori moltiplicativi alla lista degli addendi
         for factor, rational in multiplicativeFactors.items():
-            # Se il razionale è uno appendo solo il fattore
-            if rational.isOne():
-                children.append(factor)
-            # Se il razionale è -1, appendo il fattore con la negazione invertita
-            elif rational.copy_with(negated = False).isOne():
-                children.append(factor.copy_with(negated = not factor.negated))
-            # Altrimenti appendo il prodotto tra il razionale e il fattore
-            else:
-                children.append(Mult([rational, factor]).simplify())
+            children.append(Add.buildAddend(rational, factor))
         
         # Se la lista degli addendi è vuota, ritorna zero
         if len(children) == 0:
@@ -100,6 +106,169 @@ class Add(BaseLuppExpr):
         
         return children[0].copy_with(negated = self.negated != children[0].negated)
     
+    @staticmethod
+    def fromAddends(addends, negated = False):
+        '''
+        This method builds the sum of the addends, that is zero if there are no addends
+        and the addend itself if there is only one.
+        '''
+        if len(addends) == 0:
+            return Rational(0)
+        if len(addends) == 1:
+            return addends[0].copy_with(negated = negated != addends[0].negated)
+        return Add(addends, negated)
+
+    @staticmethod
+    def flatten(node):
+        '''
+        This method returns the sum with the addends of the nested sums in place of the sums,
+        with their sign brought on the addends.
+        '''
+        addends = []
+        for addend in node.children:
+            if addend.kind != NodeKind.ADD:
+                addends.append(addend)
+            elif addend.negated:
+                addends.extend(child.copy_with(negated = not child.negated) for child in addend.children)
+            else:
+                addends.extend(addend.children)
+        return Add(addends, node.negated)
+
+    @staticmethod
+    def splitCoefficient(addend):
+        '''
+        This method splits an addend in its rational coefficient and in the remaining
+        factor, that is never negated. The sign of the addend is brought into the coefficient.
+        Return a tuple (coefficient, factor).
+        '''
+        rationalPart = Rational(1, negated = addend.negated)
+        addend = addend.copy_with(negated = False)
+        # Se è una moltiplicazione e c'è un razionale davanti
+        if addend.kind == NodeKind.MULT and addend.children[0].kind == NodeKind.RATIONAL:
+            rationalPart *= addend.children[0]
+            addend = addend.children[1] if len(addend.children) == 2 else Mult(addend.children[1:])
+        return rationalPart, addend
+
+    @staticmethod
+    def buildAddend(rational, factor):
+        '''
+        This method builds the simplified addend given by the product of the rational
+        coefficient and the factor. It is the inverse of splitCoefficient.
+        '''
+        # Se il razionale è uno ritorno solo il fattore
+        if rational.isOne():
+            return factor
+        # Se il razionale è -1, ritorno il fattore con la negazione invertita
+        if rational.copy_with(negated = False).isOne():
+            return factor.copy_with(negated = not factor.negated)
+        # Altrimenti ritorno il prodotto tra il razionale e il fattore
+        return Mult([rational, factor]).simplify()
+
+    def computeTotalDegree(self):
+        degrees = list(map(attrgetter("totalDegree"), self.children))
+        return None if None in degrees else max(degrees)
+
+    @staticmethod
+    def getAddends(expr):
+        '''
+        This method returns the list of the addends of the expression, bringing the negation
+        of a sum inside its addends. An expression that is not a sum is its only addend.
+        '''
+        if expr.kind != NodeKind.ADD:
+            return [expr]
+        if expr.negated:
+            return [child.copy_with(negated = not child.negated) for child in expr.children]
+        return list(expr.children)
+
+    def getTermIndex(self):
+        '''
+        This method returns a TermTree that maps the factor of every non rational addend,
+        as given by splitCoefficient, to the addend itself. The factors are distinct since
+        the sum is simplified. The tree is computed once and is persistent, see TermTree.
+        '''
+        if (index := self.__dict__.get("_termIndex")) is None:
+            addends = {Add.splitCoefficient(child)[1]: child for child in self.children if child.kind != NodeKind.RATIONAL}
+            factors = list(addends)
+            BaseLuppExpr.sortNodes(factors)
+            index = TermTree.fromSorted(factors, BaseLuppExpr.compare, [addends[factor] for factor in factors])
+            BaseLuppExpr.setCache(self, "_termIndex", index)
+        return index
+
+    def mergeTerms(self, terms):
+        '''
+        This method returns the simplification of the sum between this node and the terms.
+        This node must be a simplified and not negated sum, while the terms must be simplified
+        and must not be sums. The addends are kept in a TermTree in canonical order and indexed by
+        their factor in another one, see getChildTree and getTermIndex: only the addends like the
+        terms are recomputed and updated in the trees, so the cost does not depend on the number of
+        addends of the sum, which is built from the trees without sorting or copying its addends.
+        '''
+        if not self.isNormalized() or self.negated or any(term.kind == NodeKind.ADD for term in terms):
+            return Add([self, *terms]).simplify()
+
+        index = self.getTermIndex()
+        children = self.getChildTree()
+        cumulatedSum = None
+        multiplicativeFactors = {}
+        for term in terms:
+            if term.kind == NodeKind.RATIONAL:
+                cumulatedSum = term if cumulatedSum is None else cumulatedSum + term
+                continue
+            rational, factor = Add.splitCoefficient(term)
+            # Se c'è già un addendo con lo stesso fattore sommo i coefficienti
+            if factor not in multiplicativeFactors and (like := index.get(factor)) is not None:
+                children = children.remove(like)
+                multiplicativeFactors[factor] = Add.splitCoefficient(like)[0]
+            if factor in multiplicativeFactors:
+                multiplicativeFactors[factor] += rational
+            else:
+                multiplicativeFactors[factor] = rational
+
+        # Il razionale, se presente, è sempre il primo addendo
+        if cumulatedSum is not None:
+            if (first := children.first()) is not None and first.kind == NodeKind.RATIONAL:
+                children = children.remove(first)
+                cumulatedSum = first + cumulatedSum
+            if not cumulatedSum.isZero():
+                children = children.set(cumulatedSum.simplify())
+        for factor, rational in multiplicativeFactors.items():
+            if rational.isZero():
+                index = index.remove(factor)
+            else:
+                addend = Add.buildAddend(rational, factor)
+                index = index.set(factor, addend)
+                children = children.set(addend)
+
+        if len(children) == 0:
+            return Rational(0)
+        if len(children) == 1:
+            return children.first()
+        res = Add(children)
+        BaseLuppExpr.memoizeSimplified(res, res)
+        if "_termIndex" not in res.__dict__:
+            BaseLuppExpr.setCache(res, "_termIndex", index)
+        return res
+
+    @staticmethod
+    def merge(operands, negated = False):
+        '''
+        This method returns the simplified sum of the operands. If one of the operands
+        simplifies to a sum, the other ones are merged into it with mergeTerms.
+        '''
+        if negated:
+            return Add(operands, negated).simplify()
+        operands = [operand.simplify() for operand in operands]
+        sums = [operand for operand in operands if operand.kind == NodeKind.ADD and not operand.negated]
+        if len(sums) == 0:
+            return Add(operands).simplify()
+        # Unisco gli altri termini nella somma più grande
+        base = max(sums, key = BaseLuppExpr.childCount)
+        operands.remove(base)
+        terms = []
+        for operand in operands:
+            terms.extend(operand.children if operand in sums else [operand])
+        return base.mergeTerms(terms)
+
     @BaseLuppExpr.baseExpansion
     def expand(self):
         if self.negated:
@@ -119,19 +288,27 @@ class Mult(BaseLuppExpr):
     '''
 
     __NODE_NAME = "Mul"
+    kind = NodeKind.MULT
     __ABBREV = "M"
 
-    def __init__(self, factors: list, negated = False):
+    # Se vero, la semplificazione riduce ai minimi termini i prodotti che contengono
+    # potenze di somme con esponente negativo, vedi Polynomial.cancel
+    cancelQuotients = False
+
+    simplificationOptions = frozenset(("cancelQuotients",))
+
+    def __init__(self, factors: list, negated = False, presorted = False):
         '''
         This method initializes the Mult object.
         The method takes the following parameters:
         - factors: the list of factors of the product. Must be at least two elements.
         - negated: a boolean flag that indicates if the product is negated. Default is False.
+        - presorted: a boolean flag that indicates if the factors are already sorted by sort key. Default is False.
         '''
 
         assert (factors is not None), "factors cannot be None"
         assert (len(factors) > 1), "factors must be at least two elements"
-        super().__init__(self.__NODE_NAME, factors, negated)
+        super().__init__(self.__NODE_NAME, factors, negated, presorted)
 
     def copy_with(self, factors = None, negated = None):
         return Mult(
@@ -139,40 +316,59 @@ class Mult(BaseLuppExpr):
             negated = self.negated if negated is None else negated
         )
 
+    def copy_with_children(self, children):
+        return Mult(children, self.negated)
+
     def getPayload(self):
         return self.__ABBREV
     
     
-    def getLatexRapresentation(self):
-        res = "-" if self.negated else ""
-        denominatorElements = [child for child in self.children if isinstance(child, Pow) and child.children[1].negated]
+    def computeTotalDegree(self):
+        degrees = list(map(attrgetter("totalDegree"), self.children))
+        return None if None in degrees else sum(degrees)
+
+    def splitFraction(self):
+        '''
+        This method splits the factors in the ones written in the numerator and the powers with
+        negative exponent, written in the denominator. Return a tuple (numerator, denominator).
+        '''
+        denominatorElements = [child for child in self.children if child.kind == NodeKind.POW and child.children[1].negated]
         numeratorElements = [child for child in self.children if child not in denominatorElements]
-        numerator = "\\cdot ".join([child.getLatexRapresentation() for child in numeratorElements])
+        return numeratorElements, denominatorElements
+
+    def latexRequests(self, notAsFraction = False):
+        numeratorElements, denominatorElements = self.splitFraction()
+        return [(child, self, False) for child in numeratorElements] + [(child, self, True) for child in denominatorElements]
+
+    def buildLatex(self, childLatex, parent = None, notAsFraction = False):
+        res = "-" if self.negated else ""
+        numeratorElements, denominatorElements = self.splitFraction()
+        numerator = "\\cdot ".join(childLatex[:len(numeratorElements)])
         if len(denominatorElements) == 0:
             return res +numerator
-        return res + "\\frac{" + numerator + "}{" + "\\cdot ".join([child.getLatexRapresentation(True) for child in denominatorElements]) + "}"
+        return res + "\\frac{" + numerator + "}{" + "\\cdot ".join(childLatex[len(numeratorElements):]) + "}"
     
     @BaseLuppExpr.baseSimpl
     def simplify(self):
+        # Appiattimento, elemento neutro ed elemento assorbente sono regole di riscrittura, vedi Mult.simplificationRules
+        if (rewritten := Mult.simplificationRules.applyFirst(self)) is not self:
+            return rewritten
+
         children = []
         cumulatedFactor = Rational(1)
         sameBaseElements = {}
 
         # Calcolo il segno finale del prodotto
         negation = reduce(lambda res, child: res != child.negated, self.children, self.negated)
-        self.children = [child.copy_with(negated = False) for child in self.children]
-
-        for factor in self.children:
-            # Se uno dei fattori è un prodotto, aggiungi i suoi figli
-            if isinstance(factor, Mult):
-                children.extend(factor.children)
+        factors = [child.copy_with(negated = False) for child in self.children]
 
+        for factor in factors:
             # Se uno dei fattori è un razionale, lo aggiungo al prodotto cumulato
-            elif isinstance(factor, Rational):
+            if factor.kind == NodeKind.RATIONAL:
                 cumulatedFactor *= factor
 
             # Se uno dei fattori è una potenza, aggiungo la base e l'esponente alla lista delle potenze
-            elif isinstance(factor, Pow):
+            elif factor.kind == NodeKind.POW:
                 if (base:=factor.children[0]) in sameBaseElements:
                     sameBaseElements[base].append(factor.children[1])
                 else:
@@ -188,7 +384,7 @@ class Mult(BaseLuppExpr):
         for element, exponents in sameBaseElements.items():
             exp = Add(exponents).simplify() if len(exponents) > 1 else exponents[0]
             # Se ci sono più elementi con la stessa base, aggiungo la rispettiva potenzas
-            if isinstance(exp, Rational):
+            if exp.kind == NodeKind.RATIONAL:
                 if exp.isZero():
                     children.append(Rational(1))
                 elif exp.isOne():
@@ -202,10 +398,6 @@ class Mult(BaseLuppExpr):
         if len(children) == 0:
             return cumulatedFactor.copy_with(negated = negation)
         
-        # Se il fattore cumulato è zero, ritorna zero
-        if cumulatedFactor.isZero():
-            return Rational(0)
-        
         # Se il fattore cumulato non è uno, lo aggiungo alla lista dei fattori
         if not cumulatedFactor.isOne():
             # Se il fattore cumulato è -1, inverto la negazione del primo figlio
@@ -216,22 +408,183 @@ class Mult(BaseLuppExpr):
         
         # Se abbiamo più di un figlio, ritorna un nuovo prodotto
         if len(children) > 1:
+            if Mult.cancelQuotients and Mult.hasQuotient(children):
+                from src.expression.polynomial import Polynomial
+                return Polynomial.cancel(Mult(children, negation))
             return Mult(children, negation)
         
         # Se abbiamo un solo figlio, ritorna il figlio
         return children[0].copy_with(negated = negation)
     
+    @staticmethod
+    def fromFactors(factors, negated = False):
+        '''
+        This method builds the product of the factors, that is one if there are no factors
+        and the factor itself if there is only one.
+        '''
+        if len(factors) == 0:
+            return Rational(1, negated = negated)
+        if len(factors) == 1:
+            return factors[0].copy_with(negated = negated != factors[0].negated)
+        return Mult(factors, negated)
+
+    @staticmethod
+    def flatten(node):
+        '''
+        This method returns the product with the factors of the nested products in place of the products.
+        The signs of the nested products are brought on the product.
+        '''
+        factors = []
+        negated = node.negated
+        for factor in node.children:
+            if factor.kind == NodeKind.MULT:
+                factors.extend(factor.children)
+                negated = negated != factor.negated
+            else:
+                factors.append(factor)
+        return Mult(factors, negated)
+
+    @staticmethod
+    def hasQuotient(factors):
+        '''
+        This method checks if one of the factors is a sum raised to a negative exponent,
+        that is if the product is a quotient that cancelQuotients reduces to lowest terms.
+        '''
+        return any(factor.kind == NodeKind.POW and factor.children[0].kind == NodeKind.ADD and factor.children[1].negated for factor in factors)
+
+    @staticmethod
+    def splitExponent(factor):
+        '''
+        This method splits a not negated factor in its base and its exponent.
+        Return a tuple (base, exponent).
+        '''
+        if factor.kind == NodeKind.POW:
+            return factor.children[0], factor.children[1]
+        return factor, Rational(1)
+
+    def getBaseIndex(self):
+        '''
+        This method returns a TermTree that maps the base of every non rational factor,
+        as given by splitExponent, to the factor itself. The bases are distinct since
+        the product is simplified. The tree is computed once and is persistent, see TermTree.
+        '''
+        if (index := self.__dict__.get("_baseIndex")) is None:
+            factors = {Mult.splitExponent(child)[0]: child for child in self.children if child.kind != NodeKind.RATIONAL}
+            bases = list(factors)
+            BaseLuppExpr.sortNodes(bases)
+            index = TermTree.fromSorted(bases, BaseLuppExpr.compare, [factors[base] for base in bases])
+            BaseLuppExpr.setCache(self, "_baseIndex", index)
+        return index
+
+    def mergeFactors(self, factors):
+        '''
+        This method returns the simplification of the product between this node and the factors.
+        This node must be a simplified product, while the factors must be simplified and must
+        not be products. As in Add.mergeTerms, the factors are kept in a TermTree in canonical order
+        and indexed by their base in another one: only the factors with the same base of the new
+        ones are recomputed and updated in the trees, and the other factors are not simplified,
+        sorted or copied again. With cancelQuotients the factors are checked for quotients, so the
+        cost grows with their number.
+        '''
+        fallback = lambda: Mult([self, *factors]).simplify()
+        if not self.isNormalized() or any(factor.kind == NodeKind.MULT for factor in factors):
+            return fallback()
+
+        negation = reduce(lambda res, factor: res != factor.negated, factors, self.negated)
+        index = self.getBaseIndex()
+        children = self.getChildTree()
+        cumulatedFactor = None
+        sameBaseElements = {}
+        for factor in factors:
+            factor = factor.copy_with(negated = False)
+            if factor.kind == NodeKind.RATIONAL:
+                if factor.isZero():
+                    return Rational(0)
+                cumulatedFactor = factor if cumulatedFactor is None else cumulatedFactor * factor
+                continue
+            base, exponent = Mult.splitExponent(factor)
+            # Le basi razionali possono diventare parte del coefficiente
+            if base.kind == NodeKind.RATIONAL:
+                return fallback()
+            # Se c'è già un fattore con la stessa base sommo gli esponenti
+            if base not in sameBaseElements:
+                like = index.get(base)
+                sameBaseElements[base] = [] if like is None else [Mult.splitExponent(like)[1]]
+                if like is not None:
+                    children = children.remove(like)
+            sameBaseElements[base].append(exponent)
+
+        # Il coefficiente razionale, se presente, è sempre il primo fattore
+        if cumulatedFactor is not None:
+            if (first := children.first()) is not None and first.kind == NodeKind.RATIONAL:
+                children = children.remove(first)
+                cumulatedFactor = first * cumulatedFactor
+            cumulatedFactor = cumulatedFactor.simplify()
+            if not cumulatedFactor.isOne():
+                children = children.set(cumulatedFactor)
+        for base, exponents in sameBaseElements.items():
+            exponent = Add(exponents).simplify() if len(exponents) > 1 else exponents[0]
+            if exponent.kind == NodeKind.RATIONAL and exponent.isZero():
+                index = index.remove(base)
+                continue
+            if exponent.kind == NodeKind.RATIONAL and exponent.isOne():
+                factor = base
+            else:
+                factor = Pow(base, exponent).simplify()
+                if factor.kind != NodeKind.POW or factor.negated or factor.children[0] != base:
+                    return fallback()
+            index = index.set(base, factor)
+            children = children.set(factor)
+
+        # I quozienti da ridurre ai minimi termini passano dalla semplificazione completa
+        if Mult.cancelQuotients and Mult.hasQuotient(children):
+            return fallback()
+        if len(children) == 0:
+            return Rational(1, negated = negation)
+        if len(children) == 1:
+            return children.first().copy_with(negated = negation)
+        res = Mult(children, negation)
+        BaseLuppExpr.memoizeSimplified(res, res)
+        if "_baseIndex" not in res.__dict__:
+            BaseLuppExpr.setCache(res, "_baseIndex", index)
+        return res
+
+    @staticmethod
+    def merge(operands, negated = False):
+        '''
+        This method returns the simplified product of the operands. If one of the operands
+        simplifies to a product, the other ones are merged into it with mergeFactors.
+        '''
+        if negated:
+            return Mult(operands, negated).simplify()
+        operands = [operand.simplify() for operand in operands]
+        products = [operand for operand in operands if operand.kind == NodeKind.MULT]
+        if len(products) == 0:
+            return Mult(operands).simplify()
+        # Unisco gli altri fattori nel prodotto più grande
+        base = max(products, key = BaseLuppExpr.childCount)
+        operands.remove(base)
+        factors = []
+        for operand in operands:
+            if operand in products:
+                # Il segno del prodotto viene portato sul primo fattore
+                factors.append(Rational(1, negated = operand.negated))
+                factors.extend(operand.children)
+            else:
+                factors.append(operand)
+        return base.mergeFactors(factors)
+
     @BaseLuppExpr.baseExpansion
     def expand(self):
         result = self.children[0]
 
         for child in self.children[1:]:
             firstElToMultiply = [result]
-            if isinstance(result, Add):
+            if result.kind == NodeKind.ADD:
                 firstElToMultiply = result.children
 
             secondElToMultiply = [child]
-            if isinstance(child, Add):
+            if child.kind == NodeKind.ADD:
                 secondElToMultiply = child.children
 
             elementsInProd = []  
@@ -244,11 +597,28 @@ class Mult(BaseLuppExpr):
         result = result.copy_with(negated = result.negated != self.negated)
         return result
         
+    def expandNode(self):
+        from src.expression.polynomial import Polynomial
+        # Se il prodotto è un polinomio viene espanso nella rappresentazione sparsa
+        if (polynomial := Polynomial.fromExpr(self)) is not None:
+            return polynomial.toExpr()
+        result = reduce(Mult.distribute, self.children)
+        return Mult.distribute(Rational(-1), result) if self.negated else result
+
+    @staticmethod
+    def distribute(first, second):
+        '''
+        This method returns the simplified product of two fully expanded expressions,
+        distributing the product over their addends.
+        '''
+        products = [Mult([firstAddend, secondAddend]) for firstAddend in Add.getAddends(first) for secondAddend in Add.getAddends(second)]
+        return (Add(products) if len(products) > 1 else products[0]).simplify()
+
     @BaseLuppExpr.baseDerive
     def derive(self, symbol):
         addends = []
         for i, child in enumerate(self.children):
-            addends.append(Mult([child.derive(symbol)] + self.children[:i] + self.children[i+1:]))
+            addends.append(Mult([child.derive(symbol), *self.children[:i], *self.children[i+1:]]))
         res = ""
         for addend in addends:
             res += addend.getLatexRapresentation() + " + "
@@ -263,6 +633,7 @@ class Pow(BaseLuppExpr):
     '''
 
     __NODE_NAME = "Pow"
+    kind = NodeKind.POW
     __ABBREV = "P"
 
     def __init__(self, base: BaseLuppExpr, exponent: BaseLuppExpr, negated = False):
@@ -283,22 +654,40 @@ class Pow(BaseLuppExpr):
             negated = self.negated if negated is None else negated
         )
 
+    def copy_with_children(self, children):
+        return Pow(children[0], children[1], self.negated)
+
     def getPayload(self):
         return self.__ABBREV
     
-    def getLatexRapresentation(self, notAsFraction = False): 
+    def computeMetadata(self):
+        super().computeMetadata()
+        if self.children[1].kind != NodeKind.RATIONAL:
+            BaseLuppExpr.setCache(self, "hasNonRationalExponent", True)
+
+    def computeTotalDegree(self):
+        base, exponent = self.children
+        # Solo le potenze intere non negative hanno un grado
+        if base.totalDegree is None or exponent.kind != NodeKind.RATIONAL or exponent.denominator != 1 or (exponent.negated and not exponent.isZero()):
+            return None
+        return base.totalDegree * exponent.numerator
+
+    def latexRequests(self, notAsFraction = False):
+        # L'esponente viene scritto senza segno e senza padre
+        return [(self.children[0], self, False), (self.children[1].copy_with(negated = False), None, False)]
+
+    def buildLatex(self, childLatex, parent = None, notAsFraction = False): 
         result = "-" if self.negated else ""
-        base_latex = self.children[0].getLatexRapresentation()
+        base_latex, exponent_latex = childLatex
         exp = self.children[1].copy_with(negated = False)
 
-        if isinstance(exp,Rational) and exp.numerator == 1 and exp.denominator != 1:
+        if exp.kind == NodeKind.RATIONAL and exp.numerator == 1 and exp.denominator != 1:
             sqare = "[" + str(exp.denominator) + "]" if exp.denominator != 2 else ""
             result += "\\sqrt"+sqare+"{" + base_latex + "}"
         else:
-            if isinstance(exp,Rational) and exp.numerator == 1:
+            if exp.kind == NodeKind.RATIONAL and exp.numerator == 1:
                 result += base_latex
             else:
-                exponent_latex = exp.getLatexRapresentation() 
                 result += f"{base_latex}^{{{exponent_latex}}}"
 
         if notAsFraction or not self.children[1].negated:
@@ -308,34 +697,21 @@ class Pow(BaseLuppExpr):
     
     @BaseLuppExpr.baseSimpl
     def simplify(self):
-        if isinstance(base:=self.children[0], Rational):
-            if base.isZero():
-                return Rational(0)
-            if base.isOne():
-                return Rational(1, self.negated)
-        if isinstance(exponent:=self.children[1], Rational):
-            if exponent.isZero():
-                return Rational(1, self.negated)
-            if exponent.isOne():
-                return self.children[0].copy_with(negated = self.negated != self.children[0].negated)
-            
-        if isinstance(base, Pow):
-            return Pow(base.children[0], Mult([base.children[1], exponent]), self.negated).simplify()
-            
-        if base.negated:
-            base = base.copy_with(negated = False)
-            self.negated = not self.negated
-
-        res = Pow(base, exponent, self.negated)
-        return res
+        # Le semplificazioni delle potenze sono regole di riscrittura, vedi Pow.simplificationRules
+        return Pow.simplificationRules.applyFirst(self)
     
     
+    @BaseLuppExpr.baseExpansion
     def expand(self):
-        if not isinstance(self.children[1], Rational):
-            return Pow(self.children[0].expand(), self.children[1].expand(), self.negated)
+        if self.children[1].kind != NodeKind.RATIONAL:
+            return self
             
         rationalExponent = self.children[1]
-        newBase = self.children[0].expand()
+        newBase = self.children[0]
+
+        # Come nella semplificazione, una potenza con esponente zero vale uno
+        if rationalExponent.numerator == 0:
+            return Rational(1, negated = self.negated)
         
         if abs(rationalExponent.numerator) != 1:
             newBase = Mult([newBase for _ in range(abs(rationalExponent.numerator))])
@@ -350,12 +726,79 @@ class Pow(BaseLuppExpr):
         
         return Pow(newBase, Rational(1, rationalExponent.denominator, oldExponentSignNegated), self.negated)
 
+    def expandNode(self):
+        '''
+        This method expands the power assuming that base and exponent are already fully expanded.
+        With a rational exponent p/q the base is raised to |p| by repeated squaring, distributing
+        every product, and the result is raised to 1/q or -1/q.
+        '''
+        from src.expression.polynomial import Polynomial
+        base, exponent = self.children
+        if exponent.kind != NodeKind.RATIONAL or exponent.isZero():
+            return self
+
+        # Se la potenza intera della base è un polinomio viene calcolata nella rappresentazione sparsa
+        if (polynomial := Polynomial.fromExpr(base)) is not None:
+            power = (polynomial ** exponent.numerator).toExpr() if not polynomial.isZero() else base
+        else:
+            power, square, remaining = None, base, exponent.numerator
+            while True:
+                if remaining & 1:
+                    power = square if power is None else Mult.distribute(power, square)
+                remaining >>= 1
+                if remaining == 0:
+                    break
+                square = Mult.distribute(square, square)
+
+        result = power
+        if exponent.denominator != 1 or exponent.negated:
+            result = Pow(power, Rational(1, exponent.denominator, exponent.negated))
+        return Mult.distribute(Rational(-1), result) if self.negated else result
+
+    def deriveChildren(self):
+        # Solo la base viene derivata, l'esponente deve essere razionale
+        return self.children[:1]
+
     @BaseLuppExpr.baseDerive
     def derive(self, symbol):
-        assert isinstance(self.children[1], Rational), "Cannot derive a power with a non rational exponent"
+        assert self.children[1].kind == NodeKind.RATIONAL, "Cannot derive a power with a non rational exponent"
         return Mult([self.children[1], Pow(self.children[0], Add([self.children[1], Rational(-1)])), self.children[0].derive(symbol)]).simplify()
 
 
-
-
-    
\ No newline at end of file
+# Regole strutturali delle somme e dei prodotti, provate prima della raccolta dei termini simili.
+# Gli addendi e i fattori sono già semplificati quando vengono applicate
+Add.simplificationRules = RuleSet([
+    Rule(Pattern(Add, [Wild(kind = NodeKind.ADD)], rest = "others"), lambda node, others: Add.flatten(node), "nested sum"),
+    Rule(Pattern(Add, [Wild(kind = NodeKind.RATIONAL, condition = Rational.isZero)], rest = "others"),
+         lambda node, others: Add.fromAddends(others, node.negated), "zero addend"),
+])
+
+Mult.simplificationRules = RuleSet([
+    Rule(Pattern(Mult, [Wild(kind = NodeKind.MULT)], rest = "others"), lambda node, others: Mult.flatten(node), "nested product"),
+    Rule(Pattern(Mult, [Wild(kind = NodeKind.RATIONAL, condition = Rational.isZero)], rest = "others"),
+         lambda node, others: Rational(0), "zero factor"),
+    Rule(Pattern(Mult, [Wild("one", NodeKind.RATIONAL, negated = False, condition = Rational.isOne)], rest = "others"),
+         lambda node, one, others: Mult.fromFactors(others, node.negated), "one factor"),
+])
+
+# Regole di semplificazione delle potenze, provate nell'ordine in cui sono elencate.
+# Base ed esponente sono già semplificati quando vengono applicate.
+Pow.simplificationRules = RuleSet([
+    Rule(Pattern(Pow, [Wild(kind = NodeKind.RATIONAL, condition = Rational.isZero), Wild()]),
+         lambda node: Rational(0), "zero base"),
+    Rule(Pattern(Pow, [Wild(kind = NodeKind.RATIONAL, condition = Rational.isOne), Wild()]),
+         lambda node: Rational(1, negated = node.negated), "one base"),
+    Rule(Pattern(Pow, [Wild(), Wild(kind = NodeKind.RATIONAL, condition = Rational.isZero)]),
+         lambda node: Rational(1, negated = node.negated), "zero exponent"),
+    Rule(Pattern(Pow, [Wild("base"), Wild(kind = NodeKind.RATIONAL, condition = Rational.isOne)]),
+         lambda node, base: base.copy_with(negated = node.negated != base.negated), "one exponent"),
+    # (-b)^(p/q) = (-1)^p * b^(p/q) solo se q è dispari, altrimenti la negazione resta nella base
+    Rule(Pattern(Pow, [Wild("base", negated = True), Wild("exponent", NodeKind.RATIONAL, condition = lambda exponent: exponent.denominator % 2 == 1)]),
+         lambda node, base, exponent: Pow(base.copy_with(negated = False), exponent, node.negated != (exponent.numerator % 2 == 1)).simplify(), "odd root of negated base"),
+    Rule(Pattern(Pow, [Pattern(Pow, [Wild("base"), Wild("inner")], negated = False), Wild("outer")]),
+         lambda node, base, inner, outer: Pow(base, Mult([inner, outer]), node.negated).simplify(), "nested power"),
+    # Una potenza razionale non esatta viene portata nella forma radicale più semplice
+    Rule(Pattern(Pow, [Wild("base", NodeKind.RATIONAL, negated = False), Wild("exponent", NodeKind.RATIONAL)]),
+         lambda node, base, exponent: None if (radical := base.extractRadical(exponent)) is None else
+             Mult([radical[0], Pow(radical[1], radical[2])], node.negated).simplify(), "radical"),
+])
@@ -0,0 +1,157 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from src.expression.BaseLuppExpr import BaseLuppExpr, InternedExprMeta
+from src.expression.ExprCodec import ExprCodec
+from src.expression.leaf import Rational
+from src.expression.nodes import Add, Mult
+from src.expression.polynomial import Polynomial
+from src.utils.NodeKind import NodeKind
+
+
+class ParallelExpr:
+    '''
+    This class splits the simplification and the expansion of very wide sums and products among
+    a pool of processes. The children of the node are divided in chunks and every chunk is sent
+    to a worker in the binary encoding of ExprCodec, where it is reduced to a partial sum or
+    product. The partial results are combined in the main process by one final step. The chunks
+    are collected in order, so the result does not depend on the scheduling of the workers.
+    The parallel mode is disabled by default and is enabled by configure.
+    '''
+
+    # Numero di processi del pool. None usa tutti i processori disponibili
+    workers = None
+    # Numero di blocchi in cui vengono divisi i figli per ogni processo, per bilanciare il carico
+    chunksPerWorker = 4
+    __pool = None
+    # Modalità della semplificazione con cui sono stati inizializzati i processi del pool
+    __poolMode = None
+
+    @staticmethod
+    def configure(threshold, workers = None):
+        '''
+        This method enables the parallel mode for the sums and products with at least threshold children,
+        using a pool of the given number of processes. A threshold of None disables the parallel mode.
+        Raise ValueError if the threshold is not greater than one.
+        '''
+        if threshold is not None and threshold < 2:
+            raise ValueError(f"The parallel threshold {threshold} is not greater than one")
+        ParallelExpr.shutdown()
+        BaseLuppExpr.parallelThreshold = threshold
+        BaseLuppExpr.parallelBackend = ParallelExpr if threshold is not None else None
+        ParallelExpr.workers = workers
+
+    @staticmethod
+    def shutdown():
+        '''
+        This method stops the processes of the pool, if it has been created.
+        '''
+        if ParallelExpr.__pool is not None:
+            ParallelExpr.__pool.shutdown()
+            ParallelExpr.__pool = None
+
+    @staticmethod
+    def pool():
+        '''
+        This method returns the pool of processes, creating it the first time it is needed.
+        The pool is created again if the options of the simplification changed after its creation.
+        '''
+        if ParallelExpr.__pool is not None and ParallelExpr.__poolMode is not InternedExprMeta.mode:
+            ParallelExpr.shutdown()
+        if ParallelExpr.__pool is None:
+            ParallelExpr.__poolMode = InternedExprMeta.mode
+            ParallelExpr.__pool = ProcessPoolExecutor(max_workers = ParallelExpr.workers, initializer = ParallelExpr.initWorker,
+                                                      initargs = (Mult.cancelQuotients, Rational.modulus))
+        return ParallelExpr.__pool
+
+    @staticmethod
+    def initWorker(cancelQuotients, modulus):
+        '''
+        This method initializes a process of the pool with the configuration of the main process:
+        the reduction of the quotients and the modulus of the modular mode.
+        The workers never split their chunks again.
+        '''
+        BaseLuppExpr.parallelThreshold = None
+        Mult.cancelQuotients = cancelQuotients
+        Rational.modulus = modulus
+
+    ##############
+    # OPERAZIONI #
+    ##############
+
+    # Operazioni applicate ai blocchi, indicizzate per nome così da essere passate ai processi
+    operations = {
+        "simplify": lambda node: node.simplify(),
+        "fullExpand": lambda node: node.fullExpand(),
+        # Espansione della funzione di libreria Expand: prima come polinomio sparso, altrimenti completa
+        "expand": lambda node: polynomial.toExpr() if (polynomial := Polynomial.fromExpr(node)) is not None else node.fullExpand(),
+    }
+
+    @staticmethod
+    def simplify(node):
+        '''
+        This method simplifies the wide sum or product, simplifying its chunks in parallel.
+        The partial results are in normal form and are merged by the simplification of their sum or product.
+        '''
+        partials = ParallelExpr.mapChunks("simplify", node)
+        for partial in partials:
+            BaseLuppExpr.memoizeSimplified(partial, partial)
+        return ParallelExpr.combine(node.copy_with_children(partials), "simplify")
+
+    @staticmethod
+    def fullExpand(node):
+        '''
+        This method fully expands the wide sum or product, expanding its chunks in parallel.
+        The partial results are already expanded, so only their sum or product is expanded again.
+        '''
+        partials = ParallelExpr.mapChunks("fullExpand", node)
+        for partial in partials:
+            BaseLuppExpr.setMemo(partial, "_fullyExpanded", partial)
+        return ParallelExpr.combine(node.copy_with_children(partials), "fullExpand")
+
+    @staticmethod
+    def expand(node):
+        '''
+        This method expands the wide sum or product like the library function Expand, expanding its chunks in parallel.
+        '''
+        partials = ParallelExpr.mapChunks("expand", node)
+        return ParallelExpr.combine(node.copy_with_children(partials), "expand")
+
+    @staticmethod
+    def combine(node, operation):
+        '''
+        This method applies the operation to the sum or product of the partial results in the main process.
+        The parallel mode is suspended, so that the combination is never split again.
+        '''
+        threshold = BaseLuppExpr.parallelThreshold
+        BaseLuppExpr.parallelThreshold = None
+        try:
+            return ParallelExpr.operations[operation](node)
+        finally:
+            BaseLuppExpr.parallelThreshold = threshold
+
+    @staticmethod
+    def mapChunks(operation, node):
+        '''
+        This method divides the children of the sum or product in chunks, applies the operation
+        to the sum or product of every chunk in the pool and returns the list of the partial results, in order.
+        The negation of the node is not applied to the chunks.
+        '''
+        children = node.children
+        # Servono almeno due blocchi, perché la combinazione dei risultati parziali sia ancora una somma o un prodotto
+        chunks = max(2, min(len(children) // 2, (ParallelExpr.workers or os.cpu_count() or 1) * ParallelExpr.chunksPerWorker))
+        size = -(-len(children) // chunks)
+        tasks = [(operation, node.kind, ExprCodec.dumpsAll(children[start:start + size])) for start in range(0, len(children), size)]
+        return [ExprCodec.loads(result) for result in ParallelExpr.pool().map(reduceChunk, tasks)]
+
+
+def reduceChunk(task):
+    '''
+    This function is executed by the processes of the pool. It decodes the sum or product of a chunk,
+    applies the operation and returns the encoding of the result.
+    '''
+    operation, kind, data = task
+    children = ExprCodec.loadsAll(data)
+    node = children[0] if len(children) == 1 else (Add if kind == NodeKind.ADD else Mult)(children)
+    result = ParallelExpr.operations[operation](node)
+    return ExprCodec.dumps(result)
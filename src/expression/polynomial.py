@@ -0,0 +1,602 @@
+from fractions import Fraction
+from math import lcm
+from functools import reduce
+from operator import add, sub
+
+from src.expression.BaseLuppExpr import BaseLuppExpr
+from src.expression.leaf import ModularInverseError, Rational, Symbol
+from src.expression.nodes import Add, Mult, Pow
+from src.utils.NodeKind import NodeKind
+
+
+class Polynomial:
+    '''
+    This class represents a sparse multivariate polynomial with exact rational coefficients.
+    The polynomial is defined over an ordered tuple of symbol names and its terms are stored
+    in a dictionary that maps the vector of the exponents of the symbols to the coefficient
+    of the term, as a Fraction. Terms with a zero coefficient are never stored.
+    Polynomials are not expression nodes: they are used to expand and collect polynomial
+    expressions and are converted back to canonical Add/Mult trees.
+    '''
+
+    # Grado minimo dei due fattori univariati oltre il quale la moltiplicazione
+    # passa alla rappresentazione densa con la sostituzione di Kronecker
+    denseThreshold = 16
+
+    def __init__(self, symbols, terms: dict = None):
+        '''
+        This method initializes the Polynomial object. The method takes the following parameters:
+        - symbols: the tuple of the names of the symbols of the polynomial.
+        - terms: the dictionary mapping exponent vectors to non zero Fraction coefficients. Default is the zero polynomial.
+        '''
+        self.symbols = tuple(symbols)
+        self.terms = {} if terms is None else terms
+
+    ##############
+    # CONVERSIONI #
+    ##############
+
+    @staticmethod
+    def toFraction(rational: Rational):
+        '''
+        This method converts a Rational node to a Fraction, keeping its sign.
+        '''
+        return Fraction(-rational.numerator if rational.negated else rational.numerator, rational.denominator)
+
+    @staticmethod
+    def toRational(fraction: Fraction):
+        '''
+        This method converts a Fraction to a Rational node.
+        '''
+        return Rational(fraction.numerator, fraction.denominator)
+
+    @staticmethod
+    def collectSymbols(expr: BaseLuppExpr):
+        '''
+        This method returns the sorted tuple of the names of the symbols inside the expression.
+        '''
+        return tuple(sorted(expr.freeSymbols))
+
+    @staticmethod
+    def isMonomial(expr: BaseLuppExpr):
+        '''
+        This method checks if the expression is a not negated monomial without coefficient,
+        that is a symbol, a power of a symbol with a positive integer exponent or a product of them.
+        '''
+        factors = expr.children if expr.kind == NodeKind.MULT else (expr,)
+        if expr.negated:
+            return False
+        for factor in factors:
+            if factor.kind == NodeKind.POW:
+                base, exponent = factor.children
+                if factor.negated or base.kind != NodeKind.SYMBOL or base.negated or exponent.kind != NodeKind.RATIONAL \
+                    or exponent.negated or exponent.denominator != 1 or exponent.isZero():
+                    return False
+            elif factor.kind != NodeKind.SYMBOL or factor.negated:
+                return False
+        return True
+
+    @classmethod
+    def fromMonomials(cls, monomials):
+        '''
+        This method builds the polynomial given by the sum of the monomials, collecting the
+        like terms. The monomials are a list of tuples (coefficient, factor), where the coefficient
+        is a Rational and the factor satisfies isMonomial.
+        Return the polynomial and a dictionary that maps every exponent vector to the first
+        factor found with that vector, so that the original nodes can be reused.
+        '''
+        powers = []
+        symbols = set()
+        for _, factor in monomials:
+            factorPowers = []
+            for element in (factor.children if factor.kind == NodeKind.MULT else (factor,)):
+                if element.kind == NodeKind.POW:
+                    factorPowers.append((element.children[0].getPayload(), element.children[1].numerator))
+                else:
+                    factorPowers.append((element.getPayload(), 1))
+            symbols.update(name for name, _ in factorPowers)
+            powers.append(factorPowers)
+
+        polynomial = cls(sorted(symbols))
+        index = {name: i for i, name in enumerate(polynomial.symbols)}
+        factors = {}
+        for (rational, factor), factorPowers in zip(monomials, powers):
+            exponents = [0] * len(index)
+            for name, exponent in factorPowers:
+                exponents[index[name]] += exponent
+            exponents = tuple(exponents)
+            factors.setdefault(exponents, factor)
+            polynomial.addTerm(exponents, Polynomial.toFraction(rational))
+        return polynomial, factors
+
+    @classmethod
+    def fromExpr(cls, expr: BaseLuppExpr, symbols = None):
+        '''
+        This method converts an expression to a polynomial over the given symbols, or over the
+        symbols of the expression if they are not given. The expression is visited iteratively
+        and every shared subexpression is converted once.
+        Return None if the expression is not a polynomial, that is if it contains a power whose
+        exponent is not a non negative integer.
+        '''
+        # Il grado memorizzato nel nodo dice subito se l'espressione non è un polinomio
+        if expr.totalDegree is None:
+            return None
+        symbols = Polynomial.collectSymbols(expr) if symbols is None else tuple(symbols)
+        index = {name: i for i, name in enumerate(symbols)}
+        converted = {}
+        for node in BaseLuppExpr.postOrder(expr):
+            children = [converted[child] for child in node.children]
+            match node.kind:
+                case NodeKind.RATIONAL:
+                    polynomial = cls.constant(symbols, Fraction(node.numerator, node.denominator))
+                case NodeKind.SYMBOL:
+                    exponents = [0] * len(symbols)
+                    exponents[index[node.getPayload()]] = 1
+                    polynomial = cls(symbols, {tuple(exponents): Fraction(1)})
+                case NodeKind.ADD:
+                    polynomial = children[0]
+                    for child in children[1:]:
+                        polynomial = polynomial + child
+                case NodeKind.MULT:
+                    polynomial = children[0]
+                    for child in children[1:]:
+                        polynomial = polynomial * child
+                case NodeKind.POW:
+                    exponent = node.children[1]
+                    # Solo gli esponenti interi non negativi danno un polinomio
+                    if exponent.kind != NodeKind.RATIONAL or exponent.denominator != 1 or (exponent.negated and not exponent.isZero()):
+                        return None
+                    # Come in Pow.simplify, 0^0 vale uno: la potenza del polinomio nullo lo rispetta
+                    polynomial = children[0] ** exponent.numerator
+            converted[node] = -polynomial if node.negated else polynomial
+        return converted[expr]
+
+    def toAddends(self, factors: dict = None):
+        '''
+        This method returns the list of the simplified addends of the polynomial.
+        The optional factors dictionary maps exponent vectors to the nodes to use as monomials.
+        '''
+        addends = []
+        for exponents, coefficient in self.terms.items():
+            if not any(exponents):
+                addends.append(Polynomial.toRational(coefficient))
+                continue
+            monomial = factors.get(exponents) if factors is not None else None
+            if monomial is None:
+                monomial = self.monomialToExpr(exponents)
+            addends.append(Add.buildAddend(Polynomial.toRational(coefficient), monomial))
+        return addends
+
+    def toExpr(self):
+        '''
+        This method converts the polynomial to the canonical simplified expression.
+        '''
+        addends = self.toAddends()
+        if len(addends) == 0:
+            return Rational(0)
+        if len(addends) == 1:
+            return addends[0]
+        return Add(addends).simplify()
+
+    def monomialToExpr(self, exponents):
+        '''
+        This method returns the monomial node, without coefficient, with the given exponent vector.
+        '''
+        factors = [Symbol(name) if exponent == 1 else Pow(Symbol(name), Rational(exponent))
+                   for name, exponent in zip(self.symbols, exponents) if exponent != 0]
+        return factors[0] if len(factors) == 1 else Mult(factors)
+
+    ##############
+    # OPERAZIONI #
+    ##############
+
+    @classmethod
+    def constant(cls, symbols, value: Fraction):
+        '''
+        This method returns the constant polynomial with the given value.
+        '''
+        return cls(symbols, {(0,) * len(symbols): value} if value != 0 else {})
+
+    def addTerm(self, exponents, coefficient: Fraction):
+        '''
+        This method adds in place a term to the polynomial, removing it if its coefficient becomes zero.
+        '''
+        value = self.terms.get(exponents, 0) + coefficient
+        if value != 0:
+            self.terms[exponents] = value
+        else:
+            self.terms.pop(exponents, None)
+
+    def isZero(self):
+        '''
+        This method is used to check if the polynomial is the zero polynomial.
+        '''
+        return len(self.terms) == 0
+
+    def degree(self, name = None):
+        '''
+        This method returns the total degree of the polynomial or, if the name of a symbol
+        is given, the degree in that symbol. The degree of the zero polynomial is -1.
+        '''
+        if self.isZero():
+            return -1
+        if name is None:
+            return max(sum(exponents) for exponents in self.terms)
+        i = self.symbols.index(name)
+        return max(exponents[i] for exponents in self.terms)
+
+    def variables(self):
+        '''
+        This method returns the names of the symbols that appear with a non zero exponent.
+        '''
+        return tuple(name for i, name in enumerate(self.symbols) if any(exponents[i] for exponents in self.terms))
+
+    def __add__(self, other):
+        polynomial = Polynomial(self.symbols, dict(self.terms))
+        for exponents, coefficient in other.terms.items():
+            polynomial.addTerm(exponents, coefficient)
+        return polynomial
+
+    def __neg__(self):
+        return Polynomial(self.symbols, {exponents: -coefficient for exponents, coefficient in self.terms.items()})
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __mul__(self, other):
+        # I polinomi univariati di grado alto vengono moltiplicati in forma densa
+        if len(self.symbols) == 1 and min(self.degree(), other.degree()) >= Polynomial.denseThreshold:
+            product = self.denseMul(other)
+        else:
+            terms = {}
+            for firstExponents, firstCoefficient in self.terms.items():
+                for secondExponents, secondCoefficient in other.terms.items():
+                    exponents = tuple(map(add, firstExponents, secondExponents))
+                    terms[exponents] = terms.get(exponents, 0) + firstCoefficient * secondCoefficient
+            product = Polynomial(self.symbols, {exponents: coefficient for exponents, coefficient in terms.items() if coefficient != 0})
+        # In modalità modulare i coefficienti vengono ridotti ad ogni prodotto, così restano limitati
+        if Rational.modulus is not None:
+            product.terms = Polynomial.reduceModulo(product.terms)
+        return product
+
+    @staticmethod
+    def reduceModulo(terms: dict):
+        '''
+        This method returns the terms with the coefficients reduced modulo Rational.modulus, as the
+        integers of least absolute value. The terms whose coefficient becomes zero are removed.
+        Raise ModularInverseError if the denominator of a coefficient is a multiple of the modulus.
+        '''
+        modulus = Rational.modulus
+        reduced = {}
+        for exponents, coefficient in terms.items():
+            if coefficient.denominator % modulus == 0:
+                raise ModularInverseError(coefficient.denominator, modulus)
+            value = coefficient.numerator * pow(coefficient.denominator, -1, modulus) % modulus
+            if value != 0:
+                reduced[exponents] = Fraction(value - modulus if 2 * value > modulus else value)
+        return reduced
+
+    def __pow__(self, exponent: int):
+        '''
+        This method raises the polynomial to a non negative integer power by repeated squaring.
+        '''
+        assert exponent >= 0, "exponent must be a non negative integer"
+        result = Polynomial.constant(self.symbols, Fraction(1))
+        base = self
+        while exponent > 0:
+            if exponent & 1:
+                result = result * base
+            exponent >>= 1
+            if exponent > 0:
+                base = base * base
+        return result
+
+    def derive(self, name):
+        '''
+        This method returns the derivative of the polynomial with respect to the symbol with the given name.
+        '''
+        if name not in self.symbols:
+            return Polynomial(self.symbols)
+        i = self.symbols.index(name)
+        terms = {}
+        for exponents, coefficient in self.terms.items():
+            if exponents[i] > 0:
+                terms[exponents[:i] + (exponents[i] - 1,) + exponents[i + 1:]] = coefficient * exponents[i]
+        return Polynomial(self.symbols, terms)
+
+    ###################
+    # DIVISIONE E MCD #
+    ###################
+
+    def isConstant(self):
+        '''
+        This method is used to check if the polynomial is a constant, zero included.
+        '''
+        return all(not any(exponents) for exponents in self.terms)
+
+    def leadingTerm(self):
+        '''
+        This method returns the leading term of a non zero polynomial in lexicographic order,
+        as a tuple (exponents, coefficient).
+        '''
+        exponents = max(self.terms)
+        return exponents, self.terms[exponents]
+
+    def scale(self, factor: Fraction):
+        '''
+        This method returns the polynomial multiplied by a rational number.
+        '''
+        if factor == 0:
+            return Polynomial(self.symbols)
+        return Polynomial(self.symbols, {exponents: coefficient * factor for exponents, coefficient in self.terms.items()})
+
+    def monic(self):
+        '''
+        This method returns the polynomial divided by the coefficient of its leading term.
+        The zero polynomial is returned unchanged.
+        '''
+        if self.isZero():
+            return self
+        return self.scale(1 / self.leadingTerm()[1])
+
+    def exactDivide(self, other):
+        '''
+        This method divides the polynomial by a non zero polynomial over the same symbols.
+        Return the quotient, or None if the division has a remainder.
+        '''
+        assert not other.isZero(), "division by the zero polynomial"
+        divisorExponents, divisorCoefficient = other.leadingTerm()
+        quotient = {}
+        remainder = Polynomial(self.symbols, dict(self.terms))
+        while not remainder.isZero():
+            exponents, coefficient = remainder.leadingTerm()
+            # In una divisione esatta il termine direttivo del resto è multiplo di quello del divisore
+            shift = tuple(map(sub, exponents, divisorExponents))
+            if min(shift, default = 0) < 0:
+                return None
+            factor = coefficient / divisorCoefficient
+            quotient[shift] = factor
+            for otherExponents, otherCoefficient in other.terms.items():
+                remainder.addTerm(tuple(map(add, shift, otherExponents)), -factor * otherCoefficient)
+        return Polynomial(self.symbols, quotient)
+
+    def degreeIn(self, i):
+        '''
+        This method returns the degree of the polynomial in the i-th symbol. The degree of the zero polynomial is -1.
+        '''
+        return max((exponents[i] for exponents in self.terms), default = -1)
+
+    def coefficientIn(self, i, degree):
+        '''
+        This method returns the coefficient of the i-th symbol raised to the given degree, seeing
+        the polynomial as univariate in that symbol with coefficients polynomials in the other ones.
+        '''
+        return Polynomial(self.symbols, {exponents[:i] + (0,) + exponents[i + 1:]: coefficient
+                                         for exponents, coefficient in self.terms.items() if exponents[i] == degree})
+
+    def shiftIn(self, i, degree):
+        '''
+        This method returns the polynomial multiplied by the i-th symbol raised to the given degree.
+        '''
+        return Polynomial(self.symbols, {exponents[:i] + (exponents[i] + degree,) + exponents[i + 1:]: coefficient
+                                         for exponents, coefficient in self.terms.items()})
+
+    def contentIn(self, i):
+        '''
+        This method returns the content of the polynomial seen as univariate in the i-th symbol,
+        that is the gcd of its coefficients.
+        '''
+        return reduce(Polynomial.gcd, (self.coefficientIn(i, degree) for degree in {exponents[i] for exponents in self.terms}))
+
+    def pseudoRemainder(self, other, i):
+        '''
+        This method returns the pseudo remainder of the division by a non zero polynomial, both
+        seen as univariate in the i-th symbol. The polynomial is multiplied by the power of the leading
+        coefficient of the divisor needed to make the division possible without fractions of polynomials.
+        '''
+        degree = other.degreeIn(i)
+        leadingCoefficient = other.coefficientIn(i, degree)
+        remainder = self
+        count = self.degreeIn(i) - degree + 1
+        while (remainderDegree := remainder.degreeIn(i)) >= degree:
+            remainder = remainder * leadingCoefficient - (remainder.coefficientIn(i, remainderDegree) * other).shiftIn(i, remainderDegree - degree)
+            count -= 1
+        return remainder * leadingCoefficient ** count
+
+    def gcd(self, other):
+        '''
+        This method returns the greatest common divisor of two polynomials over the same symbols,
+        with leading coefficient one. The gcd of two zero polynomials is zero.
+        The polynomials are seen as univariate in their first variable, with coefficients polynomials
+        in the other ones: their contents are handled recursively on the other variables, while the
+        gcd of their primitive parts is computed with the subresultant pseudo remainder sequence,
+        that keeps the coefficients from growing without computing the content at every step.
+        '''
+        if self.isZero() or other.isZero():
+            return (other if self.isZero() else self).monic()
+        variables = set(self.variables()) | set(other.variables())
+        if len(variables) == 0:
+            return Polynomial.constant(self.symbols, Fraction(1))
+        i = min(self.symbols.index(name) for name in variables)
+
+        first, second = (self, other) if self.degreeIn(i) >= other.degreeIn(i) else (other, self)
+        firstContent, secondContent = first.contentIn(i), second.contentIn(i)
+        content = firstContent.gcd(secondContent)
+        first, second = first.exactDivide(firstContent), second.exactDivide(secondContent)
+
+        one = Polynomial.constant(self.symbols, Fraction(1))
+        g, h = one, one
+        while True:
+            delta = first.degreeIn(i) - second.degreeIn(i)
+            remainder = first.pseudoRemainder(second, i)
+            if remainder.isZero():
+                break
+            # Un resto costante nella variabile principale: le parti primitive sono coprime
+            if remainder.degreeIn(i) == 0:
+                return content.monic()
+            first, second = second, remainder.exactDivide(g * h ** delta)
+            g = first.coefficientIn(i, first.degreeIn(i))
+            h = (g ** delta).exactDivide(h ** (delta - 1)) if delta > 0 else h
+        return (content * second.exactDivide(second.contentIn(i))).monic()
+
+    ######################
+    # FUNZIONI RAZIONALI #
+    ######################
+
+    @staticmethod
+    def reduceQuotient(numerator, denominator):
+        '''
+        This method reduces the quotient of two polynomials to lowest terms, dividing both by their gcd.
+        Return a tuple (numerator, denominator), where the denominator has leading coefficient one.
+        '''
+        if numerator.isZero():
+            return numerator, Polynomial.constant(numerator.symbols, Fraction(1))
+        if not denominator.isConstant():
+            divisor = numerator.gcd(denominator)
+            numerator, denominator = numerator.exactDivide(divisor), denominator.exactDivide(divisor)
+        leadingCoefficient = denominator.leadingTerm()[1]
+        return numerator.scale(1 / leadingCoefficient), denominator.scale(1 / leadingCoefficient)
+
+    @staticmethod
+    def addQuotients(first, second):
+        '''
+        This method adds two reduced quotients over their least common denominator.
+        '''
+        (firstNumerator, firstDenominator), (secondNumerator, secondDenominator) = first, second
+        if firstDenominator.isConstant() and secondDenominator.isConstant():
+            return firstNumerator + secondNumerator, firstDenominator
+        divisor = firstDenominator.gcd(secondDenominator)
+        firstCofactor, secondCofactor = secondDenominator.exactDivide(divisor), firstDenominator.exactDivide(divisor)
+        return Polynomial.reduceQuotient(firstNumerator * firstCofactor + secondNumerator * secondCofactor, firstDenominator * firstCofactor)
+
+    @classmethod
+    def quotientFromExpr(cls, expr: BaseLuppExpr, symbols = None):
+        '''
+        This method converts an expression to a reduced quotient of two polynomials over the given
+        symbols, or over the symbols of the expression if they are not given. The expression is
+        visited iteratively and every subexpression is reduced to lowest terms, so the intermediate
+        quotients do not grow.
+        Return a tuple (numerator, denominator), or None if the expression is not a rational function,
+        that is if it contains a power whose exponent is not an integer or a division by zero.
+        '''
+        symbols = Polynomial.collectSymbols(expr) if symbols is None else tuple(symbols)
+        index = {name: i for i, name in enumerate(symbols)}
+        one = cls.constant(symbols, Fraction(1))
+        converted = {}
+        for node in BaseLuppExpr.postOrder(expr):
+            children = [converted[child] for child in node.children]
+            match node.kind:
+                case NodeKind.RATIONAL:
+                    quotient = (cls.constant(symbols, Fraction(node.numerator, node.denominator)), one)
+                case NodeKind.SYMBOL:
+                    exponents = [0] * len(symbols)
+                    exponents[index[node.getPayload()]] = 1
+                    quotient = (cls(symbols, {tuple(exponents): Fraction(1)}), one)
+                case NodeKind.ADD:
+                    quotient = reduce(Polynomial.addQuotients, children)
+                case NodeKind.MULT:
+                    quotient = children[0]
+                    for numerator, denominator in children[1:]:
+                        quotient = Polynomial.reduceQuotient(quotient[0] * numerator, quotient[1] * denominator)
+                case NodeKind.POW:
+                    exponent = node.children[1]
+                    if exponent.kind != NodeKind.RATIONAL or exponent.denominator != 1:
+                        return None
+                    numerator, denominator = children[0]
+                    # Come in Pow.simplify, 0^0 vale uno e una base nulla con esponente positivo dà zero
+                    if exponent.isZero():
+                        quotient = (numerator ** 0, denominator ** 0)
+                    elif numerator.isZero():
+                        if exponent.negated:
+                            return None
+                        quotient = children[0]
+                    elif exponent.negated:
+                        leadingCoefficient = numerator.leadingTerm()[1]
+                        quotient = (denominator.scale(1 / leadingCoefficient) ** exponent.numerator, numerator.scale(1 / leadingCoefficient) ** exponent.numerator)
+                    else:
+                        quotient = (numerator ** exponent.numerator, denominator ** exponent.numerator)
+            converted[node] = (-quotient[0], quotient[1]) if node.negated else quotient
+        return converted[expr]
+
+    @staticmethod
+    def cancel(expr: BaseLuppExpr):
+        '''
+        This method normalizes a rational function: the expression is brought to a single quotient of
+        two polynomials without common factors, whose denominator has leading coefficient one.
+        Expressions that are not rational functions are returned simplified but otherwise unchanged.
+        '''
+        # Il risultato è già ridotto: la riduzione automatica di Mult.simplify viene sospesa.
+        # Le divisioni esatte del massimo comun divisore richiedono coefficienti razionali esatti,
+        # quindi anche la modalità modulare viene sospesa e il risultato viene ridotto dopo
+        enabled, Mult.cancelQuotients = Mult.cancelQuotients, False
+        modulus, Rational.modulus = Rational.modulus, None
+        try:
+            if (quotient := Polynomial.quotientFromExpr(expr)) is None:
+                return expr.simplify()
+            numerator, denominator = quotient
+            if denominator.isConstant():
+                return numerator.toExpr()
+            return Mult([numerator.toExpr(), Pow(denominator.toExpr(), Rational(-1))]).simplify()
+        finally:
+            Mult.cancelQuotients = enabled
+            Rational.modulus = modulus
+
+    ##################
+    # FORMA DENSA #
+    ##################
+
+    def toDense(self):
+        '''
+        This method returns the list of the coefficients of a univariate polynomial, indexed by exponent.
+        '''
+        assert len(self.symbols) == 1, "only univariate polynomials have a dense representation"
+        coefficients = [Fraction(0)] * (self.degree() + 1)
+        for (exponent,), coefficient in self.terms.items():
+            coefficients[exponent] = coefficient
+        return coefficients
+
+    @classmethod
+    def fromDense(cls, symbols, coefficients):
+        '''
+        This method builds a univariate polynomial from the list of its coefficients, indexed by exponent.
+        '''
+        return cls(symbols, {(exponent,): coefficient for exponent, coefficient in enumerate(coefficients) if coefficient != 0})
+
+    def denseMul(self, other):
+        '''
+        This method multiplies two univariate polynomials through their dense representation.
+        The coefficients are brought to integers by the least common multiple of their denominators
+        and multiplied with kroneckerMultiply.
+        '''
+        first, second = self.toDense(), other.toDense()
+        firstScale = lcm(*(coefficient.denominator for coefficient in first))
+        secondScale = lcm(*(coefficient.denominator for coefficient in second))
+        product = Polynomial.kroneckerMultiply(
+            [coefficient.numerator * (firstScale // coefficient.denominator) for coefficient in first],
+            [coefficient.numerator * (secondScale // coefficient.denominator) for coefficient in second]
+        )
+        scale = firstScale * secondScale
+        return Polynomial.fromDense(self.symbols, [Fraction(coefficient, scale) for coefficient in product])
+
+    @staticmethod
+    def kroneckerMultiply(first, second):
+        '''
+        This method multiplies two dense polynomials with integer coefficients through the
+        Kronecker substitution. Both polynomials are evaluated in a power of two large enough to
+        keep the coefficients of the product separated, the two values are multiplied as Python
+        integers and the coefficients of the product are read back from the bytes of the result.
+        '''
+        bound = min(len(first), len(second)) * max(map(abs, first)) * max(map(abs, second))
+        # Byte per coefficiente: i coefficienti sono spostati di offset per renderli non negativi
+        size = bound.bit_length() // 8 + 1
+        offset = 1 << (8 * size - 1)
+        offsetBytes = offset.to_bytes(size, "little")
+
+        def evaluate(coefficients):
+            packed = b"".join((coefficient + offset).to_bytes(size, "little") for coefficient in coefficients)
+            return int.from_bytes(packed, "little") - int.from_bytes(offsetBytes * len(coefficients), "little")
+
+        length = len(first) + len(second) - 1
+        product = evaluate(first) * evaluate(second) + int.from_bytes(offsetBytes * length, "little")
+        data = product.to_bytes(size * length, "little")
+        return [int.from_bytes(data[i * size:(i + 1) * size], "little") - offset for i in range(length)]
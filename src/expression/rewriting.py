@@ -0,0 +1,299 @@
+from weakref import WeakKeyDictionary
+
+from src.expression.BaseLuppExpr import BaseLuppExpr
+from src.utils.NodeKind import NodeKind
+
+
+def isCommutative(kind):
+    '''
+    This function returns True if the children of the nodes with the given kind tag are unordered.
+    As in BaseLuppExpr, only the children of a power are ordered.
+    '''
+    return kind != NodeKind.POW
+
+
+def matchPattern(pattern, node, bindings: dict):
+    '''
+    This function matches the node against a pattern element, that can be a Wild, a Pattern or
+    a concrete expression node, matched by identity since nodes are interned.
+    Return the bindings extended with the wildcards of the pattern, or None if the node does not match.
+    '''
+    if isinstance(pattern, BaseLuppExpr):
+        return bindings if pattern is node else None
+    return pattern.match(node, bindings)
+
+
+class Wild:
+    '''
+    This class represents a wildcard of a rewrite pattern, that matches a single node.
+    '''
+
+    def __init__(self, name: str = None, kind = None, negated: bool = None, condition = None):
+        '''
+        This method initializes the Wild object. The method takes the following parameters:
+        - name: the name the matched node is bound to. Wildcards with the same name must match the same node. Default is None, that is not bound.
+        - kind: the kind tag the matched node must have, as defined in NodeKind. Default is None, that is any kind.
+        - negated: the negation the matched node must have. Default is None, that is any negation.
+        - condition: a predicate on the matched node. Default is None.
+        '''
+        self.name = name
+        self.kind = kind
+        self.negated = negated
+        self.condition = condition
+
+    def shape(self):
+        '''
+        This method returns the key of the wildcard in the discrimination tree.
+        '''
+        return DiscriminationTree.ANY if self.kind is None else self.kind
+
+    def keys(self):
+        return [self.shape()]
+
+    def match(self, node, bindings: dict):
+        if self.kind is not None and node.kind != self.kind:
+            return None
+        if self.negated is not None and node.negated != self.negated:
+            return None
+        if self.condition is not None and not self.condition(node):
+            return None
+        if self.name is None:
+            return bindings
+        if self.name in bindings:
+            return bindings if bindings[self.name] is node else None
+        return {**bindings, self.name: node}
+
+
+class Pattern:
+    '''
+    This class represents a rewrite pattern over an Add, Mult or Pow node.
+    The children of a power are matched in order, while the children of sums and products
+    are matched in any order. A pattern over a sum or a product can bind the children that
+    are not matched by its children patterns to a rest wildcard, as a tuple.
+    '''
+
+    def __init__(self, head, children: list, negated: bool = None, rest: str = None):
+        '''
+        This method initializes the Pattern object. The method takes the following parameters:
+        - head: the class of the matched node.
+        - children: the list of the patterns of the children. Each one can be a Wild, a Pattern or an expression node.
+        - negated: the negation the matched node must have. Default is None, that is any negation.
+        - rest: the name the remaining children are bound to. Default is None, that is no remaining children are allowed.
+        '''
+        assert rest is None or isCommutative(head.kind), "only sums and products can have a rest wildcard"
+        self.head = head
+        self.children = list(children)
+        self.negated = negated
+        self.rest = rest
+
+    def shape(self):
+        return self.head.kind
+
+    def keys(self):
+        '''
+        This method returns the keys of the pattern in the discrimination tree: the head, with the
+        number of children for sums and products, followed by the shapes of the children of a power.
+        '''
+        if not isCommutative(self.head.kind):
+            return [self.head.kind] + [DiscriminationTree.shapeOf(child) for child in self.children]
+        return [(self.head.kind, None if self.rest is not None else len(self.children))]
+
+    def match(self, node, bindings: dict):
+        if node.kind != self.head.kind:
+            return None
+        if self.negated is not None and node.negated != self.negated:
+            return None
+        children = node.children
+        if len(children) < len(self.children) or (self.rest is None and len(children) != len(self.children)):
+            return None
+
+        if not isCommutative(self.head.kind):
+            for childPattern, child in zip(self.children, children):
+                bindings = matchPattern(childPattern, child, bindings)
+                if bindings is None:
+                    return None
+            return bindings
+
+        # Ricerca con backtracking di un assegnamento dei figli ai pattern, con uno stack esplicito
+        stack = [(0, frozenset(), bindings)]
+        while stack:
+            index, used, current = stack.pop()
+            if index == len(self.children):
+                if self.rest is None:
+                    return current
+                return {**current, self.rest: tuple(child for position, child in enumerate(children) if position not in used)}
+            for position in reversed(range(len(children))):
+                if position not in used and (matched := matchPattern(self.children[index], children[position], current)) is not None:
+                    stack.append((index + 1, used | {position}, matched))
+        return None
+
+
+class Rule:
+    '''
+    This class represents a rewrite rule. When the pattern matches a node, the build function is
+    called with the node and the bindings of the wildcards as keyword arguments. It returns the
+    rewritten expression, or None if the rule does not apply to the node.
+    '''
+
+    def __init__(self, pattern, build, name: str = None):
+        '''
+        This method initializes the Rule object. The method takes the following parameters:
+        - pattern: the Pattern, Wild or expression node that the rule rewrites.
+        - build: the function that builds the rewritten expression.
+        - name: the name of the rule, used only for debugging. Default is None.
+        '''
+        self.pattern = pattern
+        self.build = build
+        self.name = name
+
+    def apply(self, node):
+        '''
+        This method applies the rule to the node. Return the rewritten expression, or None if the rule does not apply.
+        '''
+        bindings = matchPattern(self.pattern, node, {})
+        if bindings is None:
+            return None
+        return self.build(node, **bindings)
+
+
+class DiscriminationTree:
+    '''
+    This class indexes the rules by the head of their pattern and by the shape of its arguments,
+    so that only the rules that can match a node are tried. Every path of the tree is the list
+    of keys of a pattern, where ANY matches every key.
+    '''
+
+    ANY = "*"
+    # Chiave riservata con cui i nodi dell'albero memorizzano le regole che terminano in essi
+    RULES = None
+
+    def __init__(self):
+        self.root = {}
+
+    @staticmethod
+    def shapeOf(pattern):
+        '''
+        This method returns the key of a pattern element used as an argument of a power.
+        '''
+        if isinstance(pattern, BaseLuppExpr):
+            return pattern.kind
+        return pattern.shape()
+
+    @staticmethod
+    def termKeys(node):
+        '''
+        This method returns the keys of the node, computed like the keys of the patterns.
+        '''
+        if len(node.children) == 0:
+            return [node.kind]
+        if not isCommutative(node.kind):
+            return [node.kind] + [child.kind for child in node.children]
+        return [(node.kind, len(node.children))]
+
+    def insert(self, keys, value):
+        '''
+        This method adds the value at the end of the path given by the keys.
+        '''
+        treeNode = self.root
+        for key in keys:
+            treeNode = treeNode.setdefault(key, {})
+        treeNode.setdefault(DiscriminationTree.RULES, []).append(value)
+
+    def lookup(self, keys):
+        '''
+        This method returns the values whose path matches the keys of a node.
+        '''
+        # Per somme e prodotti vale anche la chiave dei pattern con un numero qualsiasi di figli
+        alternatives = [keys[0]] if not isinstance(keys[0], tuple) else [keys[0], (keys[0][0], None)]
+        found = []
+        frontier = [self.root]
+        for depth, key in enumerate(keys):
+            candidates = alternatives if depth == 0 else [key]
+            frontier = [child for treeNode in frontier for edge in (*candidates, DiscriminationTree.ANY) if (child := treeNode.get(edge)) is not None]
+            for treeNode in frontier:
+                found.extend(treeNode.get(DiscriminationTree.RULES, ()))
+        return found
+
+
+class RuleSet:
+    '''
+    This class represents an ordered set of rewrite rules, indexed in a discrimination tree.
+    When more rules match a node, the first one in the set is applied.
+    '''
+
+    def __init__(self, rules: list = None):
+        '''
+        This method initializes the RuleSet object with the given list of rules.
+        '''
+        self.rules = []
+        self.index = DiscriminationTree()
+        # Forme normali già calcolate. I nodi sono internati, quindi il risultato vale per ogni espressione
+        self.normalForms = WeakKeyDictionary()
+        # Regole candidate per ogni lista di chiavi già cercata nell'indice
+        self.candidatesCache = {}
+        for rule in rules or []:
+            self.addRule(rule)
+
+    def addRule(self, rule: Rule):
+        '''
+        This method adds a rule to the end of the set.
+        '''
+        self.index.insert(rule.pattern.keys() if not isinstance(rule.pattern, BaseLuppExpr) else DiscriminationTree.termKeys(rule.pattern),
+                          (len(self.rules), rule))
+        self.rules.append(rule)
+        self.normalForms = WeakKeyDictionary()
+        self.candidatesCache = {}
+
+    def candidates(self, node):
+        '''
+        This method returns the rules that can match the node, in the order of the set.
+        '''
+        keys = tuple(DiscriminationTree.termKeys(node))
+        if (candidates := self.candidatesCache.get(keys)) is None:
+            candidates = [rule for _, rule in sorted(self.index.lookup(keys), key = lambda entry: entry[0])]
+            self.candidatesCache[keys] = candidates
+        return candidates
+
+    def applyFirst(self, node):
+        '''
+        This method applies to the node the first rule that matches it.
+        Return the rewritten expression, or the node itself if no rule applies.
+        '''
+        for rule in self.candidates(node):
+            if (result := rule.apply(node)) is not None:
+                return result
+        return node
+
+    def rewrite(self, expr):
+        '''
+        This method rewrites the expression to its normal form with respect to the rules. The nodes
+        are rewritten bottom up and the rules are applied to every node until no rule applies.
+        The results of the rules are rewritten through the same explicit worklist, so long chains
+        of rewrites do not recurse. The normal forms are memoized, so shared subexpressions are
+        rewritten once.
+        '''
+        normalForms = self.normalForms
+        # Ogni elemento contiene il nodo, se i suoi figli sono già stati visitati e, dopo
+        # l'applicazione di una regola, la coppia del nodo riscritto e del risultato della regola
+        stack = [(expr, False, None)]
+        while stack:
+            node, visited, rewritten = stack.pop()
+            if rewritten is not None:
+                # La forma normale del risultato della regola vale anche per il nodo
+                current, result = rewritten
+                normalForms[node] = normalForms[current] = normalForms[result]
+            elif node in normalForms:
+                continue
+            elif not visited:
+                stack.append((node, True, None))
+                stack.extend((child, False, None) for child in node.children if child not in normalForms)
+            else:
+                current = node.copy_with_children([normalForms[child] for child in node.children])
+                result = self.applyFirst(current)
+                if result is current:
+                    normalForms[node] = normalForms[current] = current
+                else:
+                    # Il risultato di una regola può contenere nuovi nodi, quindi viene riscritto a sua volta
+                    stack.append((node, True, (current, result)))
+                    stack.append((result, False, None))
+        return normalForms[expr]
@@ -0,0 +1,309 @@
+from operator import attrgetter
+
+
+class TermTreeNode:
+    '''
+    This class represents a node of a TermTree. The nodes are never edited after the update that
+    creates them, so they are shared by all the versions of the tree.
+    '''
+
+    __slots__ = ("key", "value", "priority", "left", "right", "size", "hashSum")
+
+    def __init__(self, key, value, priority, left = None, right = None):
+        self.key = key
+        self.value = value
+        self.priority = priority
+        self.left = left
+        self.right = right
+
+    def copy(self):
+        return TermTreeNode(self.key, self.value, self.priority, self.left, self.right)
+
+    def update(self):
+        '''
+        This method computes the number of keys and the sum of their hashes in the subtree.
+        '''
+        self.size = 1
+        self.hashSum = self.key._hash
+        for child in (self.left, self.right):
+            if child is not None:
+                self.size += child.size
+                self.hashSum += child.hashSum
+        return self
+
+
+class TermTree:
+    '''
+    This class is a persistent sorted map of expression nodes, implemented as a treap. The keys are
+    kept in the order given by the compare function, so they can be read in order without sorting them.
+    The updates do not edit the tree: set and remove return a new tree that shares with the old one
+    all the nodes out of the path to the updated key, so an update costs O(log n) and the old tree
+    stays valid. The priorities are derived from the hashes of the keys, so the shape of the tree
+    depends only on its keys. The tree also keeps the number of keys and the sum of their hashes,
+    from which the sums and the products built on it compute their intern key, see ChildrenKey.
+    All the visits use loops, so they are not limited by the recursion limit.
+    '''
+
+    __slots__ = ("root", "compare")
+
+    def __init__(self, compare, root = None):
+        '''
+        This method initializes the TermTree object. The method takes the following parameters:
+        - compare: the function that returns a negative number, zero or a positive number if
+          its first argument comes before, is equal to or comes after the second one.
+        - root: the root node of the tree. Default is None, that is the empty tree.
+        '''
+        self.compare = compare
+        self.root = root
+
+    @staticmethod
+    def priority(key):
+        # Il prodotto per una costante dispari rimescola i bit dell'hash
+        return (key._hash * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+
+    @staticmethod
+    def fromSorted(keys, compare, values = None):
+        '''
+        This method builds the tree from a list of distinct keys already in order, in linear time.
+        The optional list values contains the value of every key, by default None.
+        '''
+        values = [None] * len(keys) if values is None else values
+        # Costruzione dell'albero cartesiano: la pila contiene il ramo destro dell'albero parziale
+        stack = []
+        for key, value in zip(keys, values):
+            node = TermTreeNode(key, value, TermTree.priority(key))
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = stack.pop()
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        root = stack[0] if stack else None
+        for node in TermTree.postOrder(root):
+            node.update()
+        return TermTree(compare, root)
+
+    @staticmethod
+    def postOrder(root):
+        '''
+        This method iterates over the nodes of the subtree rooted in root, children before parents.
+        '''
+        stack = [(root, False)]
+        while stack:
+            node, ready = stack.pop()
+            if node is None:
+                continue
+            if ready:
+                yield node
+                continue
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+
+    def __len__(self):
+        return 0 if self.root is None else self.root.size
+
+    @property
+    def hashSum(self):
+        '''
+        The sum of the hashes of the keys.
+        '''
+        return 0 if self.root is None else self.root.hashSum
+
+    def __iter__(self):
+        '''
+        This method iterates over the keys in order.
+        '''
+        return map(attrgetter("key"), self.nodes())
+
+    def items(self):
+        '''
+        This method iterates over the pairs of key and value in order.
+        '''
+        return ((node.key, node.value) for node in self.nodes())
+
+    def nodes(self):
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
+
+    def first(self):
+        '''
+        This method returns the first key, or None if the tree is empty.
+        '''
+        node = self.root
+        if node is None:
+            return None
+        while node.left is not None:
+            node = node.left
+        return node.key
+
+    def get(self, key, default = None):
+        '''
+        This method returns the value of the key, or default if the key is not in the tree.
+        '''
+        node = self.root
+        while node is not None:
+            if node.key is key:
+                return node.value
+            node = node.left if self.compare(key, node.key) < 0 else node.right
+        return default
+
+    def set(self, key, value = None):
+        '''
+        This method returns a new tree where the key has the given value.
+        '''
+        priority = TermTree.priority(key)
+        # Discesa fino al nodo con la chiave o fino alla posizione del nuovo nodo
+        path = []
+        node = self.root
+        while node is not None and node.key is not key and node.priority >= priority:
+            goLeft = self.compare(key, node.key) < 0
+            path.append((node, goLeft))
+            node = node.left if goLeft else node.right
+        if node is not None and node.key is key:
+            replaced = TermTreeNode(key, value, priority, node.left, node.right)
+        else:
+            left, right = self.__split(node, key)
+            replaced = TermTreeNode(key, value, priority, left, right)
+        return TermTree(self.compare, self.__rebuild(path, replaced.update()))
+
+    def remove(self, key):
+        '''
+        This method returns a new tree without the key. If the key is not in the tree, the tree itself is returned.
+        '''
+        path = []
+        node = self.root
+        while node is not None and node.key is not key:
+            goLeft = self.compare(key, node.key) < 0
+            path.append((node, goLeft))
+            node = node.left if goLeft else node.right
+        if node is None:
+            return self
+        return TermTree(self.compare, self.__rebuild(path, self.__merge(node.left, node.right)))
+
+    @staticmethod
+    def __rebuild(path, node):
+        '''
+        Copy the nodes of the path from the root, from the bottom, replacing the last child with node.
+        '''
+        for parent, goLeft in reversed(path):
+            parent = parent.copy()
+            if goLeft:
+                parent.left = node
+            else:
+                parent.right = node
+            node = parent.update()
+        return node
+
+    def __split(self, node, key):
+        '''
+        Split the subtree in the keys before and after the key, which must not be in the subtree.
+        The nodes on the path of the key are copied, the others are shared.
+        '''
+        left = right = lastLeft = lastRight = None
+        created = []
+        while node is not None:
+            copy = node.copy()
+            created.append(copy)
+            if self.compare(node.key, key) < 0:
+                if lastLeft is None:
+                    left = copy
+                else:
+                    lastLeft.right = copy
+                lastLeft = copy
+                node = node.right
+            else:
+                if lastRight is None:
+                    right = copy
+                else:
+                    lastRight.left = copy
+                lastRight = copy
+                node = node.left
+        if lastLeft is not None:
+            lastLeft.right = None
+        if lastRight is not None:
+            lastRight.left = None
+        # Le copie sono state create dall'alto verso il basso
+        for copy in reversed(created):
+            copy.update()
+        return left, right
+
+    @staticmethod
+    def __merge(left, right):
+        '''
+        Join two subtrees, where all the keys of left come before the keys of right.
+        '''
+        root = parent = None
+        parentLeft = False
+        created = []
+        while left is not None and right is not None:
+            if left.priority >= right.priority:
+                copy = left.copy()
+                left, nextLeft = left.right, False
+            else:
+                copy = right.copy()
+                right, nextLeft = right.left, True
+            if parent is None:
+                root = copy
+            elif parentLeft:
+                parent.left = copy
+            else:
+                parent.right = copy
+            created.append(copy)
+            parent, parentLeft = copy, nextLeft
+        rest = left if left is not None else right
+        if parent is None:
+            return rest
+        if parentLeft:
+            parent.left = rest
+        else:
+            parent.right = rest
+        for copy in reversed(created):
+            copy.update()
+        return root
+
+
+class ChildrenKey:
+    '''
+    This class is the intern key of the sums and the products, whose children are unordered.
+    The hash is computed from the sum of the hashes of the children, so it is the same whether
+    the children are given as a tuple or as a TermTree, where the sum is kept by the tree and
+    costs O(1). The children are compared by identity only when the hashes are equal.
+    '''
+
+    __slots__ = ("cls", "negated", "source", "hashValue")
+
+    def __init__(self, cls, negated, source):
+        '''
+        This method initializes the ChildrenKey object. The method takes the following parameters:
+        - cls: the class of the node.
+        - negated: the negation of the node.
+        - source: the children of the node in canonical order, as a tuple or as a TermTree.
+        '''
+        self.cls = cls
+        self.negated = negated
+        self.source = source
+        hashSum = source.hashSum if isinstance(source, TermTree) else sum(map(attrgetter("_hash"), source))
+        self.hashValue = hash((cls, negated, len(source), hashSum))
+
+    def children(self):
+        return tuple(self.source) if isinstance(self.source, TermTree) else self.source
+
+    def __hash__(self):
+        return self.hashValue
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, ChildrenKey) or self.hashValue != other.hashValue or self.cls is not other.cls \
+                or self.negated != other.negated or len(self.source) != len(other.source):
+            return False
+        return all(map(lambda first, second: first is second, self.children(), other.children()))
@@ -0,0 +1,199 @@
+from fractions import Fraction
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from src.expression.BaseLuppExpr import BaseLuppExpr
+from src.utils.NodeKind import NodeKind
+
+
+class VectorizedExpr:
+    '''
+    This class compiles an expression into a vectorized evaluator over NumPy arrays. The compiled
+    program has one instruction for every distinct subexpression: nodes are interned, so the
+    subexpressions that appear more than once are evaluated once (common subexpression elimination).
+    The subexpressions without symbols are evaluated when the expression is compiled.
+    Every instruction works on whole arrays, so evaluating the expression at n points costs one
+    visit of the program instead of n visits of the tree.
+    The evaluator works in float64 or, in exact mode, on arrays of dtype object that contain
+    Fractions. NumPy is an optional dependency: it is required only by this class.
+    '''
+
+    def __init__(self, expr: BaseLuppExpr, symbols = None, exact: bool = False):
+        '''
+        This method compiles the expression. The parameters are:
+        - expr: the expression to compile.
+        - symbols: the names of the symbols that are given to evaluate, in the order used by __call__.
+          Default is the sorted list of the symbols of the expression.
+        - exact: True to evaluate exactly with Fractions, False to evaluate in float64. Default is False.
+        Raise ImportError if NumPy is not installed and ValueError if a symbol of the expression is not
+        in symbols or, in exact mode, if the expression contains a power with a non integer exponent.
+        '''
+        if numpy is None:
+            raise ImportError("NumPy is required to vectorize the evaluation of expressions")
+        self.expr = expr
+        self.exact = exact
+        self.symbols = tuple(sorted(expr.freeSymbols) if symbols is None else symbols)
+        if missing := expr.freeSymbols.difference(self.symbols):
+            raise ValueError(f"Symbols {sorted(missing)} of the expression are not given to the evaluator")
+        self.__compile()
+
+    ##################
+    # COMPILAZIONE #
+    ##################
+
+    def __compile(self):
+        '''
+        This method builds the program of the expression: the list of the instructions, the values
+        of the constant subexpressions and, for every instruction, the slots that are not used after it.
+        '''
+        # Ogni nodo distinto ha uno slot: i nodi sono internati, quindi le sottoespressioni
+        # ripetute hanno lo stesso slot e vengono calcolate una volta sola
+        slots = {}
+        self.constants = {}
+        self.instructions = []
+        for node in BaseLuppExpr.postOrder(self.expr, prune = lambda node: node in slots):
+            slot = slots[node] = len(slots)
+            if not node.freeSymbols:
+                self.constants[slot] = self.__constant(node, [self.constants[slots[child]] for child in node.children])
+            elif node.kind == NodeKind.SYMBOL:
+                self.instructions.append((slot, NodeKind.SYMBOL, self.symbols.index(node.getPayload()), node.negated))
+            else:
+                if self.exact and node.kind == NodeKind.POW and not VectorizedExpr.isIntegerExponent(node.children[1]):
+                    raise ValueError("Powers with non integer exponents cannot be evaluated exactly")
+                self.instructions.append((slot, node.kind, [slots[child] for child in node.children], node.negated))
+        self.root = slots[self.expr]
+
+        # Gli array intermedi vengono rilasciati dopo il loro ultimo utilizzo, così la memoria
+        # occupata non cresce con il numero di sottoespressioni
+        lastUse = {}
+        for position, (_, kind, operands, _) in enumerate(self.instructions):
+            if kind != NodeKind.SYMBOL:
+                for operand in operands:
+                    lastUse[operand] = position
+        self.releases = [[] for _ in self.instructions]
+        for slot, position in lastUse.items():
+            if slot not in self.constants and slot != self.root:
+                self.releases[position].append(slot)
+
+    def __constant(self, node: BaseLuppExpr, operands: list):
+        '''
+        This method evaluates a subexpression without symbols, given the values of its children.
+        '''
+        if node.kind == NodeKind.RATIONAL:
+            value = Fraction(node.numerator, node.denominator) if self.exact else numpy.float64(node.numerator / node.denominator)
+            return -value if node.negated else value
+        if self.exact and node.kind == NodeKind.POW and not VectorizedExpr.isIntegerExponent(node.children[1]):
+            raise ValueError("Powers with non integer exponents cannot be evaluated exactly")
+        return VectorizedExpr.__apply(node.kind, operands, node.negated)
+
+    @staticmethod
+    def isIntegerExponent(exponent: BaseLuppExpr):
+        '''
+        This method checks if the exponent of a power is an integer number.
+        '''
+        return exponent.kind == NodeKind.RATIONAL and exponent.denominator == 1
+
+    @staticmethod
+    def __apply(kind, operands: list, negated: bool):
+        '''
+        This method applies the operation of a node to the values of its children,
+        that can be arrays or scalars.
+        '''
+        match kind:
+            case NodeKind.ADD:
+                value = operands[0] + operands[1]
+                for operand in operands[2:]:
+                    value = value + operand
+            case NodeKind.MULT:
+                value = operands[0] * operands[1]
+                for operand in operands[2:]:
+                    value = value * operand
+            case NodeKind.POW:
+                base, exponent = operands
+                # Gli esponenti interi esatti restano interi, così le potenze di Fraction restano esatte
+                value = base ** (int(exponent) if isinstance(exponent, Fraction) and exponent.denominator == 1 else exponent)
+        return -value if negated else value
+
+    #################
+    # VALUTAZIONE #
+    #################
+
+    def __call__(self, *values):
+        '''
+        This method evaluates the expression with the values of the symbols given in the order of symbols.
+        '''
+        if len(values) != len(self.symbols):
+            raise ValueError(f"The evaluator needs {len(self.symbols)} values, {len(values)} were given")
+        return self.evaluate(dict(zip(self.symbols, values)))
+
+    def evaluate(self, values: dict):
+        '''
+        This method evaluates the expression. values maps the name of every symbol to its values,
+        as an array or a scalar; the arrays are broadcast together as in NumPy.
+        Return an array with the broadcast shape of the values, of dtype float64 or, in exact mode,
+        of dtype object with Fraction elements.
+        '''
+        if missing := set(self.symbols).difference(values):
+            raise ValueError(f"Values of symbols {sorted(missing)} are not given")
+        inputs = [self.toArray(values[name]) for name in self.symbols]
+        shape = numpy.broadcast_shapes(*(array.shape for array in inputs))
+
+        slots = dict(self.constants)
+        for position, (slot, kind, operands, negated) in enumerate(self.instructions):
+            if kind == NodeKind.SYMBOL:
+                slots[slot] = -inputs[operands] if negated else inputs[operands]
+            else:
+                slots[slot] = VectorizedExpr.__apply(kind, [slots[operand] for operand in operands], negated)
+            for released in self.releases[position]:
+                del slots[released]
+
+        result = slots[self.root]
+        # Le espressioni che non dipendono da tutti i simboli vengono estese alla forma dei valori
+        if numpy.shape(result) != shape:
+            result = numpy.array(numpy.broadcast_to(numpy.asarray(result, dtype = object if self.exact else numpy.float64), shape))
+        return result
+
+    def grid(self, ranges: dict):
+        '''
+        This method evaluates the expression on the cartesian grid of the ranges. ranges maps the
+        name of every symbol to a tuple (start, stop, count) of count equally spaced points from start
+        to stop included. The axes of the result follow the order of the symbols.
+        '''
+        if missing := set(self.symbols).difference(ranges):
+            raise ValueError(f"Ranges of symbols {sorted(missing)} are not given")
+        values = {}
+        for axis, name in enumerate(self.symbols):
+            # Ogni asse ha lunghezza uno nelle altre dimensioni: la griglia completa
+            # viene costruita dal broadcasting, solo per il risultato
+            shape = [1] * len(self.symbols)
+            shape[axis] = -1
+            values[name] = self.points(*ranges[name]).reshape(shape)
+        return self.evaluate(values)
+
+    def points(self, start, stop, count: int):
+        '''
+        This method returns the array of count equally spaced points from start to stop included.
+        In exact mode the points are Fractions.
+        '''
+        if count < 1:
+            raise ValueError("The number of points of a range must be positive")
+        if not self.exact:
+            return numpy.linspace(float(start), float(stop), count)
+        start, stop = Fraction(start), Fraction(stop)
+        step = (stop - start) / (count - 1) if count > 1 else 0
+        points = numpy.empty(count, dtype = object)
+        points[:] = [start + step * index for index in range(count)]
+        return points
+
+    def toArray(self, values):
+        '''
+        This method converts the values of a symbol to an array of float64 or, in exact mode,
+        to an array of dtype object with Fraction elements.
+        '''
+        if not self.exact:
+            return numpy.asarray(values, dtype = numpy.float64)
+        array = numpy.asarray(values, dtype = object)
+        return numpy.frompyfunc(Fraction, 1, 1)(array) if array.ndim > 0 else numpy.array(Fraction(array.item()), dtype = object)
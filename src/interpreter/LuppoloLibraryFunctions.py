@@ -1,10 +1,17 @@
 
 
+from fractions import Fraction
+from math import isfinite
+
 from src.utils.LuppoloLogger import LuppoloLogger
 
 from src.expression.BaseLuppExpr import BaseLuppExpr
 from src.expression.leaf import Rational, Symbol
 from src.expression.nodes import Pow
+from src.expression.polynomial import Polynomial
+from src.expression.identity import PolynomialIdentity
+from src.expression.vectorized import VectorizedExpr
+from src.expression.multipoint import MultipointEvaluation
 
 from src.interpreter.LuppoloInterpException import LuppoloInterpException
 
@@ -20,13 +27,20 @@ class LuppoloLibraryFunctions:
     def Expand(expr):
         '''
         This function expands the expression passed as argument and returns it.
+        If the expression is a polynomial, it is expanded through the sparse polynomial representation,
+        otherwise it is fully expanded in a single traversal.
+        Very wide sums and products are expanded in parallel when the parallel mode is enabled.
         '''
         if not isinstance(expr, BaseLuppExpr):
             LuppLoggerWitExc.logError("Argument passed to Expand function is not an expression.")
         
-        while expr != (res:=expr.expand()):
-            expr = res
-        return expr
+        if BaseLuppExpr.isWide(expr):
+            return BaseLuppExpr.parallelBackend.expand(expr)
+
+        if (polynomial := Polynomial.fromExpr(expr)) is not None:
+            return polynomial.toExpr()
+
+        return expr.fullExpand()
     
     @staticmethod
     def Substitute(expr, match, subst):
@@ -39,6 +53,47 @@ class LuppoloLibraryFunctions:
             LuppLoggerWitExc.logError("Arguments passed to Substitute function are not all expressions.")
         return expr.substitute(match, subst)
 
+    @staticmethod
+    def SubstituteAll(expr, *pairs):
+        '''
+        This function substitutes simultaneously many subexpressions of the expr expression and returns it.
+        The expression is followed by the pairs of match and subst expressions, as in
+        SubstituteAll(expr, match1, subst1, match2, subst2). If the same match appears more
+        than once, its first pair is used.
+        '''
+        if not all([isinstance(el, BaseLuppExpr) for el in [expr, *pairs]]):
+            LuppLoggerWitExc.logError("Arguments passed to SubstituteAll function are not all expressions.")
+        if len(pairs) == 0 or len(pairs) % 2 != 0:
+            LuppLoggerWitExc.logError("SubstituteAll function needs an expression followed by pairs of match and subst expressions.")
+
+        substitutions = {}
+        for match, subst in zip(pairs[::2], pairs[1::2]):
+            substitutions.setdefault(match, subst)
+        return expr.substituteAll(substitutions)
+
+    @staticmethod
+    def Cancel(expr):
+        '''
+        This function brings the quotients of polynomials inside the expression passed as argument
+        over a common denominator, cancels their common factors and returns the result.
+        Expressions that are not quotients of polynomials are returned unchanged.
+        '''
+        if not isinstance(expr, BaseLuppExpr):
+            LuppLoggerWitExc.logError("Argument passed to Cancel function is not an expression.")
+        return Polynomial.cancel(expr)
+
+    @staticmethod
+    def Equiv(left, right):
+        '''
+        This function checks if the two expressions passed as argument are the same rational function,
+        evaluating them at random points modulo large primes without expanding them.
+        It returns 1 if they are equal, up to the error bound of PolynomialIdentity, and 0 otherwise.
+        Expressions that are not rational functions are compared exactly.
+        '''
+        if not isinstance(left, BaseLuppExpr) or not isinstance(right, BaseLuppExpr):
+            LuppLoggerWitExc.logError("Arguments passed to Equiv function are not all expressions.")
+        return Rational(1) if PolynomialIdentity.areEqual(left, right) else Rational(0)
+
     @staticmethod
     def Eval(expr, rat):
         '''
@@ -52,15 +107,105 @@ class LuppoloLibraryFunctions:
         if not isinstance(rat, Rational):
             LuppLoggerWitExc.logError("Argument rat passed to Eval function is not a rational.")
 
-        symbols = expr.findInnerElementsOfType("Symbol")
+        # I simboli dell'espressione sono memorizzati nel nodo
+        symbols = expr.freeSymbols
         if len(symbols) > 1:
             LuppLoggerWitExc.logError("The expression has more than one symbol. Cannot apply eval.")
         if len(symbols) == 0:
             LuppLoggerWitExc.logError("The expression has no symbols. Cannot apply eval.")
         
-        sym : Symbol = symbols.pop()
+        sym : Symbol = Symbol(next(iter(symbols)))
         return expr.substitute(sym, rat)
 
+    @staticmethod
+    def EvalGrid(expr, index, exact, *ranges):
+        '''
+        This function evaluates the expression passed as argument on a grid of points and returns its values
+        as the polynomial v0 + v1*t + v2*t^2 + ... in the index symbol t, whose coefficient vi is the value at
+        the i-th point of the grid. The expression is followed by the index symbol, by 1 to evaluate exactly
+        or 0 to evaluate in float64, and by a range for every symbol, given as the symbol, the first point,
+        the last point and the number of equally spaced points, as in EvalGrid(expr, t, 1, x, 0, 1, 11, y, -1, 1, 5).
+        The points are numbered in row-major order, following the order of the ranges: in the example the value
+        at x = 1/10 and y = 1/2 is the coefficient of t^8. The float64 values are returned as the rationals with
+        the same binary value. The expression is compiled once into a vectorized evaluator, see VectorizedExpr,
+        instead of being substituted at every point.
+        An error is raised if a symbol of the expression has no range, if a value is not finite or if NumPy
+        is not installed. In exact mode the expression cannot contain powers with non integer exponents.
+        '''
+        if not isinstance(expr, BaseLuppExpr):
+            LuppLoggerWitExc.logError("Argument expr passed to EvalGrid function is not an expression.")
+        if not isinstance(index, Symbol):
+            LuppLoggerWitExc.logError("Argument index passed to EvalGrid function is not a symbol.")
+        if not isinstance(exact, Rational) or not (exact.isZero() or exact.isOne()):
+            LuppLoggerWitExc.logError("Argument exact passed to EvalGrid function is not 1 or 0.")
+        if len(ranges) == 0 or len(ranges) % 4 != 0:
+            LuppLoggerWitExc.logError("EvalGrid function needs an expression, an index symbol and a mode followed by ranges of symbol, start, stop and number of points.")
+
+        grid = {}
+        for sym, start, stop, count in zip(*[iter(ranges)] * 4):
+            if not isinstance(sym, Symbol):
+                LuppLoggerWitExc.logError("The first argument of a range passed to EvalGrid function is not a symbol.")
+            if not isinstance(start, Rational) or not isinstance(stop, Rational):
+                LuppLoggerWitExc.logError("The bounds of a range passed to EvalGrid function are not rationals.")
+            if not isinstance(count, Rational) or count.denominator != 1 or count.negated or count.numerator == 0:
+                LuppLoggerWitExc.logError("The number of points of a range passed to EvalGrid function is not a positive integer.")
+            if sym.getPayload() in grid:
+                LuppLoggerWitExc.logError(f"The symbol {sym.getPayload()} has more than one range in EvalGrid function.")
+            grid[sym.getPayload()] = (Polynomial.toFraction(start), Polynomial.toFraction(stop), count.numerator)
+
+        if missing := expr.freeSymbols.difference(grid):
+            LuppLoggerWitExc.logError(f"The symbols {sorted(missing)} of the expression have no range in EvalGrid function.")
+        try:
+            # Gli assi della griglia seguono l'ordine degli intervalli
+            values = VectorizedExpr(expr, list(grid), exact = exact.isOne()).grid(grid)
+        except ImportError:
+            LuppLoggerWitExc.logError("EvalGrid function needs NumPy to be installed.")
+        except ValueError:
+            LuppLoggerWitExc.logError("Cannot apply EvalGrid in exact mode to an expression containing powers with non integer exponents.")
+        except ZeroDivisionError:
+            LuppLoggerWitExc.logError("The expression passed to EvalGrid function has a zero denominator on the grid.")
+        if exact.isOne():
+            return LuppoloLibraryFunctions.indexedValues(index, values.flat)
+        values = [float(value) for value in values.flat]
+        if not all(map(isfinite, values)):
+            LuppLoggerWitExc.logError("The expression passed to EvalGrid function is not finite on the grid.")
+        return LuppoloLibraryFunctions.indexedValues(index, map(Fraction, values))
+
+    @staticmethod
+    def EvalMany(expr, index, *points):
+        '''
+        This function evaluates exactly the expression passed as argument at the rational points that
+        follow the index symbol t, as in EvalMany(expr, t, 0, 1/2, 1), and returns the values as the
+        polynomial v0 + v1*t + v2*t^2 + ..., whose coefficient vi is the value at the i-th point.
+        The expression must be a polynomial or a quotient of polynomials in at most one symbol: it is
+        converted once to its coefficients, see MultipointEvaluation, instead of being substituted at every point.
+        An error is raised if the expression is not a quotient of polynomials in one symbol or if its
+        denominator is zero at a point.
+        '''
+        if not isinstance(expr, BaseLuppExpr):
+            LuppLoggerWitExc.logError("Argument expr passed to EvalMany function is not an expression.")
+        if not isinstance(index, Symbol):
+            LuppLoggerWitExc.logError("Argument index passed to EvalMany function is not a symbol.")
+        if len(points) == 0 or not all(isinstance(point, Rational) for point in points):
+            LuppLoggerWitExc.logError("EvalMany function needs an expression and an index symbol followed by rational points.")
+
+        try:
+            values = MultipointEvaluation.evaluate(expr, list(points))
+        except ValueError:
+            LuppLoggerWitExc.logError("EvalMany function needs a polynomial or a quotient of polynomials in at most one symbol.")
+        except ZeroDivisionError:
+            LuppLoggerWitExc.logError("The expression passed to EvalMany function has a zero denominator at a point.")
+        return LuppoloLibraryFunctions.indexedValues(index, map(Polynomial.toFraction, values))
+
+    @staticmethod
+    def indexedValues(index, values):
+        '''
+        This function returns the polynomial in the index symbol whose coefficient of degree i
+        is the i-th of the Fraction values, so that every value can be read back from the result.
+        '''
+        terms = {(position,): value for position, value in enumerate(values) if value != 0}
+        return Polynomial((index.getPayload(),), terms).toExpr()
+
     @staticmethod
     def SimplDerive(expr, sym):
         '''
@@ -74,10 +219,8 @@ class LuppoloLibraryFunctions:
         if not isinstance(sym, Symbol):
             LuppLoggerWitExc.logError("Argument sym passed to SimplDerive function is not a symbol.")
         
-        pows = expr.findInnerElementsOfType("Pow")
-        
         # Controllo che non ci siano potenze con esponenti non razionali
-        if any([not isinstance(pow.children[1], Rational) for pow in pows]):
+        if expr.hasNonRationalExponent:
             LuppLoggerWitExc.logError("Cannot derive expression containing power with non-rational exponents.")
         
 
@@ -97,26 +240,42 @@ class LuppoloLibraryFunctions:
         if not isinstance(sym, Symbol):
             LuppLoggerWitExc.logError("Argument sym passed to DerivePolynomial function is not a symbol.")
 
+        # Se l'espressione è un polinomio la derivata viene calcolata sulla rappresentazione sparsa
+        if (polynomial := Polynomial.fromExpr(expr)) is not None:
+            LuppoloLibraryFunctions.checkPolynomialVariable(polynomial.symbols, sym)
+            return polynomial.derive(sym.getPayload()).toExpr()
+
         expandedExpr = expr.expand()
-        exprVariables = expandedExpr.findInnerElementsOfType("Symbol")
+        LuppoloLibraryFunctions.checkPolynomialVariable(sorted(expandedExpr.freeSymbols), sym)
 
-        if len(exprVariables) > 1:
+        return LuppoloLibraryFunctions.SimplDerive(expandedExpr, sym)
+
+    @staticmethod
+    def checkPolynomialVariable(variables, sym):
+        '''
+        This function checks that the polynomial has only one variable, given by name, and
+        that it is the symbol passed as argument. An error is raised otherwise.
+        '''
+        if len(variables) > 1:
             LuppLoggerWitExc.logError("Cannot derive polynomial with more than one variable.")
 
-        if len(exprVariables) == 0:
+        if len(variables) == 0:
             LuppLoggerWitExc.logError("Cannot derive polynomial with no variables.")
         
-        if exprVariables.pop() != sym:
+        if variables[0] != sym.getPayload():
             LuppLoggerWitExc.logError("The symbol passed as argument is not the variable of the polynomial.")
-
-        return LuppoloLibraryFunctions.SimplDerive(expr.expand(), sym)
     
 
 
     availableFunctions = {
         "Expand": Expand,
         "Substitute": Substitute,
+        "SubstituteAll": SubstituteAll,
+        "Cancel": Cancel,
+        "Equiv": Equiv,
         "Eval": Eval,
+        "EvalGrid": EvalGrid,
+        "EvalMany": EvalMany,
         "SimplDerive": SimplDerive,
         "DerivePolynomial": DerivePolynomial
     }
@@ -129,5 +288,5 @@ class LuppLoggerWitExc(LuppoloLogger):
     '''
     @staticmethod
     def logError(message):
-        super().logError(message)
+        LuppoloLogger.logError(message)
         raise LuppoloInterpException()
\ No newline at end of file
@@ -10,9 +10,13 @@ from src.ast.elements.instruction.Assignment import Assignment
 
 from src.expression.leaf import *
 from src.expression.nodes import *
+from src.expression.ExprOrder import ExprOrder
+from src.expression.identity import PolynomialIdentity
+from src.expression.modular import ModularArithmetic
 
 from src.interpreter.LuppoloLibraryFunctions import LuppoloLibraryFunctions
 from src.interpreter.LuppoloInterpException import LuppoloInterpException
+from src.utils.NodeKind import NodeKind
 
 class LuppoloInterpreter:
     '''
@@ -20,12 +24,21 @@ class LuppoloInterpreter:
     functions defined in the language and executes them iteratively.
     '''
 
+    # Profondità massima delle espressioni costruite senza normalizzazione in modalità differita.
+    # Oltre questo limite l'operando viene normalizzato, così gli alberi non crescono senza limite
+    deferredDepthLimit = 64
 
-    def __init__(self, functions):
+
+    def __init__(self, functions, deferNormalization = False, probabilisticEquality = False):
         '''
         This function initializes the interpreter with the functions to interpret.
         If there are multiple functions with the same name and the same number of parameters or 
         if a function has the same name of a Luppolo Library Function, an Exception is raised. 
+        If deferNormalization is True, the arithmetic operations build the expressions without
+        simplifying them. The expressions are normalized only where the value is needed: conditions,
+        foreach, repeat, library function calls and return.
+        If probabilisticEquality is True, the equality conditions compare the expressions as rational
+        functions, evaluating them at random points instead of comparing their normal forms (see PolynomialIdentity).
         '''
         
         for func in functions:
@@ -41,6 +54,114 @@ class LuppoloInterpreter:
                 raise Exception("An error occurred during the initialization of the interpreter. Read logs for more info.")
         
         self.functions = functions
+        self.deferNormalization = deferNormalization
+        self.probabilisticEquality = probabilisticEquality
+        # Statistiche della modalità differita: semplificazioni intermedie evitate
+        # e passate di normalizzazione effettivamente eseguite
+        self.skippedNormalizations = 0
+        self.normalizationPasses = 0
+
+        # Tabella dei metodi che interpretano i nodi, indicizzata dal tag del nodo
+        self.interpreters = [self.__interpretUnknown] * NodeKind.COUNT
+        for kind, interpreter in (
+            (NodeKind.INSTR_BLOCK, self.__interpretInstrBlock),
+            (NodeKind.ASSIGNMENT, self.__interpretAssignment),
+            (NodeKind.FOREACH, self.__interpretForeach),
+            (NodeKind.IF_ELSE, self.__interpretIfElse),
+            (NodeKind.REPEAT, self.__interpretRepeat),
+            (NodeKind.RETURN, self.__interpretReturn),
+            (NodeKind.WHILE, self.__interpretWhile),
+            (NodeKind.NAT, self.__interpretNAT),
+            (NodeKind.SYM, self.__interpretSYM),
+            (NodeKind.ID, self.__interpretID),
+            (NodeKind.BIN_OP, self.__interpretBinOp),
+            (NodeKind.BIN_COND, self.__interpretBinCond),
+            (NodeKind.TRUE_FALSE, self.__interpretTrueFalse),
+            (NodeKind.FUNC_CALL, self.__interpretFuncCall),
+            (NodeKind.LAMBDA, self.__interpretLambda),
+        ):
+            self.interpreters[kind] = interpreter
+
+    def normalize(self, expr, modular=True):
+        '''
+        This function returns the normalized form of an expression. In deferred mode the
+        expression is visited iteratively and every chain of sums or products built by the
+        arithmetic operations is flattened, so that it is simplified by a single pass instead
+        of one pass for each operation.
+        In modular mode the coefficients of the normalized form are reduced, see ModularArithmetic,
+        unless modular is False.
+        '''
+        if not self.deferNormalization or expr.isNormalized():
+            return ModularArithmetic.reduce(expr.simplify()) if modular else expr.simplify()
+
+        self.normalizationPasses += 1
+        stack = [(expr, False)]
+        while stack:
+            node, visited = stack.pop()
+            # I nodi già semplificati hanno il risultato memorizzato
+            if node.isNormalized() or BaseLuppExpr.getMemo(node, "_simplified") is not None:
+                continue
+            operands = self.__flatOperands(node)
+            if not visited:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in operands)
+            elif node.kind in (NodeKind.ADD, NodeKind.MULT):
+                # Gli operandi sono già stati semplificati: la catena viene unita
+                # nell'operando più grande, senza semplificarlo di nuovo
+                BaseLuppExpr.memoizeSimplified(node, node.__class__.merge(operands, node.negated))
+            else:
+                node.simplify()
+        return ModularArithmetic.reduce(expr.simplify()) if modular else expr.simplify()
+
+    def __flatOperands(self, node):
+        '''
+        This function returns the operands of the chain of sums or products rooted in node.
+        Only the inner nodes of the same type that are not negated and not yet simplified are flattened.
+        '''
+        if node.kind not in (NodeKind.ADD, NodeKind.MULT):
+            return node.children
+        operands = []
+        pending = list(reversed(node.children))
+        while pending:
+            child = pending.pop()
+            if child.__class__ is node.__class__ and not child.negated and not child.isNormalized() and BaseLuppExpr.getMemo(child, "_simplified") is None:
+                pending.extend(reversed(child.children))
+            else:
+                operands.append(child)
+        return operands
+
+    def __deferredOperation(self, operation, left, right, negated):
+        '''
+        This function builds the result of a BinOp without simplifying it. If the result would
+        be deeper than deferredDepthLimit, the operands are normalized first.
+        '''
+        depths = [expr.__dict__.get("_deferredDepth", 0) for expr in (left, right)]
+        if max(depths) >= self.deferredDepthLimit:
+            left, right = self.normalize(left), self.normalize(right)
+            depths = [0, 0]
+        match operation:
+            case BinOp.BinOpType.SUM:
+                result = Add([left, right], negated)
+            case BinOp.BinOpType.SUB:
+                result = Add([left, right.copy_with(negated = not right.negated)], negated)
+            case BinOp.BinOpType.MUL:
+                result = Mult([left, right], negated)
+            case BinOp.BinOpType.DIV:
+                result = Mult([left, Pow(right, Rational(-1))], negated)
+            case BinOp.BinOpType.POW:
+                result = Pow(left, right, negated)
+        if not result.isNormalized():
+            BaseLuppExpr.setCache(result, "_deferredDepth", max(depths) + 1)
+        return result
+
+    def __eagerNormalize(self, expr):
+        '''
+        This function simplifies the expression, unless the normalization is deferred.
+        '''
+        if self.deferNormalization:
+            self.skippedNormalizations += 1
+            return expr
+        return expr.simplify()
 
     def interpretFunc(self, funcName="Main", params=[]):
         '''
@@ -62,7 +183,14 @@ class LuppoloInterpreter:
 
             #Se la funzione non esiste controllo tra le funzioni di libreria
             if funcName in LuppoloLibraryFunctions.availableFunctions:
-                return LuppoloLibraryFunctions.availableFunctions[funcName](*params)
+                try:
+                    params = [self.normalize(param) if isinstance(param, BaseLuppExpr) else param for param in params]
+                    result = LuppoloLibraryFunctions.availableFunctions[funcName](*params)
+                    # In modalità modulare anche i risultati delle funzioni di libreria vengono ridotti
+                    return ModularArithmetic.reduce(result) if isinstance(result, BaseLuppExpr) else result
+                except ModularInverseError as error:
+                    LuppoloLogger.logError(f"Division by zero in modular mode: {error}.")
+                    raise LuppoloInterpException(funcMem)
 
             LuppoloLogger.logError(f"Function {funcName} not found.")
             raise LuppoloInterpException(funcMem)
@@ -91,266 +219,312 @@ class LuppoloInterpreter:
             raise LuppoloInterpException(funcMem)
 
         # Carico nello stack delle istruzioni le istruzioni della funzione
-        INSTR_STACK = [(instr, False) for instr in reversed(interpFunc.children)]
+        INSTR_STACK.extend((instr, False) for instr in reversed(interpFunc.children))
 
         # Carico nello stack dei valori i parametri passati alla funzione
         for param, value in zip(interpFunc.funcParams, params):
             INSTR_STACK.append((Assignment(param, value), False))
 
-        # Ciclo finchè ci sono istruzioni da eseguire
+        # Ciclo finchè ci sono istruzioni da eseguire. Ogni nodo viene interpretato dal metodo
+        # della tabella indicizzata dal suo tag, che restituisce un valore solo per il return
+        # In modalità modulare le operazioni e le normalizzazioni possono dividere per un multiplo del modulo
+        interpreters = self.interpreters
         while INSTR_STACK:
             node, visited = INSTR_STACK.pop()
-            match node.__class__.__name__:
-
-            ##########
-            # BLOCCO #
-            ##########
-
-                case "InstrBlock":
-                    INSTR_STACK.extend([(instr, False) for instr in reversed(node.children)])
-
-
-            ##############
-            # ISTRUZIONI #
-            ##############
-
-                case "Assignment":
-                    
-                    # Se il nodo passato nell'assegnamento è un'espressione, allora
-                    # lo salviamo direttamente nella memoria.
-                    # Questo è utile nei casi in cui si voglia asseggnare un valore
-                    # già computato in un altro step. Vedi Foreach. 
-                    if isinstance(node.children[0], BaseLuppExpr):
-                        ID_MEM[node.varName.value] = node.children[0]
-                        continue
-
-                    # Se il nodo è già stato visitato, allora possiamo eseguire
-                    # l'assegnamento prendendo il valore dallo stack 
-                    if visited:
-                        ID_MEM[node.varName.value] = VALUE_STACK.pop()
-                    
-                    # Altrimenti dobbiamo visitare l'espessione 
-                    else:
-                        INSTR_STACK.append((node, True))
-                        INSTR_STACK.append((node.children[0], False))
-
-                case "Foreach":
-                    expr, block = node.children
-                    # Se abbiamo già visitato il nodo, allora rimuoviamo la variabile
-                    # utilizzata dalla memoria. Non succede se la variabile era già
-                    # presente prima di entrare nel ciclo. Vedi commenti sotto.
-                    if visited:
-                        evaluatedExpr = VALUE_STACK.pop()
-                        if isinstance(evaluatedExpr, Add) or isinstance(evaluatedExpr, Mult):
-                            foreachExpr = evaluatedExpr.children
-                        else:
-                            foreachExpr = [evaluatedExpr]
-                        # Appendiamo per ogni elemento nell'espressione il blocco di istruzioni
-                        # ma prima andiamo ad assegnare il valore dell'espressione alla variabile
-                        for exprEl in foreachExpr:
-                            INSTR_STACK.append((block, False))
-                            INSTR_STACK.append((Assignment(node.varName, exprEl), False))
-                    else:
-                        # Se stiamo sovrascrivendo una variabile già esistente ci 
-                        # salviamo come assegnamento il suo valore per ripristinarlo
-                        # alla fine del ciclo. 
-                        if node.varName.value in ID_MEM:
-                            INSTR_STACK.append((Assignment(node.varName, ID_MEM[node.varName.value]), False))
-                        # Altrimenti aggiungiamo la funzione di rimozione del nodo
-                        else:
-                            param = node.varName.value
-                            def remove_var():
-                                del ID_MEM[param]
-                            INSTR_STACK.append((remove_var, False))
-                        
-                        # Aggiungo alle istruzioni il nodo da eseguire nuovamente dopo la valutazione
-                        # dell'espressione.
-                        INSTR_STACK.append((node, True))
-                        # Aggiungo la valutazione dell'espressione
-                        INSTR_STACK.append((expr, False))
-
-                
-                case "IfElse":
-                    cond, trueBlock = node.children[:2]
-                    falseBlock = node.children[2] if len(node.children) == 3 else None
-                    # Se il nodo è già stato visitato, allora valutiamo la condizione
-                    # e decidiamo quale blocco di istruzioni eseguire
-                    if visited:
-                        if VALUE_STACK.pop():
-                            INSTR_STACK.append((trueBlock, False))
-                        elif falseBlock is not None:
-                            INSTR_STACK.append((falseBlock, False))
-                    # Altrimenti valutiamo la condizione e torniamo a visitare il nodo
-                    else:
-                        INSTR_STACK.append((node, True))
-                        INSTR_STACK.append((cond, False))
-            
-                case "Repeat":
-                    expr, block = node.children
-
-                    # Se il nodo è già stato visitato, allora valutiamo l'espressione
-                    if visited:
-                        expr = VALUE_STACK.pop()
-                        # Se il valore dell'espressione di repeat non è un intero positivo
-                        # segnalo l'errore e sollevo un'eccezione
-                        if (not expr.__class__.__name__ == "Rational") or (expr.denominator != 1) or (expr.negated):
-                            LuppoloLogger.logError("Repeat expression must be a positive integer number.")
-                            raise LuppoloInterpException(funcMem)
-                        
-                        INSTR_STACK.extend([(block,False) for _ in range(expr.numerator)])
-                    # Altrimenti valutiamo l'espressione e torniamo a visitare il nodo
-                    else:
-                        INSTR_STACK.append((node, True))
-                        INSTR_STACK.append((expr, False))
-
-                case "Return":
-                    
-                    # Se il nodo è già stato visitato, allora possiamo restituire il valore
-                    if visited:
-                        return VALUE_STACK.pop().simplify()
-                    # Altrimenti visitiamo l'espressione e torniamo a visitare il nodo
-                    else:
-                        INSTR_STACK.append((node, True))
-                        INSTR_STACK.append((node.children[0], False))
-                    
-                case "While":
-                    cond, block = node.children
-                    # Se il nodo è già stato visitato, allora valutiamo il risultato della condizione
-                    if visited:
-                        # Se la condizione è vera, allora eseguo il blocco e torno a rieseguire me stesso
-                        if VALUE_STACK.pop():
-                            INSTR_STACK.append((node, False))
-                            INSTR_STACK.append((block, False))
-                    # Se il nodo non è stato visitato, valutiamo la condizione e torniamo a visitare il nodo
-                    else:
-                        INSTR_STACK.append((node, True))
-                        INSTR_STACK.append((cond, False))
-
-
-            ###############
-            # ESPRESSIONI #
-            ###############
-                
-                case "NAT":
-                    VALUE_STACK.append(Rational(int(node.value), negated=node.negated).simplify())
-
-                case "SYM":
-                    VALUE_STACK.append(Symbol(node.value, negated=node.negated).simplify())
-                
-                case "ID":
-                    # Controllo che la variabile sia stata definita
-                    if node.value not in ID_MEM:
-                        LuppoloLogger.logError(f"Variable {node.value} not found.")
-                        raise LuppoloInterpException(funcMem)
-                    
-                    VALUE_STACK.append(ID_MEM[node.value].copy_with().simplify())
-
-                case "BinOp":
-                    # Se il nodo è già stato visitato, allora possiamo eseguire l'operazione
-                    if visited:
-                        left = VALUE_STACK.pop()
-                        right = VALUE_STACK.pop()
-                        match node.op:
-                            case BinOp.BinOpType.SUM:
-                                VALUE_STACK.append(Add([left, right], node.negated).simplify())
-                            case BinOp.BinOpType.SUB:
-                                right = right.copy_with(negated = not right.negated)
-                                VALUE_STACK.append(Add([left, right], node.negated).simplify())
-                            case BinOp.BinOpType.MUL:
-                                VALUE_STACK.append(Mult([left, right], node.negated).simplify())
-                            case BinOp.BinOpType.DIV:
-                                VALUE_STACK.append(Mult([left, Pow(right, Rational(-1))], node.negated).simplify())
-                            case BinOp.BinOpType.POW:
-                                VALUE_STACK.append(Pow(left, right, node.negated).simplify())
-                    # Altrimenti dobbiamo visitare i figli. Aggiungiamo allo stack prima
-                    # il nodo stesso, poi il nodo di sinistra e dunque il destro.
-                    # Così nell'esecuzione verrà eseguito prima il destro e messo nello 
-                    # stack dei valori, dunque il sinistro e infine nuovamente l'operazione.
-                    # Il primo risultato estratto sarà dunque il sinistro, il secondo il destro.
-                    else:
-                        INSTR_STACK.append((node, True))
-                        INSTR_STACK.append((node.children[0], False))
-                        INSTR_STACK.append((node.children[1], False))
-
-
-            ##############
-            # CONDIZIONI #
-            ##############                
-
-                case "BinCond":
-
-                    # Se il nodo è già stato visitato, allora possiamo eseguire la condizione
-                    if visited:
-                        left = VALUE_STACK.pop()
-                        right = VALUE_STACK.pop()
-                        match node.op:
-                            case BinCond.BinCondType.EQ:
-                                res = left == right
-                            case BinCond.BinCondType.GREATER:
-                                res = right < left
-                            case BinCond.BinCondType.GEQ:
-                                res = (right < left) or (right == left)
-                            case BinCond.BinCondType.LESS:
-                                res = left < right
-                            case BinCond.BinCondType.LEQ:
-                                res = (left < right) or (left == right)
-                            case BinCond.BinCondType.AND:
-                                res = left and right
-                            case BinCond.BinCondType.OR:
-                                res = left or right
-                        
-                        VALUE_STACK.append(res != node.negated)
-
-                    # Altrimenti dobbiamo visitare i figli. Vedi spiegazione ordine in BinOp.
-                    else:
-                        INSTR_STACK.append((node, True))
-                        INSTR_STACK.append((node.children[0], False))
-                        INSTR_STACK.append((node.children[1], False))
-
-                case "TrueFalse":
-                    res = node.value == TrueFalse.TrueFalseType.TRUE 
-                    VALUE_STACK.append(res != node.negated)
-
-                
-            ############
-            # FUNCCALL #
-            ############
-
-                case "FuncCall":
-                    
-                    # Se il nodo è già stato visitato, allora possiamo eseguire la funzione
-                    if visited:
-                        funcName = node.funcName
-                        params = [VALUE_STACK.pop() for _ in range(len(node.children))]
-                        
-                        VALUE_STACK.append(self.interpretFunc(funcName, params))
-
-                    # Altrimenti valutiamo i parametri e torniamo a visitare il nodo
-                    else:
-                        INSTR_STACK.append((node, True))
-                        for arg in node.children:
-                            INSTR_STACK.append((arg, False))
-                        
-                    
-            #################
-            # LUPPOLOLAMBDA #
-            #################
-
-                case "function":
-                    node()
-                    
-
-            #########
-            # ALTRO #
-            #########  
-
-                case _:
-                    LuppoloLogger.logError(f"Node {node.__class__.__name__} not recognized to be interpretated.")
-                    raise LuppoloInterpException(funcMem)
+            try:
+                result = interpreters[node.kind](node, visited, funcMem)
+            except ModularInverseError as error:
+                LuppoloLogger.logError(f"Division by zero in modular mode: {error}.")
+                raise LuppoloInterpException(funcMem)
+            if result is not None:
+                return result
                 
         # Se non è stato restituito nulla, allora la funzione non ha un return statement
         LuppoloLogger.logError(f"Function {funcName} has no return statement.")
         raise LuppoloInterpException(funcMem)
+
+
+    ##########
+    # BLOCCO #
+    ##########
+
+    def __interpretInstrBlock(self, node, visited, funcMem):
+        ID_MEM, INSTR_STACK, VALUE_STACK = funcMem
+        INSTR_STACK.extend([(instr, False) for instr in reversed(node.children)])
+
+
+    ##############
+    # ISTRUZIONI #
+    ##############
+
+    def __interpretAssignment(self, node, visited, funcMem):
+        ID_MEM, INSTR_STACK, VALUE_STACK = funcMem
+
+        # Se il nodo passato nell'assegnamento è un'espressione, allora
+        # lo salviamo direttamente nella memoria.
+        # Questo è utile nei casi in cui si voglia asseggnare un valore
+        # già computato in un altro step. Vedi Foreach. 
+        if node.children[0].kind in NodeKind.EXPRESSIONS:
+            ID_MEM[node.varName.value] = node.children[0]
+            return
+
+        # Se il nodo è già stato visitato, allora possiamo eseguire
+        # l'assegnamento prendendo il valore dallo stack 
+        if visited:
+            ID_MEM[node.varName.value] = VALUE_STACK.pop()
         
+        # Altrimenti dobbiamo visitare l'espessione 
+        else:
+            INSTR_STACK.append((node, True))
+            INSTR_STACK.append((node.children[0], False))
+
+    def __interpretForeach(self, node, visited, funcMem):
+        ID_MEM, INSTR_STACK, VALUE_STACK = funcMem
+        expr, block = node.children
+        # Se abbiamo già visitato il nodo, allora rimuoviamo la variabile
+        # utilizzata dalla memoria. Non succede se la variabile era già
+        # presente prima di entrare nel ciclo. Vedi commenti sotto.
+        if visited:
+            evaluatedExpr = self.normalize(VALUE_STACK.pop())
+            if evaluatedExpr.kind in (NodeKind.ADD, NodeKind.MULT):
+                foreachExpr = evaluatedExpr.children
+            else:
+                foreachExpr = [evaluatedExpr]
+            # Appendiamo per ogni elemento nell'espressione il blocco di istruzioni
+            # ma prima andiamo ad assegnare il valore dell'espressione alla variabile
+            for exprEl in foreachExpr:
+                INSTR_STACK.append((block, False))
+                INSTR_STACK.append((Assignment(node.varName, exprEl), False))
+        else:
+            # Se stiamo sovrascrivendo una variabile già esistente ci 
+            # salviamo come assegnamento il suo valore per ripristinarlo
+            # alla fine del ciclo. 
+            if node.varName.value in ID_MEM:
+                INSTR_STACK.append((Assignment(node.varName, ID_MEM[node.varName.value]), False))
+            # Altrimenti aggiungiamo la funzione di rimozione del nodo
+            else:
+                param = node.varName.value
+                def remove_var():
+                    del ID_MEM[param]
+                INSTR_STACK.append((LuppoloLambda(remove_var), False))
+            
+            # Aggiungo alle istruzioni il nodo da eseguire nuovamente dopo la valutazione
+            # dell'espressione.
+            INSTR_STACK.append((node, True))
+            # Aggiungo la valutazione dell'espressione
+            INSTR_STACK.append((expr, False))
+
+    def __interpretIfElse(self, node, visited, funcMem):
+        ID_MEM, INSTR_STACK, VALUE_STACK = funcMem
+        cond, trueBlock = node.children[:2]
+        falseBlock = node.children[2] if len(node.children) == 3 else None
+        # Se il nodo è già stato visitato, allora valutiamo la condizione
+        # e decidiamo quale blocco di istruzioni eseguire
+        if visited:
+            if VALUE_STACK.pop():
+                INSTR_STACK.append((trueBlock, False))
+            elif falseBlock is not None:
+                INSTR_STACK.append((falseBlock, False))
+        # Altrimenti valutiamo la condizione e torniamo a visitare il nodo
+        else:
+            INSTR_STACK.append((node, True))
+            INSTR_STACK.append((cond, False))
+
+    def __interpretRepeat(self, node, visited, funcMem):
+        ID_MEM, INSTR_STACK, VALUE_STACK = funcMem
+        expr, block = node.children
+
+        # Se il nodo è già stato visitato, allora valutiamo l'espressione
+        if visited:
+            # Il numero di ripetizioni è un intero e non un coefficiente: in modalità modulare non viene ridotto
+            expr = self.normalize(VALUE_STACK.pop(), modular=False)
+            # Se il valore dell'espressione di repeat non è un intero positivo
+            # segnalo l'errore e sollevo un'eccezione
+            if (expr.kind != NodeKind.RATIONAL) or (expr.denominator != 1) or (expr.negated):
+                LuppoloLogger.logError("Repeat expression must be a positive integer number.")
+                raise LuppoloInterpException(funcMem)
+            
+            INSTR_STACK.extend([(block,False) for _ in range(expr.numerator)])
+        # Altrimenti valutiamo l'espressione e torniamo a visitare il nodo
+        else:
+            INSTR_STACK.append((node, True))
+            INSTR_STACK.append((expr, False))
+
+    def __interpretReturn(self, node, visited, funcMem):
+        ID_MEM, INSTR_STACK, VALUE_STACK = funcMem
+        # Se il nodo è già stato visitato, allora possiamo restituire il valore
+        if visited:
+            return self.normalize(VALUE_STACK.pop())
+        # Altrimenti visitiamo l'espressione e torniamo a visitare il nodo
+        else:
+            INSTR_STACK.append((node, True))
+            INSTR_STACK.append((node.children[0], False))
+
+    def __interpretWhile(self, node, visited, funcMem):
+        ID_MEM, INSTR_STACK, VALUE_STACK = funcMem
+        cond, block = node.children
+        # Se il nodo è già stato visitato, allora valutiamo il risultato della condizione
+        if visited:
+            # Se la condizione è vera, allora eseguo il blocco e torno a rieseguire me stesso
+            if VALUE_STACK.pop():
+                INSTR_STACK.append((node, False))
+                INSTR_STACK.append((block, False))
+        # Se il nodo non è stato visitato, valutiamo la condizione e torniamo a visitare il nodo
+        else:
+            INSTR_STACK.append((node, True))
+            INSTR_STACK.append((cond, False))
+
+
+    ###############
+    # ESPRESSIONI #
+    ###############
+
+    def __interpretNAT(self, node, visited, funcMem):
+        funcMem[2].append(self.__eagerNormalize(Rational(int(node.value), negated=node.negated)))
+
+    def __interpretSYM(self, node, visited, funcMem):
+        funcMem[2].append(self.__eagerNormalize(Symbol(node.value, negated=node.negated)))
+
+    def __interpretID(self, node, visited, funcMem):
+        ID_MEM, INSTR_STACK, VALUE_STACK = funcMem
+        # Controllo che la variabile sia stata definita
+        if node.value not in ID_MEM:
+            LuppoloLogger.logError(f"Variable {node.value} not found.")
+            raise LuppoloInterpException(funcMem)
+        
+        VALUE_STACK.append(self.__eagerNormalize(ID_MEM[node.value]))
+
+    def __interpretBinOp(self, node, visited, funcMem):
+        ID_MEM, INSTR_STACK, VALUE_STACK = funcMem
+        # Se il nodo è già stato visitato, allora possiamo eseguire l'operazione
+        if visited:
+            left = VALUE_STACK.pop()
+            right = VALUE_STACK.pop()
+            # In modalità differita l'espressione viene solo costruita
+            if self.deferNormalization:
+                self.skippedNormalizations += 1
+                VALUE_STACK.append(self.__deferredOperation(node.op, left, right, node.negated))
+                return
+            # Somme e prodotti uniscono il nuovo termine nell'espressione già
+            # semplificata, senza semplificare di nuovo tutti gli altri termini
+            match node.op:
+                case BinOp.BinOpType.SUM:
+                    result = Add.merge([left, right], node.negated)
+                case BinOp.BinOpType.SUB:
+                    right = right.copy_with(negated = not right.negated)
+                    result = Add.merge([left, right], node.negated)
+                case BinOp.BinOpType.MUL:
+                    result = Mult.merge([left, right], node.negated)
+                case BinOp.BinOpType.DIV:
+                    result = Mult([left, Pow(right, Rational(-1))], node.negated).simplify()
+                case BinOp.BinOpType.POW:
+                    result = Pow(left, right, node.negated).simplify()
+            # In modalità modulare i coefficienti vengono ridotti dopo ogni operazione,
+            # così la loro dimensione resta limitata da quella del modulo
+            VALUE_STACK.append(ModularArithmetic.reduce(result))
+        # Altrimenti dobbiamo visitare i figli. Aggiungiamo allo stack prima
+        # il nodo stesso, poi il nodo di sinistra e dunque il destro.
+        # Così nell'esecuzione verrà eseguito prima il destro e messo nello 
+        # stack dei valori, dunque il sinistro e infine nuovamente l'operazione.
+        # Il primo risultato estratto sarà dunque il sinistro, il secondo il destro.
+        else:
+            INSTR_STACK.append((node, True))
+            INSTR_STACK.append((node.children[0], False))
+            INSTR_STACK.append((node.children[1], False))
+
+
+    ##############
+    # CONDIZIONI #
+    ##############                
+
+    def __interpretBinCond(self, node, visited, funcMem):
+        ID_MEM, INSTR_STACK, VALUE_STACK = funcMem
+
+        # Se il nodo è già stato visitato, allora possiamo eseguire la condizione
+        if visited:
+            left = VALUE_STACK.pop()
+            right = VALUE_STACK.pop()
+            # Le condizioni confrontano espressioni normalizzate
+            if not isinstance(left, bool):
+                left, right = self.normalize(left), self.normalize(right)
+            match node.op:
+                case BinCond.BinCondType.EQ:
+                    res = PolynomialIdentity.areEqual(left, right) if self.probabilisticEquality else left == right
+                # I numeri razionali vengono confrontati esattamente per valore, vedi ExprOrder
+                case BinCond.BinCondType.GREATER:
+                    res = ExprOrder.compare(left, right) > 0
+                case BinCond.BinCondType.GEQ:
+                    res = ExprOrder.compare(left, right) >= 0
+                case BinCond.BinCondType.LESS:
+                    res = ExprOrder.compare(left, right) < 0
+                case BinCond.BinCondType.LEQ:
+                    res = ExprOrder.compare(left, right) <= 0
+                case BinCond.BinCondType.AND:
+                    res = left and right
+                case BinCond.BinCondType.OR:
+                    res = left or right
+            
+            VALUE_STACK.append(res != node.negated)
+
+        # Altrimenti dobbiamo visitare i figli. Vedi spiegazione ordine in BinOp.
+        else:
+            INSTR_STACK.append((node, True))
+            INSTR_STACK.append((node.children[0], False))
+            INSTR_STACK.append((node.children[1], False))
+
+    def __interpretTrueFalse(self, node, visited, funcMem):
+        res = node.value == TrueFalse.TrueFalseType.TRUE 
+        funcMem[2].append(res != node.negated)
+
+    
+    ############
+    # FUNCCALL #
+    ############
+
+    def __interpretFuncCall(self, node, visited, funcMem):
+        ID_MEM, INSTR_STACK, VALUE_STACK = funcMem
+        
+        # Se il nodo è già stato visitato, allora possiamo eseguire la funzione
+        if visited:
+            funcName = node.funcName
+            params = [VALUE_STACK.pop() for _ in range(len(node.children))]
+            
+            VALUE_STACK.append(self.interpretFunc(funcName, params))
+
+        # Altrimenti valutiamo i parametri e torniamo a visitare il nodo
+        else:
+            INSTR_STACK.append((node, True))
+            for arg in node.children:
+                INSTR_STACK.append((arg, False))
+            
+        
+    #################
+    # LUPPOLOLAMBDA #
+    #################
+
+    def __interpretLambda(self, node, visited, funcMem):
+        node()
+        
+
+    #########
+    # ALTRO #
+    #########  
+
+    def __interpretUnknown(self, node, visited, funcMem):
+        LuppoloLogger.logError(f"Node {node.__class__.__name__} not recognized to be interpretated.")
+        raise LuppoloInterpException(funcMem)
+
+
+class LuppoloLambda:
+    '''
+    This class wraps an action that the interpreter pushes on the instruction stack,
+    like the removal of the variable of a foreach at the end of the loop.
+    '''
+
+    kind = NodeKind.LAMBDA
 
+    def __init__(self, action):
+        self.action = action
 
+    def __call__(self):
+        self.action()
@@ -10,6 +10,10 @@ from src.grammar.LuppoloGrammar import LuppoloGrammar
 from src.grammar.AntlrGrammarCompiler import AntlrGrammarCompiler
 from src.interpreter.interpreter import LuppoloInterpreter
 from src.ast.AstGenerator import AstGenerator
+from src.expression.nodes import Mult
+from src.expression.parallel import ParallelExpr
+from src.expression.identity import PolynomialIdentity
+from src.expression.modular import ModularArithmetic
 
 from test.LuppoloTester import LuppoloTester
 
@@ -29,6 +33,12 @@ def solveParsedArgs(parsed_args):
             outputPdf = parsed_args.output_pdf
             outputConsole = parsed_args.output_console
             showPdf = parsed_args.show_pdf
+            deferredNormalization = parsed_args.deferred_normalization
+            probabilisticEquality = parsed_args.probabilistic_equality
+            PolynomialIdentity.errorBound = parsed_args.equality_error_bound
+            Mult.cancelQuotients = parsed_args.cancel_quotients
+            ModularArithmetic.configure(parsed_args.modulus)
+            ParallelExpr.configure(parsed_args.parallel_threshold, parsed_args.parallel_workers)
 
             # Leggo il file sorgente e preparo il lexer ed il parser
             LuppoloLogger.logInfo(f"Reading source file {sourceFilePath} and initializing lexer and parser")
@@ -50,8 +60,14 @@ def solveParsedArgs(parsed_args):
 
             # Interpreto il programma
             LuppoloLogger.logInfo("Interpreting the program")
-            interpreter = LuppoloInterpreter(astParsedTree.children)
-            result = interpreter.interpretFunc(mainFunc, args)
+            interpreter = LuppoloInterpreter(astParsedTree.children, deferNormalization=deferredNormalization, probabilisticEquality=probabilisticEquality)
+            # Il pool dei processi viene chiuso anche se l'interpretazione termina con un errore
+            try:
+                result = interpreter.interpretFunc(mainFunc, args)
+            finally:
+                ParallelExpr.shutdown()
+            if deferredNormalization:
+                LuppoloLogger.logInfo(f"Deferred normalization skipped {interpreter.skippedNormalizations} intermediate normalizations and performed {interpreter.normalizationPasses} normalization passes")
 
             # Genero il pdf
             if outputPdf != "none":
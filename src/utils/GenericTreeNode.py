@@ -3,6 +3,7 @@ from antlr4.tree.Tree import Tree
 
 from src.ast.GraphLuppNode import GraphLuppNode
 from src.utils.LuppoloLogger import LuppoloLogger
+from src.utils.NodeKind import NodeKind
 
 
 class GenericTreeNode(Tree, ABC):
@@ -10,6 +11,13 @@ class GenericTreeNode(Tree, ABC):
     The abstract class GenericTreeNode is the base class for all the nodes in the AST.
     '''
 
+    # Indica se il nodo mantiene il riferimento al padre. I nodi condivisi tra più
+    # alberi (come le espressioni) non possono avere un unico padre.
+    keepsParent = True
+
+    # Tag intero della classe del nodo, vedi NodeKind
+    kind = NodeKind.GENERIC
+
     @abstractmethod
     def __init__(self, name, children : list = None):
         '''
@@ -23,7 +31,8 @@ class GenericTreeNode(Tree, ABC):
         LuppoloLogger.logDebug("Creating node: "+name+" with children: "+str(children))
         for child in self.children:
             assert isinstance(child, GenericTreeNode), "Children must be of type GenericTreeNode"
-            child.parent = self
+            if child.keepsParent:
+                child.parent = self
         self.name = name
         self.parent = None
         
@@ -57,7 +66,8 @@ class GenericTreeNode(Tree, ABC):
     def addChild(self, child):
         ''' Add a child to the node. Set the parent of the child to this current node'''
         assert isinstance(child, GenericTreeNode), "Children must be of type GenericTreeNode"
-        child.parent = self
+        if child.keepsParent:
+            child.parent = self
         self.children.append(child)
 
     def __eq__(self, value: object) -> bool:
@@ -2,6 +2,44 @@
 
 import argparse
 
+from src.expression.modular import ModularArithmetic
+
+def primeModulus(value):
+    '''
+    This method converts the value of the --modulus option to an integer, checking that it is a prime number.
+    '''
+    modulus = int(value)
+    if not ModularArithmetic.isPrime(modulus):
+        raise argparse.ArgumentTypeError(f"{value} is not a prime number")
+    return modulus
+
+def probability(value):
+    '''
+    This method converts the value of the --equality-error-bound option to a float, checking that it is between 0 and 1 excluded.
+    '''
+    bound = float(value)
+    if not 0 < bound < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not between 0 and 1")
+    return bound
+
+def parallelThreshold(value):
+    '''
+    This method converts the value of the --parallel-threshold option to an integer, checking that it is greater than one.
+    '''
+    threshold = int(value)
+    if threshold < 2:
+        raise argparse.ArgumentTypeError(f"{value} is not greater than one")
+    return threshold
+
+def positiveInteger(value):
+    '''
+    This method converts the value of an option to an integer, checking that it is positive.
+    '''
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
 def getParser():
     parser = argparse.ArgumentParser(description="Luppolo Interpreter")
     subparsers = parser.add_subparsers(dest="command")
@@ -50,6 +88,59 @@ def getParser():
         help="How the output should be printend in console. Default value is 'latex'"
     )
 
+    run_parser.add_argument(
+        "--deferred-normalization",
+        "-dn",
+        action="store_true",
+        help="To build the expressions without simplifying them after every operation. They are normalized only when needed (conditions, foreach, repeat, library functions and return)"
+    )
+
+    run_parser.add_argument(
+        "--cancel-quotients",
+        "-cq",
+        action="store_true",
+        help="To reduce to lowest terms every product that contains quotients of polynomials during simplification, cancelling their common factors"
+    )
+
+    run_parser.add_argument(
+        "--probabilistic-equality",
+        "-pe",
+        action="store_true",
+        help="To check the equality conditions by evaluating both sides at random points modulo large primes instead of comparing their normal forms. Expressions that are not rational functions are compared exactly"
+    )
+
+    run_parser.add_argument(
+        "--equality-error-bound",
+        "-eeb",
+        type=probability,
+        default=2 ** -40,
+        help="The maximum probability that the probabilistic equality and the Equiv function consider equal two different expressions. Default value is 2^-40"
+    )
+
+    run_parser.add_argument(
+        "--modulus",
+        "-m",
+        type=primeModulus,
+        default=None,
+        help="To run the program over the field of the integers modulo the given prime number: every coefficient is reduced after each operation, while the exponents are left unchanged. By default the arithmetic is exact"
+    )
+
+    run_parser.add_argument(
+        "--parallel-threshold",
+        "-pt",
+        type=parallelThreshold,
+        default=None,
+        help="To simplify and expand in a pool of processes the sums and products with at least this number of children. By default the parallel mode is disabled"
+    )
+
+    run_parser.add_argument(
+        "--parallel-workers",
+        "-pw",
+        type=positiveInteger,
+        default=None,
+        help="The number of processes used by the parallel mode. Default value is the number of processors"
+    )
+
     run_parser.add_argument(
         "--logging-level",
         "-ll",
@@ -0,0 +1,51 @@
+class NodeKind:
+    '''
+    This class contains the integer kind tags of the nodes. Every AST and expression class
+    stores its tag in the class attribute kind, so that the interpreter and the expressions
+    dispatch through tables indexed by the tag instead of comparing class names or calling
+    isinstance, which is slow for the classes that inherit from an ABC.
+    The tags of the expressions are also the kind codes of ExprArena.
+    '''
+
+    # Espressioni
+    RATIONAL = 0
+    SYMBOL = 1
+    ADD = 2
+    MULT = 3
+    POW = 4
+
+    # Istruzioni
+    INSTR_BLOCK = 5
+    ASSIGNMENT = 6
+    FOREACH = 7
+    IF_ELSE = 8
+    REPEAT = 9
+    RETURN = 10
+    WHILE = 11
+
+    # Espressioni dell'AST
+    NAT = 12
+    SYM = 13
+    ID = 14
+    BIN_OP = 15
+
+    # Condizioni
+    BIN_COND = 16
+    TRUE_FALSE = 17
+
+    # Altri nodi dell'AST
+    FUNC_CALL = 18
+    FUNCTION = 19
+    PROGRAM = 20
+
+    # Azioni inserite dall'interprete nello stack delle istruzioni
+    LAMBDA = 21
+
+    # Nodi senza un tag proprio
+    GENERIC = 22
+
+    # Tag delle classi delle espressioni
+    EXPRESSIONS = frozenset((RATIONAL, SYMBOL, ADD, MULT, POW))
+
+    # Numero dei tag, cioè la dimensione delle tabelle indicizzate dal tag
+    COUNT = 23
@@ -0,0 +1,92 @@
+import pytest
+
+from src.expression.ExprArena import ExprArena
+from src.expression.leaf import Rational, Symbol
+from src.expression.nodes import Add, Mult, Pow
+
+a, b, c = Symbol("a"), Symbol("b"), Symbol("c")
+one, two, half = Rational(1), Rational(2), Rational(1, 2)
+
+expressions = [
+    a,
+    Rational(3, 4, negated = True),
+    Add([a, b, Rational(1)]),
+    Add([Mult([two, a]), Mult([Rational(3), a]), b], negated = True),
+    Mult([a, Symbol("b", negated = True), Pow(a, Rational(3))]),
+    Pow(Add([a, b]), Rational(3)),
+    Pow(Add([a, one]), Rational(2, negated = True)),
+    Pow(Mult([a, b]), half, negated = True),
+    Pow(Pow(a, two), Rational(3)),
+    Pow(Rational(8), Rational(1, 3)),
+    Mult([Add([a, b]), Add([a, Symbol("b", negated = True)]), c]),
+    Add([Pow(Add([a, c]), two), Mult([Rational(2, 3), a, Pow(b, Rational(2, negated = True))])]),
+    Mult([a, Pow(Add([b, c]), Rational(0))]),
+    Pow(Add([a, b]), Rational(0), negated = True),
+]
+
+
+def load(expr):
+    arena = ExprArena()
+    return arena, arena.fromExpr(expr)
+
+
+@pytest.mark.parametrize("expr", expressions)
+def test_round_trip(expr):
+    arena, root = load(expr)
+    assert arena.toExpr(root) is expr
+
+
+def test_shared_nodes_are_stored_once():
+    arena, root = load(Mult([Add([a, b]), Pow(Add([a, b]), two)]))
+    # a, b, 2, a+b, (a+b)^2 e il prodotto
+    assert len(arena) == 6
+    assert arena.fromExpr(Add([b, a])) in arena.children(root)
+
+
+@pytest.mark.parametrize("expr", expressions)
+def test_simplify(expr):
+    arena, root = load(expr)
+    assert arena.toExpr(arena.simplify(root)) is expr.simplify()
+
+
+@pytest.mark.parametrize("expr", expressions)
+def test_expand(expr):
+    arena, root = load(expr)
+    assert arena.toExpr(arena.expand(root)) is expr.expand()
+
+
+@pytest.mark.parametrize("expr", expressions)
+def test_derive(expr):
+    arena, root = load(expr)
+    assert arena.toExpr(arena.derive(root, arena.fromExpr(a))) is expr.derive(a)
+
+
+@pytest.mark.parametrize("expr", expressions)
+def test_substitute(expr):
+    arena, root = load(expr)
+    for old, new in ((a, Mult([two, c])), (Add([a, b]), c)):
+        assert arena.toExpr(arena.substitute(root, arena.fromExpr(old), arena.fromExpr(new))) is expr.substitute(old, new)
+
+
+def test_expand_zero_exponent():
+    arena, root = load(Pow(Add([a, b]), Rational(0)))
+    assert arena.toExpr(arena.expand(root)) is one
+    # L'esponente diventa razionale solo dopo essere stato espanso
+    expr = Pow(Add([a, b]), Pow(Rational(4), Rational(0)))
+    arena, root = load(expr)
+    assert arena.toExpr(arena.expand(root)) is expr.expand() is Add([a, b])
+
+
+def test_compare_deep_nodes():
+    arena = ExprArena()
+    chains = []
+    for leaf in (c, a):
+        node, tree = arena.fromExpr(leaf), leaf
+        for _ in range(800):
+            node = arena.add([arena.mult([node, arena.fromExpr(b)]), arena.fromExpr(one)])
+            tree = Add([Mult([tree, b]), one])
+        chains.append((node, tree))
+    (first, firstTree), (second, secondTree) = chains
+    root = arena.add([first, second])
+    assert list(arena.children(root)) == [second, first]
+    assert arena.toExpr(root) is Add([firstTree, secondTree])
@@ -0,0 +1,58 @@
+import pytest
+
+from src.expression.BaseLuppExpr import BaseLuppExpr
+from src.expression.ExprCodec import EncodedExprs, ExprCodec
+from src.expression.leaf import Rational, Symbol
+from src.expression.nodes import Add, Mult, Pow
+
+u, v = Symbol("u"), Symbol("v", negated = True)
+shared = Pow(Add([u, Rational(1)]), Rational(3, 2))
+expr = Add([Mult([Rational(2, 5, negated = True), shared]), Pow(shared, u), v], negated = True)
+
+
+def test_round_trip():
+    assert ExprCodec.loads(ExprCodec.dumps(expr)) is expr
+    assert ExprCodec.loadsAll(ExprCodec.dumpsAll([expr, u, shared])) == [expr, u, shared]
+
+
+def treeSize(node):
+    return 1 + sum(treeSize(child) for child in node.children)
+
+
+def test_shared_subtrees_are_written_once():
+    encoded = EncodedExprs(ExprCodec.dumpsAll([expr, shared]))
+    distinct = set(BaseLuppExpr.postOrder(expr))
+    assert encoded.nodeCount == len(distinct) < treeSize(expr)
+    assert encoded[1] is shared
+
+
+def test_big_integers():
+    big = Rational(3 ** 100, 2 ** 70 + 1, negated = True)
+    value = Mult([big, Pow(u, Rational(2 ** 64)), Rational(2 ** 64 - 1)])
+    assert ExprCodec.loads(ExprCodec.dumps(value)) is value
+
+
+def test_load_maps_the_file(tmp_path):
+    path = tmp_path / "exprs.lupx"
+    ExprCodec.dump([expr, shared], str(path))
+    with ExprCodec.load(str(path)) as encoded:
+        assert len(encoded) == 2
+        assert encoded[1] is shared
+        assert encoded[0] is expr
+
+
+def test_content_hash():
+    assert ExprCodec.contentHash(Add([v, u])) == ExprCodec.contentHash(Add([u, v]))
+    assert ExprCodec.contentHash(Add([u, v])) != ExprCodec.contentHash(Mult([u, v]))
+
+
+def test_rejects_other_data():
+    data = ExprCodec.dumps(expr)
+    with pytest.raises(ValueError, match = "not an encoded"):
+        EncodedExprs(b"XXXX" + data[4:])
+    with pytest.raises(ValueError, match = "version"):
+        EncodedExprs(data[:4] + bytes((ExprCodec.VERSION + 1,)) + data[5:])
+    with pytest.raises(ValueError, match = "truncated"):
+        EncodedExprs(data[:-1])
+    with pytest.raises(ValueError, match = "too short"):
+        EncodedExprs(data[:8])
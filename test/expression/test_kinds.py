@@ -0,0 +1,25 @@
+from src.expression.BaseLuppExpr import BaseLuppExpr
+from src.expression.ExprArena import ExprArena
+from src.expression.leaf import Rational, Symbol
+from src.expression.nodes import Add, Mult, Pow
+from src.utils.NodeKind import NodeKind
+
+x, y = Symbol("x"), Symbol("y")
+
+
+def test_expression_tags():
+    classes = (Rational, Symbol, Add, Mult, Pow)
+    assert {cls.kind for cls in classes} == NodeKind.EXPRESSIONS
+    assert len(BaseLuppExpr.type_priority) == len(classes)
+    # I tag delle espressioni sono anche i codici dei nodi di ExprArena
+    assert [ExprArena.RATIONAL, ExprArena.SYMBOL, ExprArena.ADD, ExprArena.MULT, ExprArena.POW] == [cls.kind for cls in classes]
+    assert all(0 <= kind < NodeKind.COUNT for kind in NodeKind.EXPRESSIONS)
+
+
+def test_find_inner_elements_by_tag():
+    inner = Pow(Add([x, Rational(1)]), Rational(2))
+    expr = Mult([y, inner, Pow(Symbol("y", negated = True), Add([x, y]))])
+    assert expr.findInnerElementsOfType(NodeKind.POW) == {inner, Pow(Symbol("y", negated = True), Add([x, y]))}
+    assert expr.findInnerElementsOfType(NodeKind.ADD) == {Add([x, Rational(1)]), Add([x, y])}
+    # Le potenze dentro una potenza trovata non vengono cercate
+    assert Mult([x, Pow(Pow(x, Rational(2)), y)]).findInnerElementsOfType(NodeKind.POW) == {Pow(Pow(x, Rational(2)), y)}
@@ -0,0 +1,46 @@
+from src.expression.leaf import Rational, Symbol
+from src.expression.nodes import Add, Mult, Pow
+from src.expression.termtree import TermTreeNode
+
+t = Symbol("t")
+
+
+def powers(start, stop):
+    return [Pow(t, Rational(exponent)) for exponent in range(start + 2, stop + 2)]
+
+
+def rebuiltNodesPerMerge(monkeypatch, size, merges = 100):
+    terms = powers(0, size)
+    total = Rational(0)
+    for power in terms:
+        total = Add.merge([total, power])
+    calls = []
+    update = TermTreeNode.update
+    monkeypatch.setattr(TermTreeNode, "update", lambda node: calls.append(None) or update(node))
+    for i, power in enumerate(powers(size, size + merges)):
+        # Un termine nuovo e uno già presente, di cui cambia solo il coefficiente
+        for term in (power, Mult([Rational(2), terms[i * size // merges]])):
+            total = Add.merge([total, term])
+            terms.append(term)
+    monkeypatch.undo()
+    # La somma viene costruita senza creare la tupla dei suoi addendi
+    assert "children" not in total.__dict__
+    assert total is Add(terms).simplify()
+    return len(calls) / merges
+
+
+def test_merge_cost_is_logarithmic(monkeypatch):
+    small, large = rebuiltNodesPerMerge(monkeypatch, 250), rebuiltNodesPerMerge(monkeypatch, 4000)
+    # Con un costo lineare il rapporto sarebbe 16
+    assert large < 4 * small
+
+
+def test_merge_keeps_old_sums():
+    first = Rational(0)
+    for power in powers(0, 100):
+        first = Add.merge([first, power])
+    second = Add.merge([first, Mult([Rational(-1), powers(50, 51)[0]])])
+    third = Mult.merge([Mult([t, Pow(Add([t, Rational(1)]), Rational(2))]), Pow(t, Rational(-1))])
+    assert first is Add(powers(0, 100))
+    assert second is Add(powers(0, 50) + powers(51, 100))
+    assert third is Pow(Add([t, Rational(1)]), Rational(2))
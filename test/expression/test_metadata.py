@@ -0,0 +1,44 @@
+from src.expression.leaf import Rational, Symbol
+from src.expression.nodes import Add, Mult, Pow
+
+x, y, z = Symbol("x"), Symbol("y"), Symbol("z")
+two = Rational(2)
+
+
+def test_metadata_values():
+    shared = Add([x, Rational(1)])
+    expr = Mult([Pow(shared, Rational(3)), y, shared])
+    # Il sottoalbero condiviso viene contato in ogni occorrenza
+    assert expr.size == 1 + (1 + 3 + 1) + 1 + 3
+    assert expr.depth == 4
+    assert expr.freeSymbols == {"x", "y"}
+    assert expr.totalDegree == 5
+    assert not expr.hasNonRationalExponent
+    # I metadati dei figli vengono calcolati e memorizzati insieme a quelli del nodo
+    assert shared.__dict__["totalDegree"] == 1
+
+
+def test_degree_of_non_polynomials():
+    assert Pow(x, Rational(1, 2)).totalDegree is None
+    assert Pow(x, Rational(1, negated = True)).totalDegree is None
+    assert Pow(x, Rational(0)).totalDegree == 0
+    assert Add([Mult([x, y]), Pow(z, Rational(3))]).totalDegree == 3
+    power = Pow(x, Add([y, Rational(1)]))
+    assert power.totalDegree is None and power.hasNonRationalExponent
+    assert Mult([two, Add([power, z])]).hasNonRationalExponent
+
+
+def test_leaves():
+    assert (x.size, x.depth, x.freeSymbols, x.totalDegree) == (1, 1, {"x"}, 1)
+    assert (two.size, two.depth, two.freeSymbols, two.totalDegree) == (1, 1, frozenset(), 0)
+
+
+def test_deep_expression():
+    expr = x
+    for _ in range(5000):
+        expr = Add([Mult([expr, y]), Rational(1)])
+    # I metadati dei discendenti vengono calcolati senza ricorsione
+    assert expr.depth == 2 * 5000 + 1
+    assert expr.size == 4 * 5000 + 1
+    assert expr.totalDegree == 5001
+    assert expr.freeSymbols == {"x", "y"}
@@ -0,0 +1,63 @@
+import pytest
+
+from src.expression.leaf import ModularInverseError, Rational, Symbol
+from src.expression.modular import ModularArithmetic
+from src.expression.nodes import Add, Mult, Pow
+
+m, n = Symbol("m"), Symbol("n")
+
+
+@pytest.fixture
+def modulo7():
+    ModularArithmetic.configure(7)
+    try:
+        yield
+    finally:
+        ModularArithmetic.configure(None)
+
+
+def test_reduce_coefficients(modulo7):
+    expr = Add([Mult([Rational(10), m]), Rational(1, 3)])
+    assert ModularArithmetic.reduce(expr) is Add([Mult([Rational(3), m]), Rational(2, negated = True)]).simplify()
+
+
+def test_reduce_keeps_exponents(modulo7):
+    expr = Mult([Rational(15), Pow(n, Rational(10))])
+    assert ModularArithmetic.reduce(expr) is Pow(n, Rational(10)).simplify()
+
+
+def test_pow_in_the_field(modulo7):
+    assert Rational(3) ** Rational(5) == (Rational(2, negated = True), False)
+    assert Rational(3) ** Rational(1, negated = True) == (Rational(2, negated = True), False)
+    assert Rational(9) ** Rational(0) == (Rational(1), False)
+
+
+def test_division_by_multiple_of_modulus(modulo7):
+    with pytest.raises(ModularInverseError):
+        Rational(14) ** Rational(1, negated = True)
+    with pytest.raises(ModularInverseError):
+        Rational(1, 7).residue()
+    with pytest.raises(ModularInverseError):
+        ModularArithmetic.reduce(Pow(Mult([Rational(7), m]), Rational(1, negated = True)))
+
+
+def test_reduce_disabled():
+    expr = Add([Mult([Rational(10), n]), Rational(1, 3)])
+    assert ModularArithmetic.reduce(expr) is expr
+
+
+def test_configure_rejects_composite_modulus():
+    with pytest.raises(ValueError):
+        ModularArithmetic.configure(91)
+    assert Rational.modulus is None
+
+
+def test_memo_follows_the_modulus():
+    power = Pow(Rational(3), Rational(7))
+    assert power.simplify() is Rational(2187)
+    ModularArithmetic.configure(7)
+    try:
+        assert power.simplify() is Rational(3)
+    finally:
+        ModularArithmetic.configure(None)
+    assert power.simplify() is Rational(2187)
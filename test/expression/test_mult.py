@@ -0,0 +1,46 @@
+import pytest
+
+from src.expression.leaf import Rational, Symbol
+from src.expression.nodes import Add, Mult, Pow
+
+x, y = Symbol("x"), Symbol("y")
+
+
+def quotient():
+    numerator = Mult([y, Add([Pow(x, Rational(2)), Rational(1, negated = True)])]).simplify()
+    inverse = Pow(Add([x, Rational(1)]), Rational(1, negated = True)).simplify()
+    return numerator, inverse
+
+
+@pytest.fixture
+def cancel():
+    enabled, Mult.cancelQuotients = Mult.cancelQuotients, True
+    try:
+        yield
+    finally:
+        Mult.cancelQuotients = enabled
+
+
+def test_merge_keeps_quotients_without_cancel():
+    numerator, inverse = quotient()
+    assert Mult.merge([numerator, inverse]) is Mult([numerator, inverse]).simplify()
+
+
+def test_merge_cancels_quotients_like_simplify(cancel):
+    numerator, inverse = quotient()
+    merged = Mult.merge([numerator, inverse])
+    assert merged is Add([Mult([x, y]), Symbol("y", negated = True)]).simplify()
+    assert merged.simplify() is merged
+    assert Mult([numerator, inverse]).simplify() is merged
+
+
+def test_memo_follows_the_mode():
+    expr = Mult([Add([Pow(x, Rational(2)), Rational(1, negated = True)]), Pow(Add([x, Rational(1, negated = True)]), Rational(1, negated = True))])
+    kept = expr.simplify()
+    enabled, Mult.cancelQuotients = Mult.cancelQuotients, True
+    try:
+        assert expr.simplify() is Add([x, Rational(1)]).simplify()
+        assert kept.simplify() is Add([x, Rational(1)]).simplify()
+    finally:
+        Mult.cancelQuotients = enabled
+    assert expr.simplify() is kept
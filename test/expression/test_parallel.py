@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+
+from src.expression.leaf import Rational, Symbol
+from src.expression.modular import ModularArithmetic
+from src.expression.nodes import Add, Mult, Pow
+from src.expression.parallel import ParallelExpr
+
+x = Symbol("x")
+symbols = [Symbol(name) for name in "abcdefghijkl"]
+one = Rational(1)
+
+
+@contextmanager
+def parallel():
+    ParallelExpr.configure(4, workers = 2)
+    try:
+        yield
+    finally:
+        ParallelExpr.configure(None)
+
+
+def poolStarted():
+    return ParallelExpr._ParallelExpr__pool is not None
+
+
+# I risultati attesi vengono calcolati in serie su espressioni equivalenti ma diverse: un nodo
+# già semplificato restituirebbe la forma memorizzata senza passare dal pool
+def test_simplify_wide_sum():
+    terms = lambda coefficient: [Mult([coefficient, Rational(i), Pow(x, Rational(i % 7))]) for i in range(1, 40)]
+    expected = Add(terms(Rational(2))).simplify()
+    with parallel():
+        assert Add(terms(one) + terms(one)).simplify() is expected
+        assert poolStarted()
+
+
+def test_expand_wide_product():
+    factors = [Add([x, Rational(i)]) for i in range(1, 9)]
+    expected = Mult(factors).fullExpand()
+    with parallel():
+        assert Mult([Add([Mult([one, x]), Rational(i)]) for i in range(1, 9)]).fullExpand() is expected
+        assert poolStarted()
+
+
+def test_pool_follows_the_mode():
+    with parallel():
+        Add([Mult([Rational(i), symbol]) for i, symbol in enumerate(symbols)]).simplify()
+        assert poolStarted()
+        ModularArithmetic.configure(7)
+        try:
+            # 3^7 vale 3 modulo 7: i processi devono usare il modulo configurato dopo la creazione del pool
+            expected = Add([Mult([Rational(3), symbol]) for symbol in symbols]).simplify()
+            assert Add([Mult([Pow(Rational(3), Rational(7)), symbol]) for symbol in symbols]).simplify() is expected
+        finally:
+            ModularArithmetic.configure(None)
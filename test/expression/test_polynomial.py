@@ -0,0 +1,51 @@
+from fractions import Fraction
+
+from src.expression.leaf import Rational, Symbol
+from src.expression.modular import ModularArithmetic
+from src.expression.nodes import Add, Mult, Pow
+from src.expression.polynomial import Polynomial
+
+x = Symbol("x")
+# Base nulla solo come polinomio, così la potenza non viene semplificata prima della conversione
+zero = Add([x, Symbol("x", negated = True)])
+
+
+def test_zero_to_zero_is_one():
+    power = Pow(zero, Rational(0))
+    assert Pow(Rational(0), Rational(0)).simplify() is Rational(1)
+    assert Polynomial.fromExpr(power).toExpr() is Rational(1)
+    numerator, denominator = Polynomial.quotientFromExpr(power)
+    assert numerator.toExpr() is denominator.toExpr() is Rational(1)
+
+
+def test_zero_base():
+    numerator, denominator = Polynomial.quotientFromExpr(Pow(zero, Rational(3)))
+    assert numerator.isZero() and denominator.toExpr() is Rational(1)
+    assert Polynomial.quotientFromExpr(Pow(zero, Rational(-2))) is None
+    assert Polynomial.cancel(Mult([Pow(zero, Rational(0)), x])) is x
+
+
+def sparseProduct(first, second):
+    threshold, Polynomial.denseThreshold = Polynomial.denseThreshold, float("inf")
+    try:
+        return first * second
+    finally:
+        Polynomial.denseThreshold = threshold
+
+
+def test_dense_product_matches_sparse():
+    first = Polynomial(("x",), {(i,): Fraction((-1) ** i * (i + 1), i % 3 + 1) for i in range(0, 40, 2)})
+    second = Polynomial(("x",), {(i,): Fraction(-(3 ** i), 7) for i in range(25)})
+    assert min(first.degree(), second.degree()) >= Polynomial.denseThreshold
+    assert (first * second).terms == sparseProduct(first, second).terms
+
+
+def test_dense_product_in_modular_mode():
+    first = Polynomial(("x",), {(i,): Fraction(i + 1) for i in range(30)})
+    ModularArithmetic.configure(7)
+    try:
+        product = first * first
+        assert product.terms == sparseProduct(first, first).terms
+        assert all(abs(coefficient) <= 3 for coefficient in product.terms.values())
+    finally:
+        ModularArithmetic.configure(None)
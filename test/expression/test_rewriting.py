@@ -0,0 +1,89 @@
+from src.expression.leaf import Rational, Symbol
+from src.expression.nodes import Add, Mult, Pow
+from src.expression.rewriting import Pattern, Rule, RuleSet, Wild
+from src.utils.NodeKind import NodeKind
+
+p, q, r = Symbol("p"), Symbol("q"), Symbol("r")
+two = Rational(2)
+
+
+def integer(node):
+    return node.denominator == 1 and node.numerator > 1
+
+
+# b^n -> b * b^(n-1), applicata n-1 volte
+unfoldPower = Rule(Pattern(Pow, [Wild("b"), Wild("n", kind = NodeKind.RATIONAL, negated = False, condition = integer)]),
+                   lambda node, b, n: Mult([b, Pow(b, Rational(n.numerator - 1))]), "unfold power")
+
+
+def unfolded(base, exponent):
+    expected = Pow(base, Rational(1))
+    for _ in range(exponent - 1):
+        expected = Mult([base, expected])
+    return expected
+
+
+def test_rest_binds_unmatched_children():
+    pattern = Pattern(Add, [Wild("u", kind = NodeKind.SYMBOL)], rest = "others")
+    bindings = pattern.match(Add([two, Pow(q, two), p]), {})
+    assert bindings["u"] is p
+    assert set(bindings["others"]) == {two, Pow(q, two)}
+    assert Pattern(Add, [Wild("u", kind = NodeKind.SYMBOL)]).match(Add([two, p]), {}) is None
+
+
+def test_commutative_match_backtracks():
+    # Il primo assegnamento lega u alla potenza e fallisce sul secondo pattern
+    pattern = Pattern(Mult, [Wild("u"), Pattern(Pow, [Wild("u"), Wild("n")])])
+    bindings = pattern.match(Mult([Pow(p, Rational(3)), p]), {})
+    assert bindings == {"u": p, "n": Rational(3)}
+    assert pattern.match(Mult([Pow(p, Rational(3)), q]), {}) is None
+
+
+def test_discrimination_tree_lookup():
+    anyNode = Rule(Wild(), lambda node: None, "any")
+    twoAddends = Rule(Pattern(Add, [Wild(), Wild()]), lambda node: None, "two addends")
+    manyAddends = Rule(Pattern(Add, [Wild()], rest = "others"), lambda node: None, "many addends")
+    power = Rule(Pattern(Pow, [Wild(kind = NodeKind.SYMBOL), Wild(kind = NodeKind.RATIONAL)]), lambda node: None, "power")
+    rules = RuleSet([manyAddends, power, twoAddends, anyNode])
+    assert rules.candidates(Add([p, q])) == [manyAddends, twoAddends, anyNode]
+    assert rules.candidates(Add([p, q, r])) == [manyAddends, anyNode]
+    assert rules.candidates(Pow(p, two)) == [power, anyNode]
+    assert rules.candidates(Pow(Add([p, q]), two)) == [anyNode]
+
+
+def test_rewrite_reaches_fixpoint():
+    rules = RuleSet([unfoldPower])
+    result = rules.rewrite(Mult([Pow(p, Rational(3)), Pow(q, two)]))
+    assert result is Mult([unfolded(p, 3), unfolded(q, 2)])
+    assert rules.rewrite(result) is result
+    assert all(rules.applyFirst(node) is node for node in (result, *result.children))
+
+
+def test_rewrite_long_chains_without_recursion():
+    rules = RuleSet([unfoldPower])
+    assert rules.rewrite(Pow(r, Rational(3000))) is unfolded(r, 3000)
+
+
+def test_rewrite_memoizes_normal_forms():
+    calls = []
+    counted = Rule(unfoldPower.pattern, lambda node, b, n: calls.append(node) or unfoldPower.build(node, b, n))
+    rules = RuleSet([counted])
+    shared = Pow(Add([p, q]), Rational(4))
+    first = rules.rewrite(Add([shared, Mult([r, shared])]))
+    # La potenza condivisa viene riscritta una sola volta: 4 -> 3 -> 2
+    assert len(calls) == 3
+    assert rules.rewrite(Mult([two, shared])) is Mult([two, unfolded(Add([p, q]), 4)])
+    assert len(calls) == 3
+    assert rules.rewrite(first) is first
+
+
+def test_sum_and_product_rules():
+    nested = Add([p, Add([q, r], negated = True)])
+    assert Add.simplificationRules.applyFirst(nested) is Add([p, Symbol("q", negated = True), Symbol("r", negated = True)])
+    assert Add.simplificationRules.applyFirst(Add([Rational(0), q], negated = True)) is Symbol("q", negated = True)
+    assert Mult.simplificationRules.applyFirst(Mult([p, Mult([q, r], negated = True)])) is Mult([p, q, r], negated = True)
+    assert Mult.simplificationRules.applyFirst(Mult([p, Rational(0), q])) is Rational(0)
+    assert Mult.simplificationRules.applyFirst(Mult([Rational(1), p], negated = True)) is Symbol("p", negated = True)
+    # Le somme e i prodotti senza regole applicabili passano alla raccolta dei termini simili
+    assert Add.simplificationRules.applyFirst(Add([p, q])) is Add([p, q])
+    assert Mult([two, p, Mult([p, q])]).simplify() is Mult([two, Pow(p, two), q])